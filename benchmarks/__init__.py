@@ -0,0 +1,4 @@
+"""Offline benchmark suite for the db.py and utils.py hot paths.
+
+Run with `python -m benchmarks.run`; see `benchmarks/run.py` for options.
+"""
@@ -0,0 +1,36 @@
+"""Cold-import timing for the app modules, each measured in a fresh interpreter."""
+import json
+import os
+import subprocess
+import sys
+
+APP_MODULES = ["db", "utils", "llms", "instruct", "embeddings", "tracing"]
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+heavy = [m for m in ("instructor", "anthropic", "openai", "sentence_transformers", "sklearn") if m in sys.modules]
+print(json.dumps({{"import_s": elapsed, "heavy_modules": heavy}}))
+"""
+
+
+def measure_import_time(module: str, repo_root: str, cwd: str) -> dict:
+    """Import `module` in a fresh interpreter and report its wall time and heavy deps."""
+    env = {**os.environ, "PYTHONPATH": repo_root}
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module)],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return {"import_s": None, "error": result.stderr.strip().splitlines()[-1]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure_import_times(repo_root: str, cwd: str, modules: list = APP_MODULES) -> dict:
+    """Cold-import timings keyed by module name."""
+    return {module: measure_import_time(module, repo_root, cwd) for module in modules}
@@ -0,0 +1,169 @@
+"""Benchmark runner for the db.py and utils.py hot paths.
+
+Builds a synthetic workspace (logs, notes, todos, links, portfolio) in a
+temporary directory, times each hot path plus the cold import of each app
+module, and emits the results as JSON.
+
+Usage:
+    python -m benchmarks.run --years 3 --todos 20000 --output bench.json
+    python -m benchmarks.run --check   # exit 1 if any threshold is exceeded
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks import imports
+from benchmarks import stub_embeddings
+from benchmarks import synthetic
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+THRESHOLDS_PATH = Path(__file__).with_name("thresholds.json")
+
+
+def time_call(func, repeat: int) -> dict:
+    """Run func `repeat` times and summarize wall-clock durations in seconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "max_s": max(samples),
+        "repeat": repeat,
+    }
+
+
+def build_workspace(workdir: Path, args: argparse.Namespace, end_date: datetime.date):
+    """Populate a temporary LOGS_PATH and data/ dir, then import the app modules."""
+    rng = random.Random(args.seed)
+    logs_path = workdir / "logs"
+    os.environ["LOGS_PATH"] = str(logs_path)
+    os.chdir(workdir)
+    (workdir / "data").mkdir()
+
+    sys.path.insert(0, str(REPO_ROOT))
+    sys.modules["embeddings"] = stub_embeddings
+
+    import setup
+
+    setup.main()
+    n_logs = synthetic.write_logs(str(logs_path), args.years, end_date, rng)
+    synthetic.write_notes(str(logs_path / "notes"), args.notes, rng)
+
+    import db
+    import utils
+
+    db.create_links_table()
+    logs_conn = sqlite3.connect("data/my_logs.db")
+    synthetic.populate_todos(logs_conn, args.todos, rng)
+    synthetic.populate_links(logs_conn, args.links, rng)
+    synthetic.populate_reflections(logs_conn, end_date, 60, rng)
+    logs_conn.close()
+    port_conn = sqlite3.connect("data/my_portfolio.db")
+    synthetic.populate_portfolio(port_conn, args.snapshots, end_date, rng)
+    port_conn.close()
+    db.backup_todo_list(force=True)
+    return db, utils, n_logs
+
+
+def run_benchmarks(db, utils, end_date: datetime.date, repeat: int) -> dict:
+    """Time each hot path against the synthetic workspace."""
+    import pandas as pd
+
+    import calmap
+
+    todo_df = db.get_todo_data()
+    suggestions_df = pd.DataFrame(
+        {
+            "name": todo_df["name"].head(10).tolist(),
+            "type": "Work",
+            "priority": "Medium",
+            "project": "",
+        }
+    )
+    window_start = end_date - datetime.timedelta(days=30)
+    window_end = end_date - datetime.timedelta(days=2)
+
+    cases = {
+        "prepare_calendar_data": lambda: db.prepare_calendar_data(end_date.year),
+        "calendar_grid": lambda: calmap.build_calendar(
+            [end_date.year], [date for date, _ in db.get_log_sizes(end_date.year)]
+        ),
+        "get_period_logs_reflection_string": lambda: utils.get_period_logs_reflection_string(
+            window_start, window_end
+        ),
+        "get_todo_data": db.get_todo_data,
+        "replace_todo_list": lambda: db.replace_todo_list(todo_df),
+        "calculate_stats": lambda: utils.calculate_stats(todo_df, window_start),
+        "load_notes_metadata": db.load_notes_metadata,
+        "drop_duplicate_suggestions": lambda: utils.drop_duplicate_suggestions(suggestions_df),
+    }
+    return {name: time_call(func, repeat) for name, func in cases.items()}
+
+
+def check_thresholds(results: dict, thresholds: dict) -> bool:
+    """Annotate results with their threshold and return whether all passed."""
+    passed = True
+    for name, result in results.items():
+        threshold = thresholds.get(name)
+        result["threshold_s"] = threshold
+        if result["median_s"] is None:
+            result["passed"] = False
+        else:
+            result["passed"] = threshold is None or result["median_s"] <= threshold
+        passed = passed and result["passed"]
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=3, help="Years of daily logs.")
+    parser.add_argument("--todos", type=int, default=20000)
+    parser.add_argument("--notes", type=int, default=2000)
+    parser.add_argument("--links", type=int, default=2000)
+    parser.add_argument("--snapshots", type=int, default=1000, help="Portfolio days.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    parser.add_argument("--check", action="store_true", help="Exit 1 on threshold regressions.")
+    args = parser.parse_args()
+
+    end_date = datetime.date.today()
+    thresholds = json.loads(THRESHOLDS_PATH.read_text())
+    output = Path(args.output).resolve() if args.output else None
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory(prefix="assetmkr-bench-") as tmp:
+        db, utils, n_logs = build_workspace(Path(tmp), args, end_date)
+        results = run_benchmarks(db, utils, end_date, args.repeat)
+        for module, timing in imports.measure_import_times(str(REPO_ROOT), tmp).items():
+            results[f"import:{module}"] = {**timing, "median_s": timing["import_s"]}
+        os.chdir(cwd)
+
+    passed = check_thresholds(results, thresholds)
+    report = {
+        "config": {**vars(args), "n_logs": n_logs, "end_date": end_date.isoformat()},
+        "results": results,
+        "passed": passed,
+    }
+    report_json = json.dumps(report, indent=2)
+    if output:
+        output.write_text(report_json)
+    else:
+        print(report_json)
+    if args.check and not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
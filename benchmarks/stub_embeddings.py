@@ -0,0 +1,57 @@
+"""Deterministic stand-in for `embeddings` so benchmarks never load a model."""
+import hashlib
+import re
+
+import numpy as np
+
+DIM = 64
+
+
+def _embed(text: str) -> np.ndarray:
+    """Hashed bag-of-words vector, L2 normalized."""
+    vector = np.zeros(DIM, dtype=np.float32)
+    for token in re.findall(r"\w+", text.lower()):
+        digest = hashlib.md5(token.encode()).digest()
+        vector[digest[0] % DIM] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def get_embeddings(texts: list, model_name: str = "stub"):
+    """Get embeddings for a list of texts."""
+    return np.array([_embed(text) for text in texts], dtype=np.float32).reshape(
+        len(texts), DIM
+    )
+
+
+def find_similar(
+    query: str,
+    passages: list,
+    top_k: int = 5,
+    threshold: float = 0.9,
+    model_name: str = "stub",
+):
+    """Same contract as `embeddings.find_similar`, backed by hashed vectors."""
+    if len(passages) == 0:
+        return []
+    similarities = get_embeddings(passages) @ _embed(query)
+    similar_passages = [
+        (passage, similarity)
+        for passage, similarity in zip(passages, similarities)
+        if similarity >= threshold
+    ]
+    similar_passages = sorted(similar_passages, key=lambda x: x[1], reverse=True)
+    return similar_passages[:top_k]
+
+
+def find_duplicates(queries: list, passages: list, threshold: float = 0.9, model_name: str = "stub"):
+    """Same contract as `embeddings.find_duplicates`, backed by hashed vectors."""
+    if len(queries) == 0:
+        return np.zeros(0, dtype=bool)
+    query_embeddings = get_embeddings(queries)
+    duplicates = np.zeros(len(queries), dtype=bool)
+    if len(passages) > 0:
+        duplicates |= (query_embeddings @ get_embeddings(passages).T).max(axis=1) >= threshold
+    self_similarity = np.triu(query_embeddings @ query_embeddings.T, k=1)
+    duplicates |= (self_similarity >= threshold).any(axis=0)
+    return duplicates
@@ -0,0 +1,120 @@
+"""Synthetic data generators for the benchmark suite."""
+import datetime
+import json
+import os
+import random
+
+WORDS = (
+    "review draft call plan fix write read email budget design deploy garden "
+    "groceries doctor gym project meeting paper model data notes travel family "
+    "dinner taxes invoice refactor server music practice walk coffee weekend"
+).split()
+PLATFORMS = ["Wealthfront", "CETES", "Real Estate", "Robinhood", "IRA", "Crypto"]
+PROJECTS = ["", "Research", "Development", "Home", "Finance", "Writing"]
+
+
+def sentence(rng: random.Random, n_words: int) -> str:
+    """Random sentence built from the benchmark vocabulary."""
+    return " ".join(rng.choice(WORDS) for _ in range(n_words)).capitalize() + "."
+
+
+def write_logs(logs_path: str, years: int, end_date: datetime.date, rng: random.Random) -> int:
+    """Write ~90% of the days in the last N years as markdown logs."""
+    n_logs = 0
+    for offset in range(years * 365):
+        date = end_date - datetime.timedelta(days=offset)
+        if rng.random() < 0.1:
+            continue
+        log_dir = os.path.join(logs_path, date.strftime("%Y-%m"))
+        os.makedirs(log_dir, exist_ok=True)
+        paragraphs = [sentence(rng, rng.randint(8, 40)) for _ in range(rng.randint(2, 8))]
+        content = f"# {date.strftime('%B %d, %Y')}\n\n" + "\n\n".join(paragraphs)
+        with open(os.path.join(log_dir, f"{date.strftime('%Y%m%d')}.md"), "w") as f:
+            f.write(content)
+        n_logs += 1
+    return n_logs
+
+
+def write_notes(notes_path: str, n_notes: int, rng: random.Random) -> None:
+    """Write notes with YAML frontmatter, as saved by the Notes page."""
+    os.makedirs(notes_path, exist_ok=True)
+    now = datetime.datetime.now()
+    for idx in range(n_notes):
+        tstp = (now - datetime.timedelta(minutes=idx)).isoformat()
+        tags = rng.sample(WORDS, 2)
+        body = "\n\n".join(sentence(rng, 30) for _ in range(5))
+        content = (
+            f"---\ncreated: '{tstp}'\ntags:\n- {tags[0]}\n- {tags[1]}\n"
+            f"title: Note {idx}\nupdated: '{tstp}'\n---\n{body}"
+        )
+        with open(os.path.join(notes_path, f"note_{idx}.md"), "w") as f:
+            f.write(content)
+
+
+def populate_todos(conn, n_todos: int, rng: random.Random) -> None:
+    """Insert to-do items, ~80% of them completed over the last two years."""
+    now = datetime.datetime.now()
+    rows = []
+    for _ in range(n_todos):
+        tstp = now - datetime.timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60))
+        edit_tstp = tstp + datetime.timedelta(minutes=rng.randint(0, 7 * 24 * 60))
+        meta = {
+            "priority": rng.choice(["Medium", "High"]),
+            "project": rng.choice(PROJECTS),
+            "edit_tstp": min(edit_tstp, now).strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        rows.append(
+            (
+                sentence(rng, 5),
+                rng.choice(["Personal", "Work", "Family"]),
+                int(rng.random() < 0.8),
+                json.dumps(meta),
+                tstp.strftime("%Y-%m-%d %H:%M:%S"),
+            )
+        )
+    with conn:
+        conn.executemany(
+            "INSERT INTO todo (NAME, TYPE, STATUS, META, TSTP) VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+
+
+def populate_links(conn, n_links: int, rng: random.Random) -> None:
+    """Insert saved links."""
+    now = datetime.datetime.now()
+    rows = []
+    for idx in range(n_links):
+        tstp = (now - datetime.timedelta(hours=idx)).strftime("%Y-%m-%d %H:%M:%S")
+        meta = {"topic": rng.choice(WORDS), "summary": sentence(rng, 20), "edit_tstp": tstp}
+        rows.append((f"https://example.com/{idx}", int(rng.random() < 0.5), json.dumps(meta), tstp))
+    with conn:
+        conn.executemany(
+            "INSERT INTO links (URL, READ, META, TSTP) VALUES (?, ?, ?, ?)", rows
+        )
+
+
+def populate_reflections(conn, end_date: datetime.date, n_days: int, rng: random.Random) -> None:
+    """Insert a reflection for each of the last N days."""
+    rows = []
+    for offset in range(n_days):
+        date = (end_date - datetime.timedelta(days=offset)).strftime("%Y-%m-%d")
+        rows.append((date, "✿", sentence(rng, 4), sentence(rng, 40), sentence(rng, 10)))
+    with conn:
+        conn.executemany(
+            "INSERT INTO ascii_art (DATE, ART, TITLE, MESSAGE, REACTION) VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+
+
+def populate_portfolio(conn, n_snapshots: int, end_date: datetime.date, rng: random.Random) -> None:
+    """Insert daily portfolio snapshots, one row per platform."""
+    rows = []
+    for offset in range(n_snapshots):
+        date = (end_date - datetime.timedelta(days=offset)).strftime("%Y-%m-%d")
+        for platform in PLATFORMS:
+            rows.append((date, platform, rng.uniform(1e3, 1e5), rng.uniform(0, 12)))
+    with conn:
+        conn.executemany(
+            "INSERT INTO portfolio (Date, Platform, Amount, Rate) VALUES (?, ?, ?, ?)",
+            rows,
+        )
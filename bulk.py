@@ -0,0 +1,350 @@
+"""Streaming import/export for every store, in JSONL or Parquet.
+
+Table stores are read with `fetchmany` and written with `executemany` inside a
+single transaction, one chunk at a time, so years of data never sit in one
+DataFrame. Daily logs and notes are exported as one record per file.
+
+Usage:
+    python -m bulk export todo backups/todo.parquet
+    python -m bulk import links bookmarks.jsonl --replace
+    python -m bulk export all backups/ --format parquet
+"""
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+import db
+
+TABLE_STORES = {
+    "portfolio": ("portfolio", "portfolio"),
+    "todo": ("logs", "todo"),
+    "links": ("logs", "links"),
+    "projects": ("logs", "projects"),
+    "ascii_art": ("logs", "ascii_art"),
+}
+FILE_STORES = ["logs", "notes"]
+STORES = list(TABLE_STORES) + FILE_STORES
+FORMATS = {".jsonl": "jsonl", ".parquet": "parquet"}
+CHUNK_SIZE = 5000
+
+
+def infer_format(path: str, fmt: Optional[str] = None) -> str:
+    """Resolve the file format from an explicit value or the path extension."""
+    fmt = fmt or FORMATS.get(Path(path).suffix.lower())
+    if fmt not in FORMATS.values():
+        raise ValueError(f"Unknown format for {path}; use one of {sorted(FORMATS)}")
+    if fmt == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        raise ImportError("Parquet files need pyarrow: pip install pyarrow")
+    return fmt
+
+
+def _column_types(conn, table: str) -> dict:
+    """Declared SQLite column types, by column name."""
+    rows = conn.execute(f"PRAGMA table_info({table})").fetchall()
+    return {row[1]: (row[2] or "").upper() for row in rows}
+
+
+def _to_storable(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.strftime("%Y-%m-%d %H:%M:%S" if isinstance(value, datetime.datetime) else "%Y-%m-%d")
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+#############
+## FORMATS ##
+#############
+
+
+class JSONLWriter:
+    def __init__(self, path: str, schema: dict):
+        self._file = open(path, "w")
+
+    def write(self, records: list):
+        for record in records:
+            self._file.write(json.dumps(record, default=str) + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetWriter:
+    """Writes record chunks as row groups; column types come from the store schema."""
+
+    ARROW_TYPES = {"INTEGER": "int64", "REAL": "float64"}
+
+    def __init__(self, path: str, schema: dict):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        self._kinds = {name: self.ARROW_TYPES.get(kind, "string") for name, kind in schema.items()}
+        self.schema = pa.schema([(name, getattr(pa, kind)()) for name, kind in self._kinds.items()])
+        self._writer = pq.ParquetWriter(path, self.schema)
+
+    def _coerce(self, value, kind: str):
+        if value is None:
+            return None
+        if kind == "int64":
+            return int(value)
+        if kind == "float64":
+            return float(value)
+        return str(value)
+
+    def write(self, records: list):
+        columns = {
+            name: [self._coerce(record.get(name), kind) for record in records]
+            for name, kind in self._kinds.items()
+        }
+        self._writer.write_table(self._pa.Table.from_pydict(columns, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+
+
+WRITERS = {"jsonl": JSONLWriter, "parquet": ParquetWriter}
+
+
+def read_chunks(path: str, fmt: Optional[str] = None, chunk_size: int = CHUNK_SIZE) -> Iterator[list]:
+    """Yield lists of record dicts from a JSONL or Parquet file without loading it whole."""
+    fmt = infer_format(path, fmt)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pylist()
+        return
+
+    chunk = []
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                chunk.append(json.loads(line))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+##################
+## TABLE STORES ##
+##################
+
+
+def _iter_table(conn, table: str, chunk_size: int) -> Iterator[list]:
+    cursor = conn.execute(f"SELECT * FROM {table}")
+    columns = [description[0] for description in cursor.description]
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        yield [dict(zip(columns, row)) for row in rows]
+
+
+def _prepare_records(store: str, records: list) -> list:
+    """Per-store fixups applied to incoming records before insertion."""
+    if store == "links":
+        for record in records:
+            url_key = "URL" if "URL" in record else "url"
+            if not record.get("CANONICAL_URL") and not record.get("canonical_url"):
+                record["CANONICAL_URL"] = db.canonicalize_url(record.get(url_key))
+    return records
+
+
+def _import_table(store, chunks, replace, progress) -> int:
+    """Insert chunks into a table store; returns the rows actually inserted."""
+    conn_name, table = TABLE_STORES[store]
+    conn = db.get_connection(conn_name)
+    known_columns = {name.upper(): name for name in _column_types(conn, table)}
+    n_rows = 0
+    with conn:
+        if replace:
+            conn.execute(f"DELETE FROM {table}")
+            if store == "todo":
+                ## The undo stack refers to rows that no longer exist.
+                conn.execute("DELETE FROM todo_undo_stack")
+        for records in chunks:
+            ## Records may omit optional fields; group them by the columns they carry
+            ## so missing ones keep their table defaults.
+            groups = {}
+            for record in _prepare_records(store, records):
+                lookup = {key.upper(): key for key in record}
+                columns = tuple(known_columns[key] for key in lookup if key in known_columns)
+                if not columns:
+                    raise ValueError(f"No columns of '{table}' found in the input")
+                groups.setdefault(columns, []).append(
+                    tuple(_to_storable(record[lookup[column.upper()]]) for column in columns)
+                )
+            for columns, rows in groups.items():
+                placeholders = ", ".join("?" for _ in columns)
+                ## Rows clashing with a unique key (e.g. an already saved link) are skipped.
+                cursor = conn.executemany(
+                    f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+                    rows,
+                )
+                n_rows += cursor.rowcount
+            if progress:
+                progress(store, n_rows)
+    return n_rows
+
+
+#################
+## FILE STORES ##
+#################
+
+
+def _iter_logs(chunk_size: int) -> Iterator[list]:
+    chunk = []
+    for log_dir in sorted(Path(db.LOGS_PATH).glob("[0-9][0-9][0-9][0-9]-[0-9][0-9]")):
+        for log_file in sorted(log_dir.iterdir()):
+            if not re.match(r"\d{8}\.md$", log_file.name):
+                continue
+            date = datetime.datetime.strptime(log_file.stem, "%Y%m%d").strftime("%Y-%m-%d")
+            chunk.append({"date": date, "text": log_file.read_text()})
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def _iter_notes(chunk_size: int) -> Iterator[list]:
+    chunk = []
+    for note_file in sorted(Path(db.NOTES_PATH).glob("*.md")):
+        chunk.append({"filename": note_file.name, "text": note_file.read_text()})
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+FILE_SCHEMAS = {"logs": {"date": "TEXT", "text": "TEXT"}, "notes": {"filename": "TEXT", "text": "TEXT"}}
+
+
+def _import_files(store, chunks, progress) -> int:
+    n_rows = 0
+    for records in chunks:
+        for record in records:
+            if store == "logs":
+                db.save_logs_by_date(_parse_date(record["date"]), record["text"])
+            else:
+                filename = Path(record["filename"]).name
+                db.atomic_write(os.path.join(db.NOTES_PATH, filename), record["text"])
+                db.index_note_files([filename])
+        n_rows += len(records)
+        if progress:
+            progress(store, n_rows)
+    return n_rows
+
+
+def _parse_date(value) -> datetime.date:
+    """Parse the ISO date strings (or dates) stored in log records."""
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+#########
+## API ##
+#########
+
+
+def export_store(
+    store: str,
+    path: str,
+    fmt: Optional[str] = None,
+    chunk_size: int = CHUNK_SIZE,
+    progress: Optional[Callable[[str, int], None]] = None,
+) -> int:
+    """Stream a store to a JSONL or Parquet file; returns the number of records written."""
+    fmt = infer_format(path, fmt)
+    if store in TABLE_STORES:
+        conn_name, table = TABLE_STORES[store]
+        conn = db.get_connection(conn_name)
+        schema = _column_types(conn, table)
+        chunks = _iter_table(conn, table, chunk_size)
+    elif store in FILE_STORES:
+        schema = FILE_SCHEMAS[store]
+        chunks = (_iter_logs if store == "logs" else _iter_notes)(chunk_size)
+    else:
+        raise ValueError(f"Unknown store '{store}'; use one of {STORES}")
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    writer = WRITERS[fmt](path, schema)
+    n_rows = 0
+    try:
+        for records in chunks:
+            writer.write([{key: _to_storable(value) for key, value in record.items()} for record in records])
+            n_rows += len(records)
+            if progress:
+                progress(store, n_rows)
+    finally:
+        writer.close()
+    return n_rows
+
+
+def import_store(
+    store: str,
+    path: str,
+    fmt: Optional[str] = None,
+    chunk_size: int = CHUNK_SIZE,
+    replace: bool = False,
+    progress: Optional[Callable[[str, int], None]] = None,
+) -> int:
+    """Stream a JSONL or Parquet file into a store; table stores load in one transaction.
+
+    `replace` clears a table store first; logs and notes are always written per file.
+    """
+    chunks = read_chunks(path, fmt, chunk_size)
+    if store in TABLE_STORES:
+        n_rows = _import_table(store, chunks, replace, progress)
+        if store == "todo":
+            ## Bulk rows bypass the change journal, so pin them with a fresh snapshot.
+            db.backup_todo_list(force=True)
+        return n_rows
+    if store in FILE_STORES:
+        return _import_files(store, chunks, progress)
+    raise ValueError(f"Unknown store '{store}'; use one of {STORES}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("store", choices=STORES + ["all"])
+    parser.add_argument("path", help="File path, or a directory when the store is 'all'.")
+    parser.add_argument("--format", choices=sorted(set(FORMATS.values())), help="Defaults to the file extension.")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--replace", action="store_true", help="Clear table stores before importing.")
+    args = parser.parse_args()
+
+    def progress(store: str, n_rows: int):
+        print(f"\r{store}: {n_rows:,} records", end="", file=sys.stderr, flush=True)
+
+    if args.store == "all":
+        fmt = args.format or "jsonl"
+        targets = [(store, os.path.join(args.path, f"{store}.{fmt}")) for store in STORES]
+        if args.action == "import":
+            targets = [(store, path) for store, path in targets if os.path.exists(path)]
+    else:
+        fmt = args.format
+        targets = [(args.store, args.path)]
+
+    for store, path in targets:
+        if args.action == "export":
+            export_store(store, path, fmt, args.chunk_size, progress)
+        else:
+            import_store(store, path, fmt, args.chunk_size, args.replace, progress)
+        print(file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
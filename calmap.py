@@ -0,0 +1,147 @@
+"""Calendar heatmaps built directly with NumPy.
+
+Each year maps day-of-year straight into a 7 x 53/54 week grid (rows run Sun..Mon
+top to bottom, matching the heatmap), so filling a grid is one `bincount` and one
+fancy-indexed assignment. The per-year layout, including hover labels, is
+computed once and cached.
+"""
+import datetime
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+WEEKDAY_LABELS = ["Sun", "Sat", "Fri", "Thu", "Wed", "Tue", "Mon"]
+PRESENCE_COLORS = ["#f2f2f2", "#87bc45"]
+TODAY_COLOR = "#e60049"
+YEAR_HEIGHT = 150
+
+
+class YearLayout(NamedTuple):
+    rows: np.ndarray
+    cols: np.ndarray
+    dates: np.ndarray
+    labels: np.ndarray
+    week_labels: list
+
+
+class CalendarGrid(NamedTuple):
+    year: int
+    z: np.ndarray
+    dates: np.ndarray
+    labels: np.ndarray
+    week_labels: list
+
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+@lru_cache(maxsize=32)
+def year_layout(year: int) -> YearLayout:
+    """Cell coordinates, dates and "%b %d" labels for every day of a year."""
+    days = np.arange(f"{year}-01-01", f"{year + 1}-01-01", dtype="datetime64[D]")
+    offset = datetime.date(year, 1, 1).weekday()
+    slots = np.arange(len(days)) + offset
+    rows, cols = 6 - slots % 7, slots // 7
+    n_weeks = int(cols[-1]) + 1
+
+    day_labels = np.array([day.strftime("%b %d") for day in days.tolist()], dtype=object)
+    dates = np.full((7, n_weeks), np.datetime64("NaT"), dtype="datetime64[D]")
+    dates[rows, cols] = days
+    labels = np.full((7, n_weeks), "", dtype=object)
+    labels[rows, cols] = day_labels
+    ## Columns are labelled by their last day, as the old ISO-week pivot did.
+    last_days = np.minimum(np.arange(n_weeks) * 7 + 6 - offset, len(days) - 1)
+    week_labels = day_labels[last_days].tolist()
+    return YearLayout(_readonly(rows), _readonly(cols), _readonly(dates), _readonly(labels), week_labels)
+
+
+def year_grid(year: int, days, weights=None) -> CalendarGrid:
+    """Sum `weights` (1 per day when omitted) into the year's week grid; padding cells are NaN."""
+    layout = year_layout(year)
+    days = np.asarray(days, dtype="datetime64[D]")
+    doy = (days - np.datetime64(f"{year}-01-01", "D")).astype(np.int64)
+    in_year = (doy >= 0) & (doy < len(layout.rows))
+    if weights is not None:
+        weights = np.asarray(weights, dtype=np.float64)[in_year]
+    totals = np.bincount(doy[in_year], weights=weights, minlength=len(layout.rows))
+
+    z = np.full(layout.dates.shape, np.nan)
+    z[layout.rows, layout.cols] = totals
+    return CalendarGrid(year, z, layout.dates, layout.labels, layout.week_labels)
+
+
+def build_calendar(years: list, days, weights=None) -> list:
+    """One grid per year, oldest first."""
+    days = np.asarray(days, dtype="datetime64[D]")
+    if weights is not None:
+        weights = np.asarray(weights, dtype=np.float64)
+    return [year_grid(year, days, weights) for year in sorted(years)]
+
+
+def cell_date(grids: list, curve: int, row: int, col: int) -> Optional[datetime.date]:
+    """Date under a clicked heatmap cell, or None for padding."""
+    value = grids[curve].dates[row, col]
+    return None if np.isnat(value) else value.astype(datetime.date)
+
+
+def plot_calendar(grids: list, today: Optional[datetime.date] = None, binary: bool = True):
+    """Stacked heatmaps, one row per year; `today` is outlined when it is shown."""
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    fig = make_subplots(rows=len(grids), cols=1, vertical_spacing=0.08 if len(grids) > 1 else 0)
+    for idx, grid in enumerate(grids, start=1):
+        z = np.minimum(grid.z, 1) if binary else grid.z
+        fig.add_trace(
+            go.Heatmap(
+                z=z,
+                x=np.arange(z.shape[1]),
+                y=np.arange(7),
+                customdata=grid.z,
+                hoverongaps=False,
+                hovertext=grid.labels,
+                hovertemplate="%{hovertext}<extra>Count: %{customdata:,.0f}</extra>",
+                colorscale=PRESENCE_COLORS,
+                zmin=0,
+                showscale=False,
+                xgap=1,
+                ygap=1,
+            ),
+            row=idx,
+            col=1,
+        )
+        fig.update_xaxes(
+            tickvals=list(range(0, len(grid.week_labels), 4)),
+            ticktext=grid.week_labels[::4],
+            row=idx,
+            col=1,
+        )
+        fig.update_yaxes(tickvals=list(range(7)), ticktext=WEEKDAY_LABELS, title_text=str(grid.year), row=idx, col=1)
+
+        if today is not None and today.year == grid.year:
+            doy = today.timetuple().tm_yday - 1
+            layout = year_layout(grid.year)
+            row, col = int(layout.rows[doy]), int(layout.cols[doy])
+            fig.add_shape(
+                type="rect",
+                x0=col - 0.5,
+                x1=col + 0.5,
+                y0=row - 0.5,
+                y1=row + 0.5,
+                line=dict(color=TODAY_COLOR, width=2),
+                row=idx,
+                col=1,
+            )
+
+    fig.update_layout(
+        height=YEAR_HEIGHT * len(grids),
+        margin=dict(t=0, b=0, l=0, r=0),
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+    )
+    fig.update_xaxes(tickfont=dict(color="grey"), showgrid=False, zeroline=False)
+    fig.update_yaxes(tickfont=dict(color="grey", size=10), title_font=dict(color="grey"), showgrid=False, zeroline=False)
+    return fig
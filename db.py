@@ -2,32 +2,122 @@ import datetime
 import sqlite3
 import pandas as pd
 import json
+import logging
 import os
 import re
+import tempfile
+import threading
+import yaml
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
-port_conn = sqlite3.connect("data/my_portfolio.db", check_same_thread=False)
-goals_conn = sqlite3.connect("data/my_logs.db", check_same_thread=False)
+from tracing import traced
+
+logger = logging.getLogger(__name__)
+
+DB_PATHS = {
+    "portfolio": "data/my_portfolio.db",
+    "logs": "data/my_logs.db",
+}
 LOGS_PATH = os.environ["LOGS_PATH"]
+NOTES_PATH = os.path.join(LOGS_PATH, "notes")
+FILE_LOCKS = os.environ.get("FILE_LOCKS", "0") == "1"
+
+TODO_META_FIELDS = ["priority", "project", "edit_tstp"]
+LINK_META_FIELDS = ["title", "topic", "summary", "edit_tstp"]
+TRACKING_PARAMS = {"fbclid", "gclid"}
+PROJECT_META_FIELDS = [
+    "description",
+    "start_date",
+    "due_date",
+    "progress",
+    "status",
+    "image_url",
+]
+
+
+#################
+## CONNECTIONS ##
+#################
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+
+def get_connection(name: str) -> sqlite3.Connection:
+    """Open the named database once per thread, running schema setup on first use.
+
+    Watcher and summarizer threads write alongside the page, so each thread gets its
+    own connection (and its own transactions); SQLite's locking serializes the writers.
+    """
+    connections = _local.__dict__.setdefault("connections", {})
+    if name not in connections:
+        conn = sqlite3.connect(DB_PATHS[name], timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        connections[name] = conn
+        if name == "logs":
+            with _schema_lock:
+                if name not in _schema_ready:
+                    init_logs_schema()
+                    _schema_ready.add(name)
+    return connections[name]
+
+
+def get_port_conn() -> sqlite3.Connection:
+    return get_connection("portfolio")
+
+
+def get_goals_conn() -> sqlite3.Connection:
+    return get_connection("logs")
+
+
+def init_logs_schema() -> None:
+    """Create the tables not covered by setup.py."""
+    create_todo_tables()
+    create_projects_table()
+    create_links_table()
+    create_extractions_table()
+    create_focus_table()
+    create_log_stats_table()
+    create_notes_index_table()
+    create_search_index_table()
+    create_log_chunks_tables()
 
 
 ###############
 ## PORTFOLIO ##
 ###############
+@traced
 def get_portfolio_dates():
-    cursor = port_conn.cursor()
+    cursor = get_port_conn().cursor()
     cursor.execute("SELECT DISTINCT Date FROM portfolio")
     dates = sorted([item[0] for item in cursor.fetchall()])
     return dates
 
 
+def get_portfolio_version() -> tuple:
+    """Row count and checksum of every portfolio row, used as a cache key."""
+    cursor = get_port_conn().cursor()
+    cursor.execute("SELECT rowid, Date, Platform, Amount, Rate FROM portfolio ORDER BY rowid")
+    rows = cursor.fetchall()
+    return len(rows), zlib.crc32(repr(rows).encode())
+
+
+@traced
 def get_portfolio_ts():
-    df = pd.read_sql("SELECT * FROM portfolio", port_conn)
+    df = pd.read_sql("SELECT * FROM portfolio", get_port_conn())
     return df
 
 
+@traced
 def add_portfolio_entry(date, platform, amount, rate):
     """Add new entry to the portfolio database."""
-    cursor = port_conn.cursor()
+    conn = get_port_conn()
+    cursor = conn.cursor()
     cursor.execute(
         """
         INSERT INTO portfolio (Date, Platform, Amount, Rate)
@@ -35,34 +125,142 @@ def add_portfolio_entry(date, platform, amount, rate):
     """,
         (date, platform, amount, rate),
     )
-    port_conn.commit()
+    conn.commit()
 
 
+@traced
 def get_portfolio_data_by_date(date):
-    """Fetch data from the database for the selected date."""
-    query = "SELECT * FROM portfolio WHERE Date = ?"
-    df = pd.read_sql(query, port_conn, params=(date,))
+    """Fetch data from the database for the selected date, indexed by rowid."""
+    query = "SELECT rowid AS row_id, Date, Platform, Amount, Rate FROM portfolio WHERE Date = ?"
+    df = pd.read_sql(query, get_port_conn(), params=(date,), index_col="row_id")
     df["Allocation"] = df["Amount"] / df["Amount"].sum()
     df.sort_values(by=["Allocation"], ascending=False, inplace=True)
-    df.reset_index(drop=True, inplace=True)
     return df
 
 
-def submit_portfolio_changes(df, date):
-    """Replace data for the day in DB with the edited data."""
-    cursor = port_conn.cursor()
-    cursor.execute("DELETE FROM portfolio WHERE Date = ?", (date,))
-    port_conn.commit()
-    if len(df) > 0:
-        df = df[["Date", "Platform", "Amount", "Rate"]]
-        df.to_sql("portfolio", port_conn, if_exists="append", index=False)
-    port_conn.commit()
+@traced
+def apply_portfolio_changes(
+    df: pd.DataFrame, date, edited_rows: dict, added_rows: list, deleted_rows: list
+) -> None:
+    """Apply data_editor deltas for the day as rowid-keyed writes in one transaction.
+
+    `df` is the frame shown in the editor (indexed by rowid); the deltas use row
+    positions. Raises ValueError when the result would list a platform twice.
+    """
+    deleted_ids = {int(df.index[int(pos)]) for pos in deleted_rows}
+    updates = {}
+    for pos, changes in edited_rows.items():
+        row_id = int(df.index[int(pos)])
+        if row_id not in deleted_ids:
+            updates[row_id] = {**df.loc[row_id, ["Platform", "Amount", "Rate"]].to_dict(), **changes}
+    inserts = [row for row in added_rows if row.get("Platform")]
+
+    platforms = [
+        updates[row_id]["Platform"] if row_id in updates else df.loc[row_id, "Platform"]
+        for row_id in df.index
+        if row_id not in deleted_ids
+    ] + [row["Platform"] for row in inserts]
+    duplicates = sorted({platform for platform in platforms if platforms.count(platform) > 1})
+    if duplicates:
+        raise ValueError(f"Platform already listed for {date}: {', '.join(duplicates)}")
+
+    conn = get_port_conn()
+    with conn:
+        conn.executemany("DELETE FROM portfolio WHERE rowid = ?", [(row_id,) for row_id in deleted_ids])
+        conn.executemany(
+            "UPDATE portfolio SET Platform = ?, Amount = ?, Rate = ? WHERE rowid = ?",
+            [
+                (row["Platform"], float(row["Amount"]), float(row["Rate"]), row_id)
+                for row_id, row in updates.items()
+            ],
+        )
+        conn.executemany(
+            "INSERT INTO portfolio (Date, Platform, Amount, Rate) VALUES (?, ?, ?, ?)",
+            [
+                (date, row["Platform"], float(row.get("Amount") or 0), float(row.get("Rate") or 0))
+                for row in inserts
+            ],
+        )
+
+
+#################
+## FILE WRITES ##
+#################
+
+
+@contextmanager
+def file_lock(path: str, enabled: bool = True):
+    """Hold an exclusive advisory lock on `<path>.lock` (no-op where fcntl is unavailable)."""
+    try:
+        import fcntl
+    except ImportError:
+        enabled = False
+    if not enabled:
+        yield
+        return
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+## Read once at import: os.umask can only be queried by setting it, which is not thread-safe.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def _file_mode(path: str) -> int:
+    """Permissions of an existing file, or what a plain open() would give a new one."""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+@traced
+def atomic_write(path: str, content: str, lock: bool = FILE_LOCKS) -> None:
+    """Write a file via a synced temp file and rename, so readers never see a partial write."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    with file_lock(path, lock):
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(content)
+                f.flush()
+                ## mkstemp creates files as 0600; keep the target's mode instead.
+                os.fchmod(f.fileno(), _file_mode(path))
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        ## Persist the rename itself.
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+@traced
+def atomic_delete(path: str, lock: bool = FILE_LOCKS) -> bool:
+    """Remove a file under its lock; returns whether it existed."""
+    with file_lock(path, lock):
+        if not os.path.exists(path):
+            return False
+        os.remove(path)
+    return True
 
 
 ################
 ## DAILY LOGS ##
 ################
 
+@traced
 def get_logs_by_date(date: datetime.date, default_response: bool = True) -> str:
     """Load logs by date."""
     default_log = ""
@@ -80,18 +278,17 @@ def get_logs_by_date(date: datetime.date, default_response: bool = True) -> str:
         return f.read()
 
 
+@traced
 def save_logs_by_date(date: pd.Timestamp, content: str):
     """Save logs by date."""
     month_year = date.strftime("%Y-%m")
     day = date.strftime("%Y%m%d")
-    log_dir = os.path.join(LOGS_PATH, month_year)
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-    log_file = os.path.join(log_dir, f"{day}.md")
-    with open(log_file, "w") as f:
-        f.write(content)
+    log_file = os.path.join(LOGS_PATH, month_year, f"{day}.md")
+    atomic_write(log_file, content)
+    index_log_files([date.strftime("%Y-%m-%d")])
 
 
+@traced
 def delete_logs_by_date(date: pd.Timestamp):
     """Delete logs by date."""
     month_year = date.strftime("%Y-%m")
@@ -100,10 +297,53 @@ def delete_logs_by_date(date: pd.Timestamp):
     if not os.path.exists(log_dir):
         return
     log_file = os.path.join(log_dir, f"{day}.md")
-    if os.path.exists(log_file):
-        os.remove(log_file)
+    if atomic_delete(log_file):
+        index_log_files([date.strftime("%Y-%m-%d")])
+
+
+@traced
+def get_logs_for_period(start_date: datetime.date, end_date: datetime.date) -> dict:
+    """Load all logs in a date range with one listing per month directory."""
+    start_date = pd.Timestamp(start_date).date()
+    end_date = pd.Timestamp(end_date).date()
+    logs = {}
+    for month in pd.period_range(start_date, end_date, freq="M"):
+        log_dir = os.path.join(LOGS_PATH, month.strftime("%Y-%m"))
+        if not os.path.isdir(log_dir):
+            continue
+        for fname in sorted(os.listdir(log_dir)):
+            if not re.match(r"\d{8}\.md$", fname):
+                continue
+            date = datetime.datetime.strptime(fname[:8], "%Y%m%d").date()
+            if start_date <= date <= end_date:
+                with open(os.path.join(log_dir, fname), "r") as f:
+                    logs[date] = f.read()
+    return logs
+
+
+def scan_log_files(years: list = None) -> list:
+    """(date, mtime_ns, size) of every daily log, from one directory scan per month."""
+    month_dirs = sorted(
+        fdir for fdir in os.listdir(LOGS_PATH)
+        if re.match(r"\d{4}-\d{2}$", fdir) and (years is None or int(fdir[:4]) in years)
+    )
+    files = []
+    for fdir in month_dirs:
+        with os.scandir(os.path.join(LOGS_PATH, fdir)) as entries:
+            for entry in entries:
+                if re.match(r"\d{8}\.md$", entry.name):
+                    name, stat = entry.name, entry.stat()
+                    files.append((f"{name[:4]}-{name[4:6]}-{name[6:8]}", stat.st_mtime_ns, stat.st_size))
+    return sorted(files)
 
 
+@traced
+def get_log_sizes(year: int) -> list:
+    """(date, size in bytes) of every log file in a year."""
+    return [(date, size) for date, _, size in scan_log_files([year])]
+
+
+@traced
 def prepare_calendar_data(year: int) -> pd.DataFrame:
     """Prepares data for the creation of a calendar heatmap."""
     fdirs = os.listdir(LOGS_PATH)
@@ -129,149 +369,1488 @@ def prepare_calendar_data(year: int) -> pd.DataFrame:
     return df_year
 
 
+###############
+## LOG STATS ##
+###############
+
+
+def create_log_stats_table():
+    """Create the per-day log analytics table, refreshed from file mtimes."""
+    conn = get_goals_conn()
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS log_stats (
+            DATE TEXT PRIMARY KEY,
+            MTIME_NS INTEGER,
+            SIZE INTEGER,
+            WORDS INTEGER,
+            TERMS TEXT,
+            MOOD REAL,
+            TSTP TIMESTAMP
+        )
+    """)
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(log_stats)")]
+    if "SIZE" not in columns:
+        ## Rows without a size are recomputed on the next refresh.
+        cursor.execute("ALTER TABLE log_stats ADD COLUMN SIZE INTEGER")
+        cursor.execute("UPDATE log_stats SET MTIME_NS = NULL")
+    conn.commit()
+
+
+def log_file_path(date: str) -> str:
+    """Path of the log for an ISO date string."""
+    return os.path.join(LOGS_PATH, date[:7], date.replace("-", "") + ".md")
+
+
+@traced
+def index_log_files(dates: list, stats: bool = True, search: bool = True) -> None:
+    """Re-read the given logs into the stats and search indexes, dropping deleted ones."""
+    import log_analytics
+
+    stats_rows, search_docs, removed = [], [], []
+    for date in dates:
+        path = log_file_path(date)
+        try:
+            with open(path, "r") as f:
+                text = f.read()
+            stat = os.stat(path)
+        except FileNotFoundError:
+            removed.append(date)
+            continue
+        if stats:
+            stats_rows.append((date, stat.st_mtime_ns, stat.st_size, *log_analytics.analyze_log(text)))
+        if search:
+            search_docs.append((date, stat.st_mtime_ns, date, text))
+    if stats:
+        save_log_stats(stats_rows, removed)
+    if search:
+        save_search_documents("log", search_docs, removed)
+
+
+def get_log_stats_mtimes() -> dict:
+    """File mtimes the stored stats were computed from, by date."""
+    cursor = get_goals_conn().cursor()
+    cursor.execute("SELECT DATE, MTIME_NS FROM log_stats")
+    return dict(cursor.fetchall())
+
+
+@traced
+def save_log_stats(rows: list, removed: list = ()) -> None:
+    """Store (date, mtime_ns, size, words, terms) rows, clearing their mood, and drop removed dates."""
+    conn = get_goals_conn()
+    tstp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with conn:
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO log_stats (DATE, MTIME_NS, SIZE, WORDS, TERMS, MOOD, TSTP)
+            VALUES (?, ?, ?, ?, ?, NULL, ?)
+        """,
+            [
+                (date, mtime_ns, size, words, json.dumps(terms), tstp)
+                for date, mtime_ns, size, words, terms in rows
+            ],
+        )
+        conn.executemany("DELETE FROM log_stats WHERE DATE = ?", [(date,) for date in removed])
+
+
+@traced
+def get_log_stats(start_date: datetime.date = None, end_date: datetime.date = None) -> pd.DataFrame:
+    """Per-day size, word count, term counts and mood for an optional date range."""
+    start = str(start_date or "0000-01-01")
+    end = str(end_date or "9999-12-31")
+    df = pd.read_sql(
+        "SELECT DATE, SIZE, WORDS, TERMS, MOOD FROM log_stats WHERE DATE BETWEEN ? AND ? ORDER BY DATE",
+        get_goals_conn(),
+        params=(start, end),
+    )
+    df.columns = map(str.lower, df.columns)
+    df["date"] = pd.to_datetime(df["date"])
+    df["terms"] = df["terms"].map(json.loads)
+    df["mood"] = df["mood"].astype(float)
+    return df
+
+
+def get_log_stats_version() -> tuple:
+    """Changes whenever a log is indexed, dropped or mood-scored, used as a cache key."""
+    cursor = get_goals_conn().cursor()
+    cursor.execute("SELECT COUNT(*), TOTAL(MTIME_NS), MAX(TSTP), COUNT(MOOD) FROM log_stats")
+    return cursor.fetchone()
+
+
+def get_unscored_log_dates() -> list:
+    """Dates whose stats have no mood score yet."""
+    cursor = get_goals_conn().cursor()
+    cursor.execute("SELECT DATE FROM log_stats WHERE MOOD IS NULL ORDER BY DATE")
+    return [row[0] for row in cursor.fetchall()]
+
+
+@traced
+def save_log_moods(moods: dict) -> None:
+    """Store mood scores by date."""
+    conn = get_goals_conn()
+    with conn:
+        conn.executemany(
+            "UPDATE log_stats SET MOOD = ? WHERE DATE = ?",
+            [(float(mood), date) for date, mood in moods.items()],
+        )
+
+
+###########
+## NOTES ##
+###########
+
+
+@traced
+def strip_frontmatter(content: str) -> tuple[dict, str]:
+    """Remove YAML frontmatter from content and return both metadata and content."""
+    metadata = {}
+    if content.startswith("---"):
+        try:
+            _, fm, content = content.split("---", 2)
+            metadata = yaml.safe_load(fm)
+            content = content.strip()
+        except ValueError:
+            content = content.strip()
+    return metadata, content
+
+
+def create_notes_index_table():
+    """Create the table of note frontmatter, refreshed from file mtimes."""
+    conn = get_goals_conn()
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS notes_index (
+            FILENAME TEXT PRIMARY KEY,
+            MTIME_NS INTEGER,
+            TITLE TEXT,
+            TAGS TEXT,
+            CREATED TEXT,
+            UPDATED TEXT,
+            PREVIEW TEXT
+        )
+    """)
+    conn.commit()
+
+
+def note_filename(title: str) -> str:
+    """File name a note title is stored under."""
+    return "".join(c if c.isalnum() else "_" for c in title.lower()) + ".md"
+
+
+def _note_index_row(path: Path, content: str) -> tuple:
+    title = tags = created = updated = preview = None
+    try:
+        if content.startswith("---"):
+            _, fm, note_content = content.split("---", 2)
+            metadata = yaml.safe_load(fm) or {}
+            title = metadata.get("title")
+            tags = json.dumps(metadata.get("tags") or [])
+            created, updated = (
+                value.isoformat() if isinstance(value, datetime.date) else value and str(value)
+                for value in (metadata.get("created"), metadata.get("updated"))
+            )
+            preview = note_content.strip()[:100] + "..."
+    except Exception:
+        title = None
+    ## Notes without frontmatter keep a row (TITLE NULL) so they are not re-read.
+    return (path.name, path.stat().st_mtime_ns, title, tags, created, updated, preview)
+
+
+@traced
+def index_note_files(filenames: list, notes: bool = True, search: bool = True) -> None:
+    """Re-read the given notes into the notes and search indexes, dropping deleted ones."""
+    index_rows, search_docs, removed = [], [], []
+    for filename in filenames:
+        path = Path(NOTES_PATH) / filename
+        try:
+            content = path.read_text()
+            row = _note_index_row(path, content)
+        except FileNotFoundError:
+            removed.append(filename)
+            continue
+        index_rows.append(row)
+        _, body = strip_frontmatter(content)
+        search_docs.append((filename, row[1], row[2] or filename, body))
+
+    if notes:
+        conn = get_goals_conn()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO notes_index VALUES (?, ?, ?, ?, ?, ?, ?)", index_rows)
+            conn.executemany("DELETE FROM notes_index WHERE FILENAME = ?", [(name,) for name in removed])
+    if search:
+        save_search_documents("note", search_docs, removed)
+
+
+def scan_note_files() -> dict:
+    """mtime_ns of every note, by file name."""
+    current = {}
+    if os.path.isdir(NOTES_PATH):
+        with os.scandir(NOTES_PATH) as entries:
+            for entry in entries:
+                if entry.name.endswith(".md") and entry.is_file():
+                    current[entry.name] = entry.stat().st_mtime_ns
+    return current
+
+
+def get_notes_index_mtimes() -> dict:
+    """File mtimes the notes index was built from, by file name."""
+    cursor = get_goals_conn().cursor()
+    cursor.execute("SELECT FILENAME, MTIME_NS FROM notes_index")
+    return dict(cursor.fetchall())
+
+
+def stale_keys(current: dict, known: dict) -> list:
+    """Keys whose mtime differs between the files on disk and an index, including deletions."""
+    changed = [key for key, mtime_ns in current.items() if known.get(key) != mtime_ns]
+    return changed + [key for key in known if key not in current]
+
+
+@traced
+def refresh_notes_index() -> int:
+    """Re-index notes whose mtime changed since the last refresh; returns notes re-read."""
+    changed = stale_keys(scan_note_files(), get_notes_index_mtimes())
+    if changed:
+        index_note_files(changed, search=False)
+    return len(changed)
+
+
+@traced
+def load_notes_metadata(refresh: bool = True) -> pd.DataFrame:
+    """Load metadata from all notes; `refresh` rescans the notes directory first."""
+    if refresh:
+        refresh_notes_index()
+    df = pd.read_sql(
+        """
+        SELECT TITLE AS title, TAGS AS tags, CREATED AS created, UPDATED AS updated,
+               PREVIEW AS content_preview, FILENAME AS filename
+        FROM notes_index
+        WHERE TITLE IS NOT NULL
+    """,
+        get_goals_conn(),
+    )
+    if not df.empty:
+        df["tags"] = df["tags"].map(json.loads)
+        df["created"] = pd.to_datetime(df["created"], format="ISO8601")
+        df["updated"] = pd.to_datetime(df["updated"], format="ISO8601")
+        df = df.sort_values("updated", ascending=False)
+    return df
+
+
+@traced
+def get_note(filename: str) -> tuple:
+    """(metadata, content) of a note, or ({}, "") when it does not exist."""
+    note_path = os.path.join(NOTES_PATH, filename)
+    if not os.path.exists(note_path):
+        return {}, ""
+    with open(note_path, "r") as f:
+        return strip_frontmatter(f.read())
+
+
+@traced
+def save_note(title: str, content: str, tags=None) -> str:
+    """Save a note with metadata; returns its file name, or None without a title."""
+    if not title:
+        return None
+    _, content = strip_frontmatter(content)
+    now = datetime.datetime.now().isoformat()
+    metadata = {"title": title, "tags": tags or [], "created": now, "updated": now}
+
+    filename = note_filename(title)
+    filepath = os.path.join(NOTES_PATH, filename)
+    with file_lock(filepath, FILE_LOCKS):
+        ## If the note exists, preserve its creation date.
+        old_metadata, _ = get_note(filename)
+        if old_metadata:
+            metadata["created"] = old_metadata.get("created", metadata["created"])
+        full_content = f"""---
+{yaml.dump(metadata)}---
+{content.strip()}"""
+        atomic_write(filepath, full_content, lock=False)
+    index_note_files([filename])
+    return filename
+
+
+@traced
+def delete_note(filename: str) -> bool:
+    """Delete a note and its index entry."""
+    deleted = atomic_delete(os.path.join(NOTES_PATH, filename))
+    index_note_files([filename])
+    return deleted
+
+
+##################
+## SEARCH INDEX ##
+##################
+
+
+def create_search_index_table():
+    """Create the full-text index over logs and notes."""
+    conn = get_goals_conn()
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+            KIND UNINDEXED,
+            KEY UNINDEXED,
+            MTIME_NS UNINDEXED,
+            TITLE,
+            BODY,
+            tokenize = 'porter unicode61'
+        )
+    """)
+    conn.commit()
+
+
+def get_search_index_mtimes(kind: str) -> dict:
+    """File mtimes the indexed documents of a kind were built from, by key."""
+    cursor = get_goals_conn().cursor()
+    cursor.execute("SELECT KEY, MTIME_NS FROM search_index WHERE KIND = ?", (kind,))
+    return dict(cursor.fetchall())
+
+
+@traced
+def save_search_documents(kind: str, docs: list, removed: list = ()) -> None:
+    """Replace (key, mtime_ns, title, body) documents of a kind and drop removed keys."""
+    conn = get_goals_conn()
+    keys = [doc[0] for doc in docs] + list(removed)
+    with conn:
+        conn.executemany(
+            "DELETE FROM search_index WHERE KIND = ? AND KEY = ?", [(kind, key) for key in keys]
+        )
+        conn.executemany(
+            "INSERT INTO search_index (KIND, KEY, MTIME_NS, TITLE, BODY) VALUES (?, ?, ?, ?, ?)",
+            [(kind, *doc) for doc in docs],
+        )
+
+
+@traced
+def search_documents(query: str, kinds: list = None, limit: int = 20) -> pd.DataFrame:
+    """Best full-text matches for a query with a highlighted snippet, ranked by BM25."""
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        return pd.DataFrame(columns=["kind", "key", "title", "snippet"])
+    match = " ".join(f'"{term}"' for term in terms)
+    kinds = kinds or ["log", "note"]
+    placeholders = ", ".join("?" for _ in kinds)
+    return pd.read_sql(
+        f"""
+        SELECT KIND AS kind, KEY AS key, TITLE AS title,
+               snippet(search_index, 4, '**', '**', '…', 16) AS snippet
+        FROM search_index
+        WHERE search_index MATCH ? AND KIND IN ({placeholders})
+        ORDER BY bm25(search_index)
+        LIMIT ?
+    """,
+        get_goals_conn(),
+        params=(match, *kinds, limit),
+    )
+
+
 ################
-## TO-DO LIST ##
+## LOG CHUNKS ##
 ################
 
 
-def get_todo_data() -> pd.DataFrame:
-    """Fetch data from the database for the selected date."""
-    query = "SELECT * FROM todo"
-    df = pd.read_sql(query, goals_conn)
+def create_log_chunks_tables():
+    """Create the metadata tables of the chunk vector store (vectors live in a memmap file)."""
+    conn = get_goals_conn()
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS log_chunks (
+            ROW INTEGER PRIMARY KEY,
+            KIND TEXT,
+            KEY TEXT,
+            CHUNK INTEGER,
+            HEADING TEXT,
+            TEXT TEXT,
+            ACTIVE INTEGER DEFAULT 1
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_log_chunks_key ON log_chunks (KIND, KEY)")
+    ## Checkpoint: the source versions whose chunks are fully written.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS log_chunk_sources (
+            KIND TEXT,
+            KEY TEXT,
+            VERSION INTEGER,
+            PRIMARY KEY (KIND, KEY)
+        )
+    """)
+    conn.commit()
+
+
+def get_chunk_source_versions(kind: str) -> dict:
+    """Versions (file mtimes) of the sources fully written to the chunk store, by key."""
+    cursor = get_goals_conn().cursor()
+    cursor.execute("SELECT KEY, VERSION FROM log_chunk_sources WHERE KIND = ?", (kind,))
+    return dict(cursor.fetchall())
+
+
+def get_chunk_row_count() -> int:
+    """Number of vector rows the committed chunk metadata accounts for."""
+    cursor = get_goals_conn().cursor()
+    cursor.execute("SELECT COALESCE(MAX(ROW) + 1, 0) FROM log_chunks")
+    return cursor.fetchone()[0]
+
+
+@traced
+def save_log_chunks(chunks: list, started: list, finished: dict, removed: list = ()) -> None:
+    """Commit one batch of the chunk pipeline in a single transaction.
+
+    `chunks` are (row, kind, key, chunk, heading, text) records; sources in `started`
+    ((kind, key) pairs) retire their previously written chunks, `finished` maps
+    (kind, key) to the version now fully written, and `removed` sources are dropped.
+    """
+    conn = get_goals_conn()
+    first_row = min((chunk[0] for chunk in chunks), default=None)
+    with conn:
+        if first_row is not None:
+            conn.executemany(
+                "UPDATE log_chunks SET ACTIVE = 0 WHERE KIND = ? AND KEY = ? AND ROW < ?",
+                [(kind, key, first_row) for kind, key in started],
+            )
+        conn.executemany(
+            "INSERT INTO log_chunks (ROW, KIND, KEY, CHUNK, HEADING, TEXT) VALUES (?, ?, ?, ?, ?, ?)",
+            chunks,
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO log_chunk_sources (KIND, KEY, VERSION) VALUES (?, ?, ?)",
+            [(kind, key, version) for (kind, key), version in finished.items()],
+        )
+        conn.executemany(
+            "UPDATE log_chunks SET ACTIVE = 0 WHERE KIND = ? AND KEY = ?", list(removed)
+        )
+        conn.executemany(
+            "DELETE FROM log_chunk_sources WHERE KIND = ? AND KEY = ?", list(removed)
+        )
+
+
+def get_active_chunk_rows(kinds: list = None, exclude_keys: list = ()) -> list:
+    """Vector rows of the live chunks, optionally limited to some kinds and excluding keys."""
+    kinds = kinds or ["log"]
+    query = f"SELECT ROW FROM log_chunks WHERE ACTIVE = 1 AND KIND IN ({', '.join('?' for _ in kinds)})"
+    params = list(kinds)
+    if exclude_keys:
+        query += f" AND KEY NOT IN ({', '.join('?' for _ in exclude_keys)})"
+        params += list(exclude_keys)
+    cursor = get_goals_conn().cursor()
+    cursor.execute(query + " ORDER BY ROW", params)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def get_live_chunk_rows() -> list:
+    """Vector rows of every active chunk, in order."""
+    cursor = get_goals_conn().cursor()
+    cursor.execute("SELECT ROW FROM log_chunks WHERE ACTIVE = 1 ORDER BY ROW")
+    return [row[0] for row in cursor.fetchall()]
+
+
+@traced
+def compact_log_chunks(rows: list, swap: Callable[[], None]) -> None:
+    """Drop retired chunks and renumber the live `rows` 0..n-1 in their current order.
+
+    `swap` (installing the matching vector file) runs inside the transaction, so a
+    failed swap rolls the renumbering back.
+    """
+    conn = get_goals_conn()
+    with conn:
+        conn.execute("DELETE FROM log_chunks WHERE ACTIVE = 0")
+        ## Ascending order never moves a row onto one that is still waiting to move.
+        conn.executemany(
+            "UPDATE log_chunks SET ROW = ? WHERE ROW = ?",
+            [(new_row, old_row) for new_row, old_row in enumerate(rows) if new_row != old_row],
+        )
+        swap()
+
+
+def get_log_chunks(rows: list) -> dict:
+    """Chunk records by vector row."""
+    if not rows:
+        return {}
+    cursor = get_goals_conn().cursor()
+    cursor.execute(
+        f"SELECT ROW, KIND, KEY, CHUNK, HEADING, TEXT FROM log_chunks WHERE ROW IN ({', '.join('?' for _ in rows)})",
+        list(rows),
+    )
+    columns = ["row", "kind", "key", "chunk", "heading", "text"]
+    return {record[0]: dict(zip(columns, record)) for record in cursor.fetchall()}
+
+
+def reset_log_chunks() -> None:
+    """Forget every chunk (e.g. after switching embedding models)."""
+    conn = get_goals_conn()
+    with conn:
+        conn.execute("DELETE FROM log_chunks")
+        conn.execute("DELETE FROM log_chunk_sources")
+
+
+##################
+## META COLUMNS ##
+##################
+
+
+@traced
+def read_meta_frame(table: str, columns: list, meta_fields: list) -> pd.DataFrame:
+    """Read a table with its JSON META expanded into flat columns by SQLite."""
+    meta_exprs = [f"json_extract(META, '$.{field}') AS {field}" for field in meta_fields]
+    query = f"""
+        SELECT {", ".join(columns + meta_exprs)}
+        FROM {table}
+        WHERE META IS NOT NULL
+    """
+    df = pd.read_sql(query, get_goals_conn())
     df.columns = map(str.lower, df.columns)
-    df["status"] = df["status"].map({0: False, 1: True})
+    return df
+
+
+@traced
+def pack_meta_frame(df: pd.DataFrame, meta_fields: list) -> pd.DataFrame:
+    """Collapse flat META columns back into a JSON `meta` column for storage."""
+    df = df.copy()
+    meta_df = pd.DataFrame(index=df.index)
+    for field in meta_fields:
+        values = df[field] if field in df.columns else pd.Series(None, index=df.index)
+        values = values.astype(object)
+        values = values.where(values.notna(), None)
+        meta_df[field] = values.map(
+            lambda x: x.strftime("%Y-%m-%d %H:%M:%S")
+            if isinstance(x, datetime.datetime)
+            else x
+        )
+    df.drop(columns=[f for f in meta_fields if f in df.columns], inplace=True)
+    df["meta"] = [json.dumps(record) for record in meta_df.to_dict("records")]
+    return df
+
+
+################
+## TO-DO LIST ##
+################
+
+
+def _type_todo_frame(df: pd.DataFrame) -> pd.DataFrame:
+    df["status"] = df["status"].astype(int) == 1
     df["tstp"] = pd.to_datetime(df["tstp"])
-    df.dropna(subset=["meta"], inplace=True)
-    df["meta"] = df["meta"].apply(json.loads)
+    df["edit_tstp"] = pd.to_datetime(df["edit_tstp"], errors="coerce")
+    return df.astype({"type": "category", "priority": "category", "project": "category"})
+
+
+@traced
+def get_todo_data() -> pd.DataFrame:
+    """Fetch the to-do list with META expanded into typed columns."""
+    df = read_meta_frame("todo", ["ID", "NAME", "TYPE", "STATUS", "TSTP"], TODO_META_FIELDS)
+    df = _type_todo_frame(df)
     df.sort_values(by=["status", "tstp"], ascending=True, inplace=True)
     df.reset_index(drop=True, inplace=True)
     return df
 
 
-def add_todo_item(todo_name: str, type: str, meta: dict, status: bool = False) -> None:
-    """Add entry to the to-do list."""
-    tstp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    status = 1 if status else 0
-    cursor = goals_conn.cursor()
+@traced
+def get_open_todo_names() -> list:
+    """Names of the pending to-dos."""
+    cursor = get_goals_conn().cursor()
+    cursor.execute("SELECT NAME FROM todo WHERE META IS NOT NULL AND STATUS = 0")
+    return [row[0] for row in cursor.fetchall()]
+
+
+def get_todo_version() -> tuple:
+    """Cheap change marker for the to-do table: latest journal entry and latest snapshot.
+
+    Writes that bypass the journal (bulk imports) are followed by a forced snapshot,
+    so the snapshot ID moves even when the journal does not.
+    """
+    cursor = get_goals_conn().cursor()
     cursor.execute(
-        """
-        INSERT INTO todo (NAME, TYPE, STATUS, META, TSTP)
-        VALUES (?, ?, ?, ?, ?)
-    """,
-        (todo_name, type, status, json.dumps(meta), tstp),
+        "SELECT (SELECT COALESCE(MAX(SEQ), 0) FROM todo_journal), (SELECT COALESCE(MAX(ID), 0) FROM todo_snapshots)"
     )
-    goals_conn.commit()
+    return cursor.fetchone()
+
+
+def _todo_filter_clause(
+    pending_only: bool, types: list = None, projects: list = None, priorities: list = None
+) -> tuple:
+    """WHERE conditions and parameters for the to-do filters."""
+    conditions, params = ["META IS NOT NULL"], []
+    if pending_only:
+        conditions.append("STATUS = 0")
+    for expr, values in [
+        ("TYPE", types),
+        ("json_extract(META, '$.project')", projects),
+        ("json_extract(META, '$.priority')", priorities),
+    ]:
+        if values:
+            conditions.append(f"{expr} IN ({', '.join('?' for _ in values)})")
+            params.extend(values)
+    return conditions, params
+
+
+@traced
+def get_todo_page(
+    pending_only: bool = True,
+    types: list = None,
+    projects: list = None,
+    priorities: list = None,
+    after: tuple = None,
+    limit: int = 50,
+) -> pd.DataFrame:
+    """One window of the to-do list in (status, tstp, id) order, filtered and paged in SQL.
+
+    `after` is the (status, tstp, id) key of the last row of the previous page.
+    """
+    conditions, params = _todo_filter_clause(pending_only, types, projects, priorities)
+    if after is not None:
+        conditions.append("(STATUS, TSTP, ID) > (?, ?, ?)")
+        params.extend(after)
+    meta_exprs = [f"json_extract(META, '$.{field}') AS {field}" for field in TODO_META_FIELDS]
+    query = f"""
+        SELECT ID, NAME, TYPE, STATUS, TSTP, {", ".join(meta_exprs)}
+        FROM todo
+        WHERE {" AND ".join(conditions)}
+        ORDER BY STATUS, TSTP, ID
+        LIMIT ?
+    """
+    cursor = get_goals_conn().cursor()
+    cursor.execute(query, params + [limit])
+    df = pd.DataFrame(cursor.fetchall(), columns=[d[0].lower() for d in cursor.description])
+    ## Keep the raw keys so the caller can page on from the last row.
+    df["page_key"] = list(zip(df["status"], df["tstp"], df["id"]))
+    return _type_todo_frame(df)
+
 
+@traced
+def count_todos(
+    pending_only: bool = True, types: list = None, projects: list = None, priorities: list = None
+) -> int:
+    """Number of to-dos matching the filters."""
+    conditions, params = _todo_filter_clause(pending_only, types, projects, priorities)
+    cursor = get_goals_conn().cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM todo WHERE {' AND '.join(conditions)}", params)
+    return cursor.fetchone()[0]
 
+
+@traced
+def get_todo_filter_options() -> dict:
+    """Distinct types, projects and priorities for the filter widgets."""
+    cursor = get_goals_conn().cursor()
+    options = {}
+    for key, expr in [
+        ("types", "TYPE"),
+        ("projects", "json_extract(META, '$.project')"),
+        ("priorities", "json_extract(META, '$.priority')"),
+    ]:
+        cursor.execute(f"SELECT DISTINCT {expr} FROM todo WHERE {expr} IS NOT NULL AND {expr} != '' ORDER BY 1")
+        options[key] = [row[0] for row in cursor.fetchall()]
+    return options
+
+
+@traced
+def add_todo_item(todo_name: str, type: str, meta: dict, status: bool = False) -> int:
+    """Add entry to the to-do list and return its ID."""
+    conn = get_goals_conn()
+    tstp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    row = {"NAME": todo_name, "TYPE": type, "STATUS": 1 if status else 0, "META": json.dumps(meta), "TSTP": tstp}
+    with conn:
+        cursor = conn.cursor()
+        todo_id = _insert_todo_row(cursor, row)
+        _journal_todo_changes(cursor, [(todo_id, "insert", None, row)], "add")
+    return todo_id
+
+
+@traced
 def nuke_todo_list() -> None:
     """Delete all tasks from the do list."""
-    cursor = goals_conn.cursor()
-    cursor.execute("DELETE FROM todo")
-    goals_conn.commit()
+    conn = get_goals_conn()
+    with conn:
+        cursor = conn.cursor()
+        current = _read_todo_rows(cursor)
+        cursor.execute("DELETE FROM todo")
+        _journal_todo_changes(
+            cursor, [(todo_id, "delete", row, None) for todo_id, row in current.items()], "nuke"
+        )
 
 
+@traced
 def replace_todo_list(df: pd.DataFrame) -> None:
-    """Replace the do list with the edited data."""
-    df = df.copy()
-    cursor = goals_conn.cursor()
-    with goals_conn:
-        cursor.execute("DELETE FROM todo")
-        if len(df) > 0:
-            df["meta"] = df["meta"].apply(json.dumps)
-            df["tstp"] = df["tstp"].apply(lambda x: x.strftime("%Y-%m-%d %H:%M:%S"))
-            df.to_sql("todo", goals_conn, if_exists="replace", index=False)
+    """Replace the do list with the edited data, writing and journaling only the rows that changed."""
+    conn = get_goals_conn()
+    df = pack_meta_frame(df, TODO_META_FIELDS)
+    target, new_rows = {}, []
+    for record in df.to_dict("records"):
+        row = {
+            "NAME": record["name"],
+            "TYPE": record["type"],
+            "STATUS": 1 if record["status"] else 0,
+            "META": record["meta"],
+            "TSTP": pd.Timestamp(record["tstp"]).strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        todo_id = record.get("id")
+        if todo_id is None or pd.isna(todo_id):
+            new_rows.append(row)
+        else:
+            target[int(todo_id)] = row
+    with conn:
+        _apply_todo_state(conn.cursor(), target, new_rows, "edit")
+
+
+@traced
+def apply_todo_changes(
+    updates: dict = None, inserts: list = None, deletes: list = None, source: str = "edit"
+) -> list:
+    """Keyed writes: update {id: {field: value}}, insert flat records and delete IDs in one journaled transaction.
+
+    Only the touched rows are read and written. Returns the IDs of inserted rows.
+    """
+    updates, inserts, deletes = updates or {}, inserts or [], deletes or []
+    conn = get_goals_conn()
+    new_ids = []
+    with conn:
+        cursor = conn.cursor()
+        current = _read_todo_rows(cursor, list(updates) + list(deletes))
+        changes = []
+        for todo_id in deletes:
+            if todo_id in current:
+                cursor.execute("DELETE FROM todo WHERE ID = ?", (todo_id,))
+                changes.append((todo_id, "delete", current[todo_id], None))
+        for todo_id, fields in updates.items():
+            if todo_id not in current or todo_id in deletes:
+                continue
+            row = _merge_todo_fields(current[todo_id], fields)
+            if not _same_todo_row(current[todo_id], row):
+                cursor.execute(
+                    f"UPDATE todo SET {', '.join(f'{field} = ?' for field in TODO_ROW_FIELDS)} WHERE ID = ?",
+                    [row[field] for field in TODO_ROW_FIELDS] + [todo_id],
+                )
+                changes.append((todo_id, "update", current[todo_id], row))
+        now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        for record in inserts:
+            record = {key: value for key, value in record.items() if key != "id"}
+            row = _merge_todo_fields(
+                {"NAME": None, "TYPE": None, "STATUS": 0, "META": "{}", "TSTP": now}, record
+            )
+            todo_id = _insert_todo_row(cursor, row)
+            new_ids.append(todo_id)
+            changes.append((todo_id, "insert", None, row))
+        _journal_todo_changes(cursor, changes, source)
+    return new_ids
+
+
+##################
+## TODO JOURNAL ##
+##################
+
+TODO_ROW_FIELDS = ["NAME", "TYPE", "STATUS", "META", "TSTP"]
+SNAPSHOT_EVERY = 500
+UNDO_DEPTH = 50
+
+
+def create_todo_tables():
+    """Create the to-do table, its change journal and snapshots; take a baseline snapshot if none exists."""
+    conn = get_goals_conn()
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(todo)")
+    columns = [row[1].upper() for row in cursor.fetchall()]
+    if columns and "ID" not in columns:
+        ## A bulk replace used to recreate the table without its ID column.
+        cursor.execute("ALTER TABLE todo RENAME TO todo_old")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS todo (
+            ID INTEGER PRIMARY KEY AUTOINCREMENT,
+            NAME TEXT,
+            TYPE TEXT,
+            STATUS INTEGER,
+            META JSONB,
+            TSTP TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    if columns and "ID" not in columns:
+        cursor.execute(
+            "INSERT INTO todo (NAME, TYPE, STATUS, META, TSTP) SELECT NAME, TYPE, STATUS, META, TSTP FROM todo_old"
+        )
+        cursor.execute("DROP TABLE todo_old")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS todo_journal (
+            SEQ INTEGER PRIMARY KEY AUTOINCREMENT,
+            TXN INTEGER,
+            TODO_ID INTEGER,
+            OP TEXT,
+            BEFORE TEXT,
+            AFTER TEXT,
+            TSTP TIMESTAMP,
+            SOURCE TEXT
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_todo_status_tstp ON todo (STATUS, TSTP, ID)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_todo_journal_tstp ON todo_journal (TSTP)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_todo_journal_txn ON todo_journal (TXN)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS todo_undo_stack (
+            TXN INTEGER PRIMARY KEY,
+            UNDONE INTEGER DEFAULT 0
+        )
+    """)
+    ## Snapshots get their own key: several may cover the same journal entry (e.g. around a bulk import).
+    cursor.execute("PRAGMA table_info(todo_snapshots)")
+    snapshot_columns = [row[1].upper() for row in cursor.fetchall()]
+    if snapshot_columns and "ID" not in snapshot_columns:
+        cursor.execute("ALTER TABLE todo_snapshots RENAME TO todo_snapshots_old")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS todo_snapshots (
+            ID INTEGER PRIMARY KEY AUTOINCREMENT,
+            SEQ INTEGER,
+            TSTP TIMESTAMP,
+            ROWS BLOB
+        )
+    """)
+    if snapshot_columns and "ID" not in snapshot_columns:
+        cursor.execute(
+            "INSERT INTO todo_snapshots (SEQ, TSTP, ROWS) SELECT SEQ, TSTP, ROWS FROM todo_snapshots_old ORDER BY SEQ"
+        )
+        cursor.execute("DROP TABLE todo_snapshots_old")
+    cursor.execute("SELECT COUNT(*) FROM todo_snapshots")
+    if cursor.fetchone()[0] == 0:
+        _write_todo_snapshot(cursor)
+    conn.commit()
+
+
+def _read_todo_rows(cursor, ids: list = None) -> dict:
+    query = f"SELECT ID, {', '.join(TODO_ROW_FIELDS)} FROM todo"
+    if ids is not None:
+        query += f" WHERE ID IN ({', '.join('?' for _ in ids)})"
+    cursor.execute(query, ids or [])
+    return {row[0]: dict(zip(TODO_ROW_FIELDS, row[1:])) for row in cursor.fetchall()}
+
+
+def _todo_value(value):
+    """Plain SQLite/JSON value for a frame or editor cell."""
+    if value is None or (not isinstance(value, (str, list, dict)) and pd.isna(value)):
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def _merge_todo_fields(row: dict, fields: dict) -> dict:
+    """Apply flat field values (name, status, priority, ...) to a stored row image."""
+    row = dict(row)
+    meta = json.loads(row.get("META") or "{}")
+    for field, value in fields.items():
+        value = _todo_value(value)
+        if field in TODO_META_FIELDS:
+            meta[field] = value
+        elif field == "status":
+            row["STATUS"] = 1 if value else 0
+        elif field == "tstp":
+            row["TSTP"] = pd.Timestamp(value).strftime("%Y-%m-%d %H:%M:%S")
+        elif field.upper() in TODO_ROW_FIELDS:
+            row[field.upper()] = value
+    row["META"] = json.dumps(meta)
+    return row
+
+
+def _same_todo_row(a: dict, b: dict) -> bool:
+    """Compare row images, ignoring META key order and missing keys."""
+    for field in ["NAME", "TYPE", "TSTP"]:
+        if a[field] != b[field]:
+            return False
+    if int(a["STATUS"] or 0) != int(b["STATUS"] or 0):
+        return False
+    meta_a, meta_b = json.loads(a["META"] or "{}"), json.loads(b["META"] or "{}")
+    return all(meta_a.get(field) == meta_b.get(field) for field in TODO_META_FIELDS)
+
+
+def _insert_todo_row(cursor, row: dict, todo_id=None) -> int:
+    cursor.execute(
+        f"INSERT INTO todo (ID, {', '.join(TODO_ROW_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?)",
+        [todo_id] + [row[field] for field in TODO_ROW_FIELDS],
+    )
+    return cursor.lastrowid
 
 
-def backup_todo_list() -> None:
-    """Backup the current to-do list."""
-    cursor = goals_conn.cursor()
-    cursor.execute("SELECT * FROM todo")
-    df = pd.DataFrame(
-        cursor.fetchall(), columns=[desc[0] for desc in cursor.description]
+def _journal_todo_changes(cursor, changes: list, source: str) -> None:
+    """Append (todo_id, op, before, after) changes to the journal as one transaction number.
+
+    Edits are pushed on the undo stack; undo/redo transactions themselves are not.
+    """
+    if len(changes) == 0:
+        return
+    cursor.execute("SELECT COALESCE(MAX(TXN), 0) + 1 FROM todo_journal")
+    txn = cursor.fetchone()[0]
+    tstp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+    cursor.executemany(
+        """
+        INSERT INTO todo_journal (TXN, TODO_ID, OP, BEFORE, AFTER, TSTP, SOURCE)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """,
+        [
+            (
+                txn,
+                todo_id,
+                op,
+                json.dumps(before) if before is not None else None,
+                json.dumps(after) if after is not None else None,
+                tstp,
+                source,
+            )
+            for todo_id, op, before, after in changes
+        ],
     )
-    import streamlit as st
+    if source not in ("undo", "redo"):
+        ## A fresh edit starts a new branch: push it and drop anything left to redo.
+        cursor.execute("DELETE FROM todo_undo_stack WHERE UNDONE = 1")
+        cursor.execute("INSERT INTO todo_undo_stack (TXN, UNDONE) VALUES (?, 0)", (txn,))
+        cursor.execute(
+            "DELETE FROM todo_undo_stack WHERE TXN NOT IN (SELECT TXN FROM todo_undo_stack ORDER BY TXN DESC LIMIT ?)",
+            (UNDO_DEPTH,),
+        )
+    cursor.execute("SELECT MAX(SEQ) FROM todo_snapshots")
+    last_snapshot = cursor.fetchone()[0] or 0
+    cursor.execute("SELECT COUNT(*) FROM todo_journal WHERE SEQ > ?", (last_snapshot,))
+    if cursor.fetchone()[0] >= SNAPSHOT_EVERY:
+        _write_todo_snapshot(cursor)
 
-    df.to_pickle("todo_backup.pkl")
 
+def _apply_todo_state(cursor, target: dict, new_rows: list, source: str) -> int:
+    """Bring the table to `target` (ID -> row) plus `new_rows`, journaling each change; returns the change count."""
+    current = _read_todo_rows(cursor)
+    changes = []
+    for todo_id in current.keys() - target.keys():
+        cursor.execute("DELETE FROM todo WHERE ID = ?", (todo_id,))
+        changes.append((todo_id, "delete", current[todo_id], None))
+    for todo_id, row in target.items():
+        if todo_id not in current:
+            _insert_todo_row(cursor, row, todo_id)
+            changes.append((todo_id, "insert", None, row))
+        elif not _same_todo_row(current[todo_id], row):
+            cursor.execute(
+                f"UPDATE todo SET {', '.join(f'{field} = ?' for field in TODO_ROW_FIELDS)} WHERE ID = ?",
+                [row[field] for field in TODO_ROW_FIELDS] + [todo_id],
+            )
+            changes.append((todo_id, "update", current[todo_id], row))
+    for row in new_rows:
+        changes.append((_insert_todo_row(cursor, row), "insert", None, row))
+    _journal_todo_changes(cursor, changes, source)
+    return len(changes)
 
-def restore_todo_list() -> None:
-    """Restore the to-do list from the backup."""
-    cursor = goals_conn.cursor()
-    cursor.execute("DELETE FROM todo")
-    goals_conn.commit()
-    df = pd.read_pickle("data/todo_backup.pkl")
-    df.columns = map(str.lower, df.columns)
-    if len(df) > 0:
-        df.to_sql("todo", goals_conn, if_exists="replace", index=False)
-    goals_conn.commit()
+
+def _write_todo_snapshot(cursor) -> None:
+    """Store a compressed image of the whole table, tagged with the latest journal entry."""
+    cursor.execute("SELECT COALESCE(MAX(SEQ), 0) FROM todo_journal")
+    seq = cursor.fetchone()[0]
+    rows = {str(todo_id): row for todo_id, row in _read_todo_rows(cursor).items()}
+    cursor.execute(
+        "INSERT INTO todo_snapshots (SEQ, TSTP, ROWS) VALUES (?, ?, ?)",
+        (seq, datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f"), zlib.compress(json.dumps(rows).encode())),
+    )
+
+
+def _replay_todo_txn(cursor, txn: int, reverse: bool) -> list:
+    """Re-apply (or invert) one journaled transaction with targeted statements; returns the changes made."""
+    cursor.execute(
+        "SELECT TODO_ID, OP, BEFORE, AFTER FROM todo_journal WHERE TXN = ? ORDER BY SEQ", (txn,)
+    )
+    entries = cursor.fetchall()
+    changes = []
+    for todo_id, op, before, after in reversed(entries) if reverse else entries:
+        before = json.loads(before) if before else None
+        after = json.loads(after) if after else None
+        if reverse:
+            op, before, after = {"insert": "delete", "delete": "insert"}.get(op, op), after, before
+        if op == "delete":
+            cursor.execute("DELETE FROM todo WHERE ID = ?", (todo_id,))
+        else:
+            cursor.execute(
+                f"INSERT OR REPLACE INTO todo (ID, {', '.join(TODO_ROW_FIELDS)}) VALUES (?, ?, ?, ?, ?, ?)",
+                [todo_id] + [after[field] for field in TODO_ROW_FIELDS],
+            )
+        changes.append((todo_id, op, before, after))
+    return changes
+
+
+@traced
+def undo_todo_change() -> bool:
+    """Revert the latest todo transaction still on the undo stack."""
+    conn = get_goals_conn()
+    with conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT MAX(TXN) FROM todo_undo_stack WHERE UNDONE = 0")
+        txn = cursor.fetchone()[0]
+        if txn is None:
+            return False
+        _journal_todo_changes(cursor, _replay_todo_txn(cursor, txn, reverse=True), "undo")
+        cursor.execute("UPDATE todo_undo_stack SET UNDONE = 1 WHERE TXN = ?", (txn,))
+    return True
+
+
+@traced
+def redo_todo_change() -> bool:
+    """Re-apply the most recently undone todo transaction."""
+    conn = get_goals_conn()
+    with conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT MIN(TXN) FROM todo_undo_stack WHERE UNDONE = 1")
+        txn = cursor.fetchone()[0]
+        if txn is None:
+            return False
+        _journal_todo_changes(cursor, _replay_todo_txn(cursor, txn, reverse=False), "redo")
+        cursor.execute("UPDATE todo_undo_stack SET UNDONE = 0 WHERE TXN = ?", (txn,))
+    return True
+
+
+def get_todo_undo_status() -> tuple:
+    """Number of todo transactions that can be undone and redone."""
+    cursor = get_goals_conn().cursor()
+    cursor.execute("SELECT SUM(UNDONE = 0), SUM(UNDONE = 1) FROM todo_undo_stack")
+    n_undo, n_redo = cursor.fetchone()
+    return n_undo or 0, n_redo or 0
+
+
+@traced
+def backup_todo_list(force: bool = False) -> None:
+    """Compact the journal into a snapshot if anything changed since the last one.
+
+    Use `force` after writes that bypass the journal, such as bulk imports.
+    """
+    conn = get_goals_conn()
+    with conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(SEQ), 0) FROM todo_snapshots")
+        last_snapshot = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) FROM todo_journal WHERE SEQ > ?", (last_snapshot,))
+        if force or cursor.fetchone()[0] > 0:
+            _write_todo_snapshot(cursor)
+
+
+@traced
+def get_todo_state_at(as_of: datetime.datetime) -> dict:
+    """Rebuild the to-do table (ID -> row) as of a timestamp from the nearest snapshot plus the journal."""
+    as_of = pd.Timestamp(as_of).strftime("%Y-%m-%d %H:%M:%S.%f")
+    cursor = get_goals_conn().cursor()
+    cursor.execute(
+        "SELECT SEQ, ROWS FROM todo_snapshots WHERE TSTP <= ? ORDER BY ID DESC LIMIT 1", (as_of,)
+    )
+    snapshot = cursor.fetchone()
+    if snapshot is None:
+        ## Before the first snapshot: replay forward from the earliest one instead.
+        cursor.execute("SELECT SEQ, ROWS FROM todo_snapshots ORDER BY ID LIMIT 1")
+        snapshot = cursor.fetchone()
+    seq, rows = snapshot if snapshot else (0, zlib.compress(b"{}"))
+    state = {int(todo_id): row for todo_id, row in json.loads(zlib.decompress(rows)).items()}
+    cursor.execute(
+        "SELECT TODO_ID, OP, AFTER FROM todo_journal WHERE SEQ > ? AND TSTP <= ? ORDER BY SEQ",
+        (seq, as_of),
+    )
+    for todo_id, op, after in cursor.fetchall():
+        if op == "delete":
+            state.pop(todo_id, None)
+        else:
+            state[todo_id] = json.loads(after)
+    return state
+
+
+@traced
+def restore_todo_list(as_of: datetime.datetime = None) -> int:
+    """Restore the to-do list to its state at a timestamp (default: the latest snapshot) in one transaction."""
+    conn = get_goals_conn()
+    if as_of is None:
+        as_of = get_todo_restore_points()[0]
+    target = get_todo_state_at(as_of)
+    with conn:
+        return _apply_todo_state(conn.cursor(), target, [], "restore")
+
+
+@traced
+def get_todo_restore_points() -> list:
+    """Snapshot timestamps, newest first."""
+    cursor = get_goals_conn().cursor()
+    cursor.execute("SELECT TSTP FROM todo_snapshots ORDER BY ID DESC")
+    return [pd.Timestamp(row[0]).to_pydatetime() for row in cursor.fetchall()]
+
+
+#######################
+## TO-DO EXTRACTIONS ##
+#######################
+
+
+def create_extractions_table():
+    """Create the table remembering which log content was already sent for extraction."""
+    conn = get_goals_conn()
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS todo_extractions (
+            DATE DATE,
+            HASHES TEXT,
+            SUGGESTIONS TEXT,
+            TSTP TIMESTAMP
+        )
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_todo_extractions_date ON todo_extractions (DATE)"
+    )
+    conn.commit()
+
+
+@traced
+def get_extractions(dates: list) -> dict:
+    """Processed content hashes and earlier suggestions, keyed by log date."""
+    date_strs = [pd.Timestamp(date).strftime("%Y-%m-%d") for date in dates]
+    if len(date_strs) == 0:
+        return {}
+    placeholders = ", ".join("?" for _ in date_strs)
+    cursor = get_goals_conn().cursor()
+    cursor.execute(
+        f"SELECT DATE, HASHES, SUGGESTIONS FROM todo_extractions WHERE DATE IN ({placeholders})",
+        date_strs,
+    )
+    extractions = {}
+    for date_str, hashes, suggestions in cursor.fetchall():
+        date = datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
+        entry = extractions.setdefault(date, {"hashes": set(), "suggestions": []})
+        entry["hashes"].update(json.loads(hashes))
+        entry["suggestions"].extend(json.loads(suggestions))
+    return extractions
+
+
+@traced
+def save_extraction(date: datetime.date, hashes: list, suggestions: list) -> None:
+    """Record processed content hashes for a log date and the suggestions they produced."""
+    conn = get_goals_conn()
+    tstp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        INSERT INTO todo_extractions (DATE, HASHES, SUGGESTIONS, TSTP)
+        VALUES (?, ?, ?, ?)
+    """,
+        (
+            pd.Timestamp(date).strftime("%Y-%m-%d"),
+            json.dumps(hashes),
+            json.dumps(suggestions, default=str),
+            tstp,
+        ),
+    )
+    conn.commit()
+
+
+####################
+## FOCUS SESSIONS ##
+####################
+
+
+def create_focus_table():
+    """Create the table of focus timer events."""
+    conn = get_goals_conn()
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS focus_events (
+            ID INTEGER PRIMARY KEY AUTOINCREMENT,
+            SESSION_ID TEXT,
+            TODO_ID INTEGER,
+            TASK TEXT,
+            EVENT TEXT,
+            TSTP TIMESTAMP
+        )
+    """)
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_focus_events_session ON focus_events (SESSION_ID, TSTP)"
+    )
+    conn.commit()
+
+
+@traced
+def log_focus_event(session_id: str, event: str, task: str, todo_id: int = None) -> None:
+    """Record a focus timer event (start, pause, resume, stop or complete)."""
+    conn = get_goals_conn()
+    tstp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+    with conn:
+        conn.execute(
+            "INSERT INTO focus_events (SESSION_ID, TODO_ID, TASK, EVENT, TSTP) VALUES (?, ?, ?, ?, ?)",
+            (session_id, todo_id, task, event, tstp),
+        )
+
+
+@traced
+def get_focus_sessions() -> pd.DataFrame:
+    """One row per focus session with its start, end, outcome and focused (unpaused) minutes."""
+    events = pd.read_sql(
+        "SELECT SESSION_ID, TODO_ID, TASK, EVENT, TSTP FROM focus_events ORDER BY SESSION_ID, TSTP",
+        get_goals_conn(),
+    )
+    events.columns = map(str.lower, events.columns)
+    events["tstp"] = pd.to_datetime(events["tstp"])
+    sessions = []
+    for session_id, group in events.groupby("session_id", sort=False):
+        focused, running_since, outcome = 0.0, None, None
+        for event, tstp in zip(group["event"], group["tstp"]):
+            if event in ("start", "resume"):
+                running_since = tstp
+            elif running_since is not None:
+                focused += (tstp - running_since).total_seconds()
+                running_since = None
+            if event in ("stop", "complete"):
+                outcome = event
+        sessions.append(
+            {
+                "session_id": session_id,
+                "todo_id": group["todo_id"].iloc[0],
+                "task": group["task"].iloc[0],
+                "start": group["tstp"].iloc[0],
+                "end": group["tstp"].iloc[-1],
+                "outcome": outcome,
+                "focused_minutes": focused / 60,
+            }
+        )
+    return pd.DataFrame(
+        sessions,
+        columns=["session_id", "todo_id", "task", "start", "end", "outcome", "focused_minutes"],
+    )
 
 
 ################
 ## LINK LIST ##
 ################
 
+@traced
 def get_links_data() -> pd.DataFrame:
-    """Fetch links data from the database."""
-    query = "SELECT * FROM links"
-    df = pd.read_sql(query, goals_conn)
-    df.columns = map(str.lower, df.columns)
-    df["read"] = df["read"].map({0: False, 1: True})
+    """Fetch links data with META expanded into typed columns."""
+    df = read_meta_frame("links", ["ID", "URL", "READ", "TSTP"], LINK_META_FIELDS)
+    df["read"] = df["read"].astype(int) == 1
     df["tstp"] = pd.to_datetime(df["tstp"])
-    df.dropna(subset=["meta"], inplace=True)
-    df["meta"] = df["meta"].apply(json.loads)
+    df["edit_tstp"] = pd.to_datetime(df["edit_tstp"], errors="coerce")
+    df["topic"] = df["topic"].astype("category")
     df.sort_values(by=["tstp"], ascending=False, inplace=True)
     df.reset_index(drop=True, inplace=True)
     return df
 
-def add_link_item(url: str, meta: dict, read: bool = False) -> None:
-    """Add entry to the links list."""
+def canonicalize_url(url: str) -> str:
+    """Normalize a URL so trivially different spellings of the same page compare equal.
+
+    Unparseable URLs (e.g. a malformed port) are kept as typed; blank ones give None,
+    which the unique index ignores.
+    """
+    url = (url or "").strip()
+    if not url:
+        return None
+    if "://" not in url:
+        url = f"https://{url}"
+    parts = urlsplit(url)
+    try:
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if port and port != {"http": 80, "https": 443}.get(scheme):
+        host = f"{host}:{port}"
+    path = re.sub(r"/{2,}", "/", parts.path).rstrip("/")
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+@traced
+def add_link_item(url: str, meta: dict, read: bool = False):
+    """Add entry to the links list; returns its ID, or None if the page is already saved."""
+    conn = get_goals_conn()
     tstp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     read = 1 if read else 0
-    cursor = goals_conn.cursor()
+    cursor = conn.cursor()
     cursor.execute(
         """
-        INSERT INTO links (URL, READ, META, TSTP)
-        VALUES (?, ?, ?, ?)
+        INSERT OR IGNORE INTO links (URL, CANONICAL_URL, READ, META, TSTP)
+        VALUES (?, ?, ?, ?, ?)
     """,
-        (url, read, json.dumps(meta), tstp),
+        (url, canonicalize_url(url), read, json.dumps(meta), tstp),
     )
-    goals_conn.commit()
+    conn.commit()
+    return cursor.lastrowid if cursor.rowcount > 0 else None
 
-def replace_links_list(df: pd.DataFrame) -> None:
-    """Replace the links list with the edited data."""
-    df = df.copy()
-    cursor = goals_conn.cursor()
-    with goals_conn:
-        cursor.execute("DELETE FROM links")
-        if len(df) > 0:
-            df["meta"] = df["meta"].apply(json.dumps)
-            df["tstp"] = df["tstp"].apply(lambda x: x.strftime("%Y-%m-%d %H:%M:%S"))
-            df.to_sql("links", goals_conn, if_exists="replace", index=False)
+@traced
+def import_links(items: list, meta: dict) -> int:
+    """Bulk insert link dicts (url, optional title/tstp) in one transaction, skipping known pages."""
+    conn = get_goals_conn()
+    now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rows = [
+        (
+            item["url"],
+            canonicalize_url(item["url"]),
+            json.dumps({**meta, "title": item.get("title")}),
+            item.get("tstp") or now,
+        )
+        for item in items
+    ]
+    with conn:
+        before = conn.total_changes
+        conn.executemany(
+            """
+            INSERT OR IGNORE INTO links (URL, CANONICAL_URL, READ, META, TSTP)
+            VALUES (?, ?, 0, ?, ?)
+        """,
+            rows,
+        )
+        return conn.total_changes - before
 
+@traced
+def get_link_titles() -> list:
+    """Titles of all saved links that have one."""
+    cursor = get_goals_conn().cursor()
+    cursor.execute(
+        "SELECT json_extract(META, '$.title') FROM links WHERE json_extract(META, '$.title') IS NOT NULL"
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+@traced
+def get_links_by_summary(summary: str) -> list:
+    """(ID, URL) pairs of links whose summary is still the given text."""
+    cursor = get_goals_conn().cursor()
+    cursor.execute(
+        "SELECT ID, URL FROM links WHERE json_extract(META, '$.summary') = ? ORDER BY ID",
+        (summary,),
+    )
+    return cursor.fetchall()
+
+@traced
+def update_link_meta(link_id: int, fields: dict) -> None:
+    """Set individual META fields of one link without touching the rest of the table."""
+    conn = get_goals_conn()
+    assignments = ", ".join("?, ?" for _ in fields)
+    params = []
+    for field, value in fields.items():
+        params.extend([f"$.{field}", value])
+    with conn:
+        conn.execute(
+            f"UPDATE links SET META = json_set(COALESCE(META, '{{}}'), {assignments}) WHERE ID = ?",
+            params + [link_id],
+        )
+
+@traced
+def update_link_url(link_id: int, url: str, summary: str) -> bool:
+    """Point a link at a new URL, resetting its summary; False if that page is already saved."""
+    conn = get_goals_conn()
+    edit_tstp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        with conn:
+            conn.execute(
+                """
+                UPDATE links SET URL = ?, CANONICAL_URL = ?,
+                    META = json_set(COALESCE(META, '{}'), '$.summary', ?, '$.edit_tstp', ?)
+                WHERE ID = ?
+            """,
+                (url, canonicalize_url(url), summary, edit_tstp, link_id),
+            )
+    except sqlite3.IntegrityError:
+        return False
+    return True
+
+
+@traced
+def update_link_read(link_id: int, read: bool) -> None:
+    """Mark a link as read or unread."""
+    conn = get_goals_conn()
+    edit_tstp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with conn:
+        conn.execute(
+            "UPDATE links SET READ = ?, META = json_set(COALESCE(META, '{}'), '$.edit_tstp', ?) WHERE ID = ?",
+            (1 if read else 0, edit_tstp, link_id),
+        )
+
+@traced
+def delete_links(link_ids: list) -> None:
+    """Delete links by ID."""
+    conn = get_goals_conn()
+    with conn:
+        conn.executemany("DELETE FROM links WHERE ID = ?", [(link_id,) for link_id in link_ids])
+
+@traced
 def create_links_table():
-    """Create the links table if it doesn't exist."""
-    cursor = goals_conn.cursor()
+    """Create the links table if it doesn't exist, restoring the ID column if a bulk replace dropped it."""
+    conn = get_goals_conn()
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(links)")
+    columns = [row[1].upper() for row in cursor.fetchall()]
+    if columns and "ID" not in columns:
+        cursor.execute("ALTER TABLE links RENAME TO links_old")
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS links (
         ID INTEGER PRIMARY KEY AUTOINCREMENT,
         URL TEXT,
+        CANONICAL_URL TEXT,
         READ INTEGER DEFAULT 0,
         META TEXT,
         TSTP TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
     ''')
-    goals_conn.commit()
+    if columns and "ID" not in columns:
+        cursor.execute(
+            "INSERT INTO links (URL, READ, META, TSTP) SELECT URL, READ, META, TSTP FROM links_old"
+        )
+        cursor.execute("DROP TABLE links_old")
+    if "ID" in columns and "CANONICAL_URL" not in columns:
+        cursor.execute("ALTER TABLE links ADD COLUMN CANONICAL_URL TEXT")
+
+    cursor.execute("SELECT ID, URL FROM links WHERE CANONICAL_URL IS NULL AND TRIM(COALESCE(URL, '')) != ''")
+    backfill = [(canonicalize_url(url), link_id) for link_id, url in cursor.fetchall()]
+    cursor.executemany("UPDATE links SET CANONICAL_URL = ? WHERE ID = ?", backfill)
+    ## Rows without a URL are not copies of each other.
+    cursor.execute("UPDATE links SET CANONICAL_URL = NULL WHERE TRIM(COALESCE(URL, '')) = ''")
+
+    ## Before enforcing uniqueness, keep one copy of each page: a read one if any, else the oldest.
+    ## The other copies move to `links_duplicates` with the ID of the row kept in their place.
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_links_canonical_url'")
+    if cursor.fetchone() is None:
+        cursor.execute(
+            """
+            SELECT ID, URL, CANONICAL_URL FROM links
+            WHERE CANONICAL_URL IN (SELECT CANONICAL_URL FROM links GROUP BY CANONICAL_URL HAVING COUNT(*) > 1)
+            ORDER BY CANONICAL_URL, READ DESC, ID
+        """
+        )
+        kept, dropped = {}, []
+        for link_id, url, canonical_url in cursor.fetchall():
+            if canonical_url in kept:
+                dropped.append((link_id, url, kept[canonical_url]))
+            else:
+                kept[canonical_url] = link_id
+        if dropped:
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS links_duplicates (
+                    ID INTEGER,
+                    URL TEXT,
+                    CANONICAL_URL TEXT,
+                    READ INTEGER,
+                    META TEXT,
+                    TSTP TIMESTAMP,
+                    KEPT_ID INTEGER
+                )
+            """
+            )
+        for link_id, url, kept_id in dropped:
+            logger.warning("Moving duplicate link %s (%s) to links_duplicates; kept %s", link_id, url, kept_id)
+            cursor.execute(
+                """
+                INSERT INTO links_duplicates (ID, URL, CANONICAL_URL, READ, META, TSTP, KEPT_ID)
+                SELECT ID, URL, CANONICAL_URL, READ, META, TSTP, ? FROM links WHERE ID = ?
+            """,
+                (kept_id, link_id),
+            )
+            cursor.execute("DELETE FROM links WHERE ID = ?", (link_id,))
+        cursor.execute("CREATE UNIQUE INDEX idx_links_canonical_url ON links (CANONICAL_URL)")
+    conn.commit()
 
 
 ###############
 ## ASCII ART ##
 ###############
 
+@traced
 def get_reflection_by_date(date: datetime.date) -> dict:
     """Load reflection and ASCII art from the DB by date."""
     query = "SELECT * FROM ascii_art WHERE date = ?"
     date_str = date.strftime("%Y-%m-%d")
-    df = pd.read_sql(query, goals_conn, params=(date_str,))
+    df = pd.read_sql(query, get_goals_conn(), params=(date_str,))
     df.columns = map(str.lower, df.columns)
     if len(df) == 0:
         art_obj = dict()
@@ -285,13 +1864,15 @@ def get_reflection_by_date(date: datetime.date) -> dict:
     return art_obj
 
 
+@traced
 def save_reflection_by_date(date: datetime.date, art_obj: dict) -> None:
     """Save reflection and ASCII art to the DB by date."""
+    conn = get_goals_conn()
     tstp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     title = art_obj["title"]
     art = art_obj["art"]
     message = art_obj["message"]
-    cursor = goals_conn.cursor()
+    cursor = conn.cursor()
     cursor.execute(
         """
         INSERT INTO ascii_art (date, title, art, message, tstp)
@@ -299,13 +1880,23 @@ def save_reflection_by_date(date: datetime.date, art_obj: dict) -> None:
     """,
         (date, title, art, message, tstp),
     )
-    goals_conn.commit()
+    conn.commit()
 
 
+@traced
+def get_reflections() -> dict:
+    """(message, reaction) of every stored reflection, by ISO date."""
+    cursor = get_goals_conn().cursor()
+    cursor.execute("SELECT date, message, reaction FROM ascii_art WHERE message IS NOT NULL")
+    return {str(date)[:10]: (message, reaction or "") for date, message, reaction in cursor.fetchall()}
+
+
+@traced
 def save_reflection_reaction_by_date(date: datetime.date, reaction: str) -> None:
     """Save ASCII art reaction to the DB by date."""
+    conn = get_goals_conn()
     tstp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    cursor = goals_conn.cursor()
+    cursor = conn.cursor()
     cursor.execute(
         """
         UPDATE ascii_art SET reaction = ?, tstp = ?
@@ -313,29 +1904,30 @@ def save_reflection_reaction_by_date(date: datetime.date, reaction: str) -> None
     """,
         (reaction, tstp, date),
     )
-    goals_conn.commit()
+    conn.commit()
 
 
 ################
 ## PROJECTS ##
 ################
 
+@traced
 def get_projects_data() -> pd.DataFrame:
-    """Fetch projects data from the database."""
-    query = "SELECT * FROM projects"
-    df = pd.read_sql(query, goals_conn)
-    df.columns = map(str.lower, df.columns)
+    """Fetch projects data with META expanded into typed columns."""
+    df = read_meta_frame("projects", ["NAME", "TSTP"], PROJECT_META_FIELDS)
     df["tstp"] = pd.to_datetime(df["tstp"])
-    df.dropna(subset=["meta"], inplace=True)
-    df["meta"] = df["meta"].apply(json.loads)
+    df["progress"] = df["progress"].astype(float).fillna(0.0)
+    df["status"] = df["status"].astype("category")
     df.sort_values(by=["tstp"], ascending=False, inplace=True)
     df.reset_index(drop=True, inplace=True)
     return df
 
+@traced
 def add_project_item(name: str, meta: dict) -> None:
     """Add entry to the projects list."""
+    conn = get_goals_conn()
     tstp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    cursor = goals_conn.cursor()
+    cursor = conn.cursor()
     cursor.execute(
         """
         INSERT INTO projects (NAME, META, TSTP)
@@ -343,22 +1935,25 @@ def add_project_item(name: str, meta: dict) -> None:
     """,
         (name, json.dumps(meta), tstp),
     )
-    goals_conn.commit()
+    conn.commit()
 
+@traced
 def replace_projects_list(df: pd.DataFrame) -> None:
     """Replace the projects list with the edited data."""
-    df = df.copy()
-    cursor = goals_conn.cursor()
-    with goals_conn:
+    conn = get_goals_conn()
+    df = pack_meta_frame(df, PROJECT_META_FIELDS)
+    cursor = conn.cursor()
+    with conn:
         cursor.execute("DELETE FROM projects")
         if len(df) > 0:
-            df["meta"] = df["meta"].apply(json.dumps)
             df["tstp"] = df["tstp"].apply(lambda x: x.strftime("%Y-%m-%d %H:%M:%S"))
-            df.to_sql("projects", goals_conn, if_exists="replace", index=False)
+            df.to_sql("projects", conn, if_exists="replace", index=False)
 
+@traced
 def create_projects_table():
     """Create the projects table if it doesn't exist."""
-    cursor = goals_conn.cursor()
+    conn = get_goals_conn()
+    cursor = conn.cursor()
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS projects (
             NAME TEXT NOT NULL,
@@ -366,7 +1961,4 @@ def create_projects_table():
             TSTP TIMESTAMP
         )
     """)
-    goals_conn.commit()
-
-# Create tables if they don't exist
-create_projects_table()
\ No newline at end of file
+    conn.commit()
@@ -1,14 +1,28 @@
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+from functools import lru_cache
 
+import numpy as np
 
+from tracing import traced
+
+
+@lru_cache(maxsize=2)
+@traced
+def load_model(model_name: str):
+    """Load a sentence-transformers model once per process."""
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name)
+
+
+@traced
 def get_embeddings(texts: list, model_name: str = "intfloat/e5-small-v2"):
     """Get embeddings for a list of texts."""
-    model = SentenceTransformer(model_name)
+    model = load_model(model_name)
     embeddings = model.encode(texts, normalize_embeddings=True)
     return embeddings
 
 
+@traced
 def find_similar(
     query: str,
     passages: list,
@@ -17,13 +31,39 @@ def find_similar(
     model_name: str = "intfloat/e5-small-v2",
 ):
     """ Get embeddings for a query and a set of passages and return most similar passages."""
+    if len(passages) == 0:
+        return []
     query_embedding = get_embeddings([query], model_name)[0]
     passage_embeddings = get_embeddings(passages, model_name)
-    similarities = cosine_similarity([query_embedding], passage_embeddings)[0]
+    ## Embeddings are normalized, so the dot product is the cosine similarity.
+    similarities = np.asarray(passage_embeddings) @ np.asarray(query_embedding)
     similar_passages = [
         (passage, similarity)
         for passage, similarity in zip(passages, similarities)
         if similarity >= threshold
     ]
     similar_passages = sorted(similar_passages, key=lambda x: x[1], reverse=True)
-    return similar_passages[:top_k]
\ No newline at end of file
+    return similar_passages[:top_k]
+
+
+@traced
+def find_duplicates(
+    queries: list,
+    passages: list,
+    threshold: float = 0.9,
+    model_name: str = "intfloat/e5-small-v2",
+) -> np.ndarray:
+    """Flag queries similar to any passage or to an earlier query, in one encoding pass."""
+    if len(queries) == 0:
+        return np.zeros(0, dtype=bool)
+    embeddings = np.asarray(get_embeddings(list(queries) + list(passages), model_name))
+    query_embeddings = embeddings[: len(queries)]
+    passage_embeddings = embeddings[len(queries) :]
+
+    duplicates = np.zeros(len(queries), dtype=bool)
+    if len(passages) > 0:
+        duplicates |= (query_embeddings @ passage_embeddings.T).max(axis=1) >= threshold
+    ## Within the batch, keep the first occurrence of each near-duplicate group.
+    self_similarity = np.triu(query_embeddings @ query_embeddings.T, k=1)
+    duplicates |= (self_similarity >= threshold).any(axis=0)
+    return duplicates
@@ -1,35 +1,290 @@
-from typing import Type, Optional
+import enum
+import importlib.util
+import logging
+import os
+import threading
+import time
+import typing
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from typing import Callable, Type, Optional
 from pydantic import BaseModel, Field, model_validator
-import instructor
-from anthropic import Anthropic
-from openai import OpenAI
 
+from tracing import traced
 
+logger = logging.getLogger(__name__)
+
+## Route every query to this backend regardless of model name (e.g. "stub" offline).
+LLM_FORCE_BACKEND = os.environ.get("LLM_FORCE_BACKEND")
+## Seconds of expected latency traded per $ / 1k tokens when ranking fallbacks.
+LLM_COST_WEIGHT = float(os.environ.get("LLM_COST_WEIGHT", "100"))
+## Seconds to wait for a saturated backend before trying the next candidate.
+LLM_BUSY_WAIT = float(os.environ.get("LLM_BUSY_WAIT", "0.5"))
+## Let the local model serve as an automatic fallback (it is slow and may need a download).
+LLM_LOCAL_FALLBACK = os.environ.get("LLM_LOCAL_FALLBACK", "0") == "1"
+## Exceptions from these packages are provider failures (API, rate-limit, connection errors).
+PROVIDER_ERROR_MODULES = ("anthropic", "openai", "httpx", "httpcore", "instructor")
+
+
+class BackendBusy(Exception):
+    """Raised when a backend's concurrency limit is saturated past the wait."""
+
+
+class Backend:
+    """A routable LLM provider with its own concurrency limit, timeout and cost."""
+
+    def __init__(
+        self,
+        name: str,
+        call: Callable,
+        default_model: str,
+        matches: Callable[[str], bool],
+        available: Callable[[], bool],
+        cost_per_1k_tokens: float = 0.0,
+        max_concurrency: int = 4,
+        timeout: float = 60.0,
+        auto_fallback: bool = True,
+    ):
+        self.name = name
+        self.call = call
+        self.default_model = default_model
+        self.matches = matches
+        self.available = available
+        self.cost_per_1k_tokens = cost_per_1k_tokens
+        self.timeout = timeout
+        self.auto_fallback = auto_fallback
+        self.semaphore = threading.BoundedSemaphore(max_concurrency)
+        self.latency_ewma = None
+
+    def record_latency(self, seconds: float, alpha: float = 0.3) -> None:
+        if self.latency_ewma is None:
+            self.latency_ewma = seconds
+        else:
+            self.latency_ewma = alpha * seconds + (1 - alpha) * self.latency_ewma
+
+    def score(self) -> float:
+        """Lower is better: expected latency plus weighted cost."""
+        latency = self.latency_ewma if self.latency_ewma is not None else self.timeout / 4
+        return latency + LLM_COST_WEIGHT * self.cost_per_1k_tokens
+
+
+BACKENDS = {}
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm")
+
+
+def register_backend(backend: Backend) -> None:
+    """Add or replace a backend in the routing registry."""
+    BACKENDS[backend.name] = backend
+
+
+def route(llm_model: str, fallbacks: Optional[list] = None) -> list:
+    """Ordered (backend, model) candidates: the model's own backend, then fallbacks."""
+    if LLM_FORCE_BACKEND:
+        backend = BACKENDS[LLM_FORCE_BACKEND]
+        return [(backend, backend.default_model)]
+
+    primary = next(
+        (b for b in BACKENDS.values() if b.matches(llm_model)), BACKENDS["anthropic"]
+    )
+    if llm_model.startswith("local:"):
+        llm_model = llm_model.split(":", 1)[1]
+    candidates = [(primary, llm_model)]
+
+    if fallbacks is None:
+        fallbacks = sorted(
+            (
+                b
+                for b in BACKENDS.values()
+                if b is not primary and b.auto_fallback and b.available()
+            ),
+            key=lambda b: b.score(),
+        )
+    else:
+        fallbacks = [BACKENDS[name] for name in fallbacks if name != primary.name]
+    candidates += [(b, b.default_model) for b in fallbacks]
+    return candidates
+
+
+def is_provider_error(error: Exception) -> bool:
+    """Whether an error means the backend failed (timeout, saturation, API or connection error)."""
+    if isinstance(error, (FuturesTimeout, BackendBusy, ConnectionError, TimeoutError)):
+        return True
+    return any(
+        cls.__module__.split(".")[0] in PROVIDER_ERROR_MODULES for cls in type(error).__mro__
+    )
+
+
+def call_backend(backend: Backend, llm_model: str, *args, wait: float = LLM_BUSY_WAIT):
+    """Call a backend within its concurrency limit and timeout, tracking its latency.
+
+    A saturated backend raises `BackendBusy` after `wait` seconds rather than queueing.
+    """
+    if not backend.semaphore.acquire(timeout=wait):
+        raise BackendBusy(backend.name)
+    start = time.perf_counter()
+    future = _executor.submit(backend.call, *args, llm_model)
+    future.add_done_callback(lambda _: backend.semaphore.release())
+    try:
+        result = future.result(timeout=backend.timeout)
+    except FuturesTimeout:
+        backend.record_latency(backend.timeout)
+        raise
+    backend.record_latency(time.perf_counter() - start)
+    return result
+
+
+@traced
 def run_instructor_query(
     system_message: str,
     user_message: str,
     model: Optional[Type[BaseModel]] = None,
     llm_model: str = "claude-3-haiku-20240307",
     temperature: float = 0.5,
+    fallbacks: Optional[list] = None,
 ):
-    """Run a query with the instructor API and get a structured response."""
-    model_type = "OpenAI" if "gpt" in llm_model else "Anthropic"
-    if model_type == "Anthropic":
-        client = Anthropic()
-        response = create_anthropic_message(
-            client, system_message, user_message, model, llm_model, temperature
-        )
-    elif model_type == "OpenAI":
-        client = OpenAI()
-        response = create_openai_message(
-            client, system_message, user_message, model, llm_model, temperature
-        )
-    else:
-        raise ValueError(f"Unsupported model type: {model_type}")
+    """Run a query on the routed backend and get a (structured) response.
+
+    Falls back to the next-best available backend when a backend times out,
+    is saturated or returns a provider error. `fallbacks` pins the fallback
+    order by backend name.
+    """
+    last_error = None
+    for backend, backend_model in route(llm_model, fallbacks):
+        try:
+            return call_backend(
+                backend, backend_model, system_message, user_message, model, temperature
+            )
+        except Exception as e:
+            if not is_provider_error(e):
+                raise
+            logger.warning("LLM backend '%s' failed (%s: %s), falling back.", backend.name, type(e).__name__, e)
+            last_error = e
+    raise last_error
+
+
+def _anthropic_call(system_message, user_message, model, temperature, llm_model):
+    from anthropic import Anthropic
+
+    return create_anthropic_message(
+        Anthropic(), system_message, user_message, model, llm_model, temperature
+    )
+
+
+def _openai_call(system_message, user_message, model, temperature, llm_model):
+    from openai import OpenAI
+
+    return create_openai_message(
+        OpenAI(), system_message, user_message, model, llm_model, temperature
+    )
+
+
+def _local_call(system_message, user_message, model, temperature, llm_model):
+    import local_llm
+
+    return local_llm.run_local_query(
+        system_message, user_message, model, llm_model or None, temperature
+    )
+
 
-    return response
+def _local_available() -> bool:
+    import local_llm
 
+    module = {"mlx": "mlx_lm", "llama_cpp": "llama_cpp"}[local_llm.LOCAL_LLM_BACKEND]
+    return importlib.util.find_spec(module) is not None
 
+
+def _stub_value(annotation):
+    """Deterministic placeholder for a field type."""
+    origin = typing.get_origin(annotation)
+    if origin is typing.Annotated:
+        return _stub_value(typing.get_args(annotation)[0])
+    if origin is typing.Literal:
+        return typing.get_args(annotation)[0]
+    if origin is typing.Union:
+        args = [a for a in typing.get_args(annotation) if a is not type(None)]
+        return None if len(args) < len(typing.get_args(annotation)) else _stub_value(args[0])
+    if origin in (list, set, tuple):
+        return []
+    if origin is dict:
+        return {}
+    if isinstance(annotation, type):
+        if issubclass(annotation, BaseModel):
+            return build_stub_response(annotation)
+        if issubclass(annotation, enum.Enum):
+            return next(iter(annotation))
+        if issubclass(annotation, bool):
+            return False
+        if issubclass(annotation, (int, float)):
+            return annotation(0)
+    return ""
+
+
+def build_stub_response(model: Optional[Type[BaseModel]]):
+    """Deterministic, schema-valid response for a Pydantic model (or empty text)."""
+    if model is None:
+        return ""
+    values = {
+        name: _stub_value(field.annotation)
+        for name, field in model.model_fields.items()
+        if field.is_required()
+    }
+    return model(**values)
+
+
+def _stub_call(system_message, user_message, model, temperature, llm_model):
+    return build_stub_response(model)
+
+
+register_backend(
+    Backend(
+        "anthropic",
+        _anthropic_call,
+        default_model="claude-3-haiku-20240307",
+        matches=lambda m: m.startswith("claude"),
+        available=lambda: "ANTHROPIC_API_KEY" in os.environ,
+        cost_per_1k_tokens=0.003,
+        max_concurrency=4,
+        timeout=90,
+    )
+)
+register_backend(
+    Backend(
+        "openai",
+        _openai_call,
+        default_model="gpt-4o-mini",
+        matches=lambda m: "gpt" in m or m.startswith(("o1", "o3")),
+        available=lambda: "OPENAI_API_KEY" in os.environ,
+        cost_per_1k_tokens=0.0025,
+        max_concurrency=4,
+        timeout=90,
+    )
+)
+register_backend(
+    Backend(
+        "local",
+        _local_call,
+        default_model="",
+        matches=lambda m: m.startswith("local:"),
+        available=_local_available,
+        cost_per_1k_tokens=0.0,
+        max_concurrency=1,
+        timeout=180,
+        auto_fallback=LLM_LOCAL_FALLBACK,
+    )
+)
+register_backend(
+    Backend(
+        "stub",
+        _stub_call,
+        default_model="stub",
+        matches=lambda m: m == "stub",
+        available=lambda: True,
+        timeout=5,
+        auto_fallback=False,
+    )
+)
+
+
+@traced
 def create_anthropic_message(
     client, system_message, user_message, model, llm_model, temperature
 ):
@@ -46,6 +301,8 @@ def create_anthropic_message(
         )
         answer = response.content[0].text
     else:
+        import instructor
+
         client = instructor.from_anthropic(client)
         response = client.messages.create(
             max_tokens=4096,
@@ -62,6 +319,7 @@ def create_anthropic_message(
     return answer
 
 
+@traced
 def create_openai_message(
     client, system_message, user_message, model, llm_model, temperature
 ):
@@ -77,6 +335,8 @@ def create_openai_message(
         )
         answer = response.choices[0].message.content
     else:
+        import instructor
+
         client = instructor.from_openai(client)
         response = client.chat.completions.create(
             model=llm_model,
@@ -0,0 +1,203 @@
+"""Background summarization and topic tagging for saved links.
+
+Pages are fetched through a swappable fetcher (a callable `fetch(url) -> html`).
+Readable text is pulled out of the HTML, sent to the LLM layer with
+bounded concurrency and retries, and the results are written back to the
+`links` table with targeted UPDATEs.
+"""
+import datetime
+import os
+import threading
+import time
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
+from html.parser import HTMLParser
+from typing import Callable, Optional
+
+import db
+import tracing
+
+PENDING_SUMMARY = "Summary will be generated automatically"
+FAILED_SUMMARY = "Summary could not be generated"
+DEFAULT_TOPIC = "LLMs"
+LINK_WORKERS = int(os.environ.get("LINK_WORKERS", "4"))
+FETCH_TIMEOUT = float(os.environ.get("LINK_FETCH_TIMEOUT", "15"))
+MAX_TEXT_CHARS = 12000
+
+
+def http_fetch(url: str, timeout: float = FETCH_TIMEOUT) -> str:
+    """Fetch a page over HTTP(S) and decode it as text."""
+    request = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0 (assetmkr)"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        charset = response.headers.get_content_charset() or "utf-8"
+        return response.read().decode(charset, errors="replace")
+
+
+class _TextExtractor(HTMLParser):
+    SKIP_TAGS = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg"}
+    BLOCK_TAGS = {"p", "div", "br", "li", "h1", "h2", "h3", "h4", "h5", "h6", "tr", "section", "article"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.parts = []
+        self._skip_depth = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS and self._skip_depth > 0:
+            self._skip_depth -= 1
+        elif tag == "title":
+            self._in_title = False
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif self._skip_depth == 0:
+            self.parts.append(data)
+
+
+def extract_text(html: str, max_chars: int = MAX_TEXT_CHARS) -> tuple:
+    """Return (title, readable text) of an HTML page, dropping scripts and page chrome."""
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    lines = (" ".join(line.split()) for line in "".join(parser.parts).splitlines())
+    text = "\n".join(line for line in lines if line)
+    return " ".join(parser.title.split()), text[:max_chars]
+
+
+class _BookmarkParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.bookmarks = []
+        self._current = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        href = attrs.get("href") or ""
+        if tag == "a" and href.startswith(("http://", "https://")):
+            add_date = attrs.get("add_date")
+            tstp = None
+            if add_date and add_date.isdigit():
+                tstp = datetime.datetime.fromtimestamp(int(add_date)).strftime("%Y-%m-%d %H:%M:%S")
+            self._current = {"url": href, "title": "", "tstp": tstp}
+
+    def handle_endtag(self, tag):
+        if tag == "a" and self._current is not None:
+            self._current["title"] = " ".join(self._current["title"].split()) or None
+            self.bookmarks.append(self._current)
+            self._current = None
+
+    def handle_data(self, data):
+        if self._current is not None:
+            self._current["title"] += data
+
+
+def parse_bookmarks(html: str) -> list:
+    """Links from a browser bookmarks export (Netscape HTML format) as url/title/tstp dicts."""
+    parser = _BookmarkParser()
+    parser.feed(html)
+    parser.close()
+    return parser.bookmarks
+
+
+class LinkSummarizer:
+    """Worker pool that summarizes links in the background and writes results to the DB."""
+
+    def __init__(
+        self,
+        fetcher: Callable[[str], str] = http_fetch,
+        summarize: Optional[Callable] = None,
+        max_workers: int = LINK_WORKERS,
+        max_retries: int = 3,
+        backoff: float = 2.0,
+    ):
+        self.fetcher = fetcher
+        self.summarize = summarize
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="links")
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def enqueue(self, link_id: int, url: str, topics: Optional[list] = None) -> Future:
+        """Schedule a link for summarization; a link already in flight is not queued twice."""
+        with self._lock:
+            if link_id in self._in_flight:
+                return self._in_flight[link_id]
+            future = self._executor.submit(self._process, link_id, url, topics)
+            self._in_flight[link_id] = future
+        future.add_done_callback(lambda _: self._done(link_id))
+        return future
+
+    def enqueue_pending(self, topics: Optional[list] = None) -> int:
+        """Queue every stored link that still carries the placeholder summary."""
+        pending = db.get_links_by_summary(PENDING_SUMMARY)
+        for link_id, url in pending:
+            self.enqueue(link_id, url, topics)
+        return len(pending)
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._in_flight)
+
+    def _done(self, link_id: int):
+        with self._lock:
+            self._in_flight.pop(link_id, None)
+
+    def _summarize(self, url: str, title: str, text: str, topics: Optional[list]):
+        if self.summarize is not None:
+            return self.summarize(url, title, text, topics)
+        import llms
+
+        return llms.summarize_link(url, title, text, topics)
+
+    def _process(self, link_id: int, url: str, topics: Optional[list]) -> dict:
+        for attempt in range(self.max_retries):
+            try:
+                with tracing.span("links.fetch"):
+                    title, text = extract_text(self.fetcher(url))
+                with tracing.span("links.summarize"):
+                    result = self._summarize(url, title, text, topics)
+                fields = {"summary": result.summary, "topic": result.topic}
+                if title:
+                    fields["title"] = title
+                break
+            except Exception:
+                if attempt == self.max_retries - 1:
+                    fields = {"summary": FAILED_SUMMARY}
+                    break
+                time.sleep(self.backoff * 2**attempt)
+        fields["edit_tstp"] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        db.update_link_meta(link_id, fields)
+        return fields
+
+
+_summarizer = None
+_summarizer_lock = threading.Lock()
+
+
+def get_summarizer() -> LinkSummarizer:
+    """Return the process-wide summarizer, starting it on first use."""
+    global _summarizer
+    with _summarizer_lock:
+        if _summarizer is None:
+            _summarizer = LinkSummarizer()
+        return _summarizer
+
+
+def set_summarizer(summarizer: LinkSummarizer) -> None:
+    """Install a custom summarizer (e.g. with a fixture fetcher)."""
+    global _summarizer
+    with _summarizer_lock:
+        _summarizer = summarizer
+
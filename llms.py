@@ -5,8 +5,12 @@ from dotenv import load_dotenv
 from pydantic import BaseModel, Field
 from enum import Enum
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import json
 
+from tracing import traced
+
 load_dotenv()
 
 todo_types = Enum('Type', {'Personal': 'Personal', 'Work': 'Work', 'Family': 'Family'})
@@ -18,12 +22,27 @@ class ToDoItem(BaseModel):
     task_type: todo_types = Field(..., title="Task Type", description="Type task. One of: ['Personal', 'Work', 'Family'].")
     task_priority: priority = Field(..., title="Task Priority", description="Priority of the task. One of: ['Low', 'Medium', 'High']. Assumed 'Medium' if not specified.")
     project: Optional[str] = Field(None, title="Project", description="Project the task is associated with. None unless explicitly specified.")
+    log_date: Optional[str] = Field(None, title="Log Date", description="Date (YYYY-MM-DD) of the log the task was extracted from, if the logs are dated.")
+
+
+TODO_COLUMNS = {
+    "task_name": "name",
+    "task_type": "type",
+    "task_priority": "priority",
+    "project": "project",
+    "log_date": "date",
+}
 
 
 class ToDoItems(BaseModel):
     todos: list[ToDoItem] = Field(..., title="To-Do Items", description="List of to-do items extracted from the logs.")
 
 
+class LinkSummary(BaseModel):
+    summary: str = Field(..., title="Summary", description="Two to three sentence summary of the page content.")
+    topic: str = Field(..., title="Topic", description="Short topic tag for the page (one to three words), preferably one of the existing topics.")
+
+
 # def llm_reflection(period_logs: str) -> str:
 #     system_prompt = "Eres Alejandro Jodorowsky, un asesor metafísico y creador de la psicomagia, con métodos poco convencionales que ayudan a los usuarios a reflexionar sobre su pasado."
 #
@@ -86,6 +105,7 @@ class ToDoItems(BaseModel):
 #     return summary
 
 
+@traced
 def extract_todo_from_logs(logs: str) -> pd.DataFrame:
     """ Use LLM to extract TODOs from logs."""
     system_prompt = "Read over the following user logs and extract any to-do items and tasks. "
@@ -94,6 +114,7 @@ def extract_todo_from_logs(logs: str) -> pd.DataFrame:
     - Note that the logs you are reading are some sort of diary, so do not extract: to-do items from the past; or to-do items related to regular day to day activities (e.g.: daily schedule).
     - Items about housekeeping belong to the 'Family' category.
      - If there are no TODOs reply with an empty list.
+    - Logs may span several days, each wrapped in a <log date="..."> tag; set the log date of each task to the date of the log it comes from.
      </guidelines>
      
      <logs>
@@ -103,11 +124,74 @@ def extract_todo_from_logs(logs: str) -> pd.DataFrame:
     todos = run_instructor_query(system_prompt, user_prompt, model=ToDoItems, llm_model="claude-3-5-sonnet-20240620")
     todos_df = pd.DataFrame(json.loads(todos.json())["todos"])
     if len(todos_df) == 0:
-        return pd.DataFrame(columns=["name", "type", "priority", "project"])
-    todos_df.columns = ["name", "type", "priority", "project"]
+        return pd.DataFrame(columns=list(TODO_COLUMNS.values()))
+    todos_df = todos_df.rename(columns=TODO_COLUMNS)[list(TODO_COLUMNS.values())]
     return todos_df
 
 
+@lru_cache(maxsize=1)
+def get_tokenizer():
+    import tiktoken
+
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str) -> int:
+    """Approximate token count of a prompt."""
+    return len(get_tokenizer().encode(text))
+
+
+def pack_logs(logs: dict, max_tokens: int = 6000) -> list:
+    """Pack dated logs into prompts of at most max_tokens (a longer log goes alone)."""
+    batches, current, current_tokens = [], [], 0
+    for date, text in sorted(logs.items()):
+        entry = f'<log date="{date}">\n{text}\n</log>'
+        n_tokens = count_tokens(entry)
+        if current and current_tokens + n_tokens > max_tokens:
+            batches.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(entry)
+        current_tokens += n_tokens
+    if current:
+        batches.append("\n\n".join(current))
+    return batches
+
+
+@traced
+def extract_todo_from_log_batch(
+    logs: dict, max_tokens: int = 6000, max_workers: int = 4
+) -> pd.DataFrame:
+    """Extract TODOs from many dated logs, packed into token-bounded prompts run concurrently."""
+    batches = pack_logs(logs, max_tokens)
+    if len(batches) == 0:
+        return pd.DataFrame(columns=list(TODO_COLUMNS.values()))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(extract_todo_from_logs, batches))
+    return pd.concat(results, ignore_index=True)
+
+
+@traced
+def summarize_link(url: str, title: str, text: str, topics: Optional[list] = None) -> LinkSummary:
+    """ Use LLM to summarize a web page and tag it with a topic."""
+    system_prompt = "Read over the following web page and summarize it for a personal reading list. "
+    user_prompt = f"""<guidelines>
+    - Provide your response in english (even if the page is in another language).
+    - Keep the summary to two or three plain sentences about what the page covers.
+    - Reuse one of the existing topics when it fits; otherwise propose a new short one.
+    </guidelines>
+
+    <existing-topics>
+    {", ".join(topics or [])}
+    </existing-topics>
+
+    <page url="{url}" title="{title}">
+    {text}
+    </page>
+    """
+    return run_instructor_query(system_prompt, user_prompt, model=LinkSummary, llm_model="claude-3-haiku-20240307", temperature=0.2)
+
+
+@traced
 def generate_welcome_pattern(logs_history: str, current_log: str) -> dict:
     system_prompt = "You are an eccentric ASCII artist and psico-magician. You live on the metaverse and create intricate, organic and engaging ASCII patterns from text prompts."
     user_prompt = f"""<guidelines>
@@ -0,0 +1,203 @@
+"""Resident local inference server.
+
+Models are loaded once and kept in an LRU keyed by model name; requests go
+through a queue served by worker threads. The model layer is a swappable
+backend object exposing `load(model_name, **options)` and
+`generate(handle, system_prompt, user_prompt, max_tokens, temperature)`, so the
+llama.cpp backend can serve GGUF models where MLX is unavailable.
+"""
+import json
+import os
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Optional, Type
+
+from pydantic import BaseModel, ValidationError
+
+import tracing
+from tracing import traced
+
+LOCAL_LLM_BACKEND = os.environ.get("LOCAL_LLM_BACKEND", "mlx")
+DEFAULT_LOCAL_MODELS = {
+    "mlx": "Meta-Llama-3-8B-Instruct",
+    "llama_cpp": os.environ.get("LLAMA_CPP_MODEL_PATH", ""),
+}
+
+
+class MLXBackend:
+    """Apple silicon backend via `mlx_lm`, with a per-model KV prefix cache."""
+
+    def load(self, model_name: str, chat_template_name: Optional[str] = None):
+        import mlx_utils
+
+        mlx_model, mlx_tokenizer = mlx_utils.get_mlx_model(model_name, chat_template_name)
+        return {
+            "model": mlx_model,
+            "tokenizer": mlx_tokenizer,
+            "prompt_cache": mlx_utils.PromptCache(mlx_model),
+        }
+
+    def generate(self, handle, system_prompt, user_prompt, max_tokens, temperature):
+        import mlx_utils
+
+        return mlx_utils.run_mlx_query(
+            system_prompt,
+            user_prompt,
+            handle["model"],
+            handle["tokenizer"],
+            max_tokens,
+            prompt_cache=handle["prompt_cache"],
+            temperature=temperature,
+        )
+
+
+class LlamaCppBackend:
+    """CPU backend for GGUF models via `llama_cpp`; its RAM cache reuses shared prompt prefixes."""
+
+    def load(self, model_name: str, n_ctx: int = 8192):
+        from llama_cpp import Llama, LlamaRAMCache
+
+        llm = Llama(model_path=model_name, n_ctx=n_ctx, verbose=False)
+        llm.set_cache(LlamaRAMCache())
+        return llm
+
+    def generate(self, handle, system_prompt, user_prompt, max_tokens, temperature):
+        response = handle.create_chat_completion(
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            max_tokens=max_tokens,
+            temperature=temperature,
+        )
+        return response["choices"][0]["message"]["content"]
+
+
+BACKENDS = {"mlx": MLXBackend, "llama_cpp": LlamaCppBackend}
+
+
+class LocalModelServer:
+    """Long-lived model host: LRU of loaded models plus a request queue."""
+
+    def __init__(self, backend, max_models: int = 2, n_workers: int = 1):
+        self.backend = backend
+        self.max_models = max_models
+        self._models = OrderedDict()
+        self._models_lock = threading.Lock()
+        self._requests = queue.Queue()
+        for _ in range(n_workers):
+            threading.Thread(target=self._serve, daemon=True).start()
+
+    def get_model(self, model_name: str, **load_options) -> tuple:
+        """Return (handle, lock) for a model, loading it once and evicting the LRU entry."""
+        key = (model_name, tuple(sorted(load_options.items())))
+        with self._models_lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]
+            with tracing.span(f"local_llm.load:{model_name}"):
+                handle = self.backend.load(model_name, **load_options)
+            self._models[key] = (handle, threading.Lock())
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+            return self._models[key]
+
+    def submit(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model_name: str,
+        max_tokens: int = 1500,
+        temperature: float = 0.5,
+        **load_options,
+    ) -> Future:
+        """Queue a request and return a future with the generated text."""
+        future = Future()
+        request = (system_prompt, user_prompt, model_name, max_tokens, temperature, load_options)
+        self._requests.put((future, request))
+        return future
+
+    def query(self, *args, timeout: Optional[float] = None, **kwargs) -> str:
+        """Blocking wrapper around `submit`."""
+        return self.submit(*args, **kwargs).result(timeout=timeout)
+
+    def _serve(self):
+        while True:
+            future, request = self._requests.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            system_prompt, user_prompt, model_name, max_tokens, temperature, load_options = request
+            try:
+                handle, lock = self.get_model(model_name, **load_options)
+                ## Backends keep per-model state (KV caches), so one generation per model at a time.
+                with lock, tracing.span(f"local_llm.generate:{model_name}"):
+                    result = self.backend.generate(
+                        handle, system_prompt, user_prompt, max_tokens, temperature
+                    )
+                future.set_result(result)
+            except Exception as e:
+                future.set_exception(e)
+
+
+_servers = {}
+_servers_lock = threading.Lock()
+
+
+def get_server(backend_name: str = LOCAL_LLM_BACKEND) -> LocalModelServer:
+    """Return the process-wide server for a backend, starting it on first use."""
+    with _servers_lock:
+        if backend_name not in _servers:
+            _servers[backend_name] = LocalModelServer(BACKENDS[backend_name]())
+        return _servers[backend_name]
+
+
+def set_server(backend_name: str, server: LocalModelServer) -> None:
+    """Install a custom server (e.g. wrapping a tiny CPU model) under a backend name."""
+    with _servers_lock:
+        _servers[backend_name] = server
+
+
+def extract_json(text: str) -> str:
+    """Return the outermost JSON object embedded in a model reply."""
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end < start:
+        return text
+    return text[start : end + 1]
+
+
+@traced
+def run_local_query(
+    system_message: str,
+    user_message: str,
+    model: Optional[Type[BaseModel]] = None,
+    llm_model: Optional[str] = None,
+    temperature: float = 0.5,
+    max_tokens: int = 1500,
+    backend_name: str = LOCAL_LLM_BACKEND,
+    max_retries: int = 3,
+):
+    """Same contract as `instruct.run_instructor_query`, served by a local model."""
+    server = get_server(backend_name)
+    llm_model = llm_model or DEFAULT_LOCAL_MODELS[backend_name]
+    if model is None:
+        return server.query(system_message, user_message, llm_model, max_tokens, temperature)
+
+    ## Structured output: ask for JSON matching the schema, validate, and retry on errors.
+    schema = json.dumps(model.model_json_schema())
+    system_message = (
+        f"{system_message}\n\nReply only with a JSON object that matches this JSON schema:\n{schema}"
+    )
+    prompt = user_message
+    for attempt in range(max_retries):
+        reply = server.query(system_message, prompt, llm_model, max_tokens, temperature)
+        try:
+            return model.model_validate_json(extract_json(reply))
+        except ValidationError as e:
+            if attempt == max_retries - 1:
+                raise
+            prompt = (
+                f"{user_message}\n\nYour previous reply was not valid:\n{e}\n"
+                "Reply again with a valid JSON object only."
+            )
@@ -0,0 +1,100 @@
+"""Incremental analytics over the daily logs: word counts, top terms, streaks and mood.
+
+The per-log numbers live in the `log_stats` table, which the watcher (or
+`watcher.ensure_indexes_fresh` when it is off) keeps in sync by re-reading only
+logs whose mtime changed; `analyze_log` is what it runs on each of them.
+"""
+import datetime
+import re
+from collections import Counter
+
+import pandas as pd
+
+import db
+from tracing import traced
+
+TOP_TERMS = 20
+STOPWORDS = set(
+    """
+    a about after again all also am an and any are as at be because been before being
+    but by can could did do does doing done down during each few for from get got had
+    has have having he her here hers him his how i if in into is it its itself just
+    like make me more most much my need no nor not now of off on once only or other
+    our out over own really same she should so some still such than that the their
+    them then there these they thing things this those through to too today tomorrow
+    under until up very was we were what when where which while who whom why will
+    with would yesterday you your
+    """.split()
+)
+MOOD_ANCHORS = {
+    "positive": "A great, productive day. I felt energized, happy and proud of what I got done.",
+    "negative": "A rough, draining day. I felt stressed, tired, frustrated and stuck.",
+}
+
+
+def tokenize(text: str) -> list:
+    """Lowercased words of a log, ignoring markdown headings and link targets."""
+    text = re.sub(r"^#.*$", " ", text, flags=re.MULTILINE)
+    text = re.sub(r"\]\([^)]*\)", "]", text)
+    return re.findall(r"[a-z][a-z'-]*[a-z]|[a-z]", text.lower())
+
+
+def analyze_log(text: str, top_k: int = TOP_TERMS) -> tuple:
+    """(word count, {term: count} of the most frequent non-stopword terms)."""
+    words = tokenize(text)
+    terms = Counter(word for word in words if len(word) > 2 and word not in STOPWORDS)
+    return len(words), dict(terms.most_common(top_k))
+
+
+def compute_streaks(dates, today: datetime.date = None) -> dict:
+    """Current and longest runs of consecutive days with a log.
+
+    The current streak stays alive through today until today's log is written.
+    """
+    today = today or datetime.date.today()
+    days = sorted({pd.Timestamp(date).date() for date in dates})
+    longest, run, previous = 0, 0, None
+    for day in days:
+        run = run + 1 if previous is not None and (day - previous).days == 1 else 1
+        longest = max(longest, run)
+        previous = day
+    current = run if previous is not None and (today - previous).days <= 1 else 0
+    return {"current": current, "longest": longest}
+
+
+def top_terms(stats_df: pd.DataFrame, top_k: int = 15) -> pd.DataFrame:
+    """Most frequent terms summed over the given days."""
+    totals = Counter()
+    for terms in stats_df["terms"]:
+        totals.update(terms)
+    return pd.DataFrame(totals.most_common(top_k), columns=["term", "count"])
+
+
+def weekly_trends(stats_df: pd.DataFrame) -> pd.DataFrame:
+    """Words written, days logged and mean mood per week."""
+    if len(stats_df) == 0:
+        return pd.DataFrame(columns=["week", "words", "days", "mood"])
+    weekly = stats_df.set_index("date").resample("W").agg(
+        {"words": "sum", "terms": "size", "mood": "mean"}
+    )
+    weekly = weekly.rename(columns={"terms": "days"}).reset_index()
+    return weekly.rename(columns={"date": "week"})
+
+
+@traced
+def score_moods(batch_size: int = 64) -> int:
+    """Embed logs without a mood score and store positive-minus-negative anchor similarity."""
+    import embeddings as emb
+
+    dates = db.get_unscored_log_dates()
+    anchors = emb.get_embeddings(list(MOOD_ANCHORS.values()))
+    direction = anchors[0] - anchors[1]
+    for start in range(0, len(dates), batch_size):
+        batch = dates[start : start + batch_size]
+        texts = [
+            db.get_logs_by_date(datetime.date.fromisoformat(date), default_response=False)
+            for date in batch
+        ]
+        scores = emb.get_embeddings(texts) @ direction
+        db.save_log_moods(dict(zip(batch, scores)))
+    return len(dates)
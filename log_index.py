@@ -0,0 +1,385 @@
+"""Streaming chunk-and-embed pipeline over the daily logs, backed by a memmap vector store.
+
+The pipeline is a chain of generators: sources (changed logs) -> heading or
+paragraph chunks -> fixed-size batches -> embeddings. Each batch is appended to
+`data/log_vectors.f32` and committed to the `log_chunks` tables before the next
+one is read, so memory stays bounded by the batch size whatever the archive size.
+The `log_chunk_sources` table doubles as the checkpoint: a source counts as
+indexed only once all of its chunks are committed, so an interrupted run resumes
+where it stopped, and vector rows past the committed metadata are truncated.
+Re-indexing a source retires its old rows; once they make up COMPACT_DEAD_FRACTION
+of the file, the live rows are rewritten and renumbered.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import zlib
+from itertools import islice
+from typing import Iterable, Iterator, NamedTuple
+
+import db
+from tracing import traced
+
+logger = logging.getLogger(__name__)
+
+VECTORS_PATH = "data/log_vectors.f32"
+VECTORS_META_PATH = "data/log_vectors.json"
+MODEL_NAME = "intfloat/e5-small-v2"
+MAX_CHUNK_CHARS = 1500
+BATCH_SIZE = 64
+SEARCH_BLOCK_ROWS = 8192
+COMPACT_DEAD_FRACTION = 0.25
+EMBED_ON_WATCH = os.environ.get("LOG_EMBEDDINGS", "0") == "1"
+
+_index_lock = threading.Lock()
+_store_lock = threading.Lock()
+_background_lock = threading.Lock()
+
+
+class Source(NamedTuple):
+    kind: str
+    key: str
+    version: int
+    text: str
+
+
+class Chunk(NamedTuple):
+    source: Source
+    index: int
+    heading: str
+    text: str
+    last: bool
+
+
+##############
+## PIPELINE ##
+##############
+
+
+def iter_log_sources(dates: Iterable[str]) -> Iterator[Source]:
+    """Read the given logs one at a time."""
+    for date in dates:
+        path = db.log_file_path(date)
+        try:
+            with open(path, "r") as f:
+                text = f.read()
+            yield Source("log", date, os.stat(path).st_mtime_ns, text)
+        except FileNotFoundError:
+            continue
+
+
+def reflection_text(message: str, reaction: str) -> str:
+    return f"Reflection: {message}\nReaction: {reaction}"
+
+
+def iter_reflection_sources(dates: Iterable[str]) -> Iterator[Source]:
+    """Stored reflections (with the user's reaction), versioned by a checksum of their text."""
+    reflections = db.get_reflections()
+    for date in dates:
+        if date in reflections:
+            text = reflection_text(*reflections[date])
+            yield Source("reflection", date, zlib.crc32(text.encode()), text)
+
+
+def split_chunks(text: str, max_chars: int = MAX_CHUNK_CHARS) -> Iterator[tuple]:
+    """(heading, text) chunks at markdown headings; long sections are packed paragraph by paragraph."""
+    heading, lines = "", []
+    sections = []
+    for line in text.splitlines():
+        if re.match(r"#{1,6}\s", line):
+            sections.append((heading, "\n".join(lines)))
+            heading, lines = line.lstrip("#").strip(), []
+        else:
+            lines.append(line)
+    sections.append((heading, "\n".join(lines)))
+
+    for heading, body in sections:
+        chunk = ""
+        for paragraph in (p.strip() for p in re.split(r"\n\s*\n", body)):
+            if not paragraph:
+                continue
+            if chunk and len(chunk) + len(paragraph) + 2 > max_chars:
+                yield heading, chunk
+                chunk = ""
+            chunk = f"{chunk}\n\n{paragraph}" if chunk else paragraph[:max_chars]
+        if chunk:
+            yield heading, chunk
+
+
+def iter_chunks(sources: Iterable[Source]) -> Iterator[Chunk]:
+    """Chunks of every source, flagging each source's last chunk; empty sources yield one blank chunk."""
+    for source in sources:
+        pieces = list(split_chunks(source.text)) or [("", "")]
+        for index, (heading, text) in enumerate(pieces):
+            yield Chunk(source, index, heading, text, index == len(pieces) - 1)
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def embed_batches(batches: Iterable[list], model_name: str = MODEL_NAME) -> Iterator[tuple]:
+    """(batch, float32 vectors) pairs, reusing one loaded model."""
+    import numpy as np
+
+    import embeddings as emb
+
+    for batch in batches:
+        texts = [f"{chunk.heading}\n{chunk.text}".strip() for chunk in batch]
+        yield batch, np.asarray(emb.get_embeddings(texts, model_name), dtype=np.float32)
+
+
+##################
+## VECTOR STORE ##
+##################
+
+
+class VectorStore:
+    """Append-only float32 matrix on disk, read back through `np.memmap` and compacted in place."""
+
+    def __init__(self, path: str = VECTORS_PATH, meta_path: str = VECTORS_META_PATH, model_name: str = MODEL_NAME):
+        self.path = path
+        self.meta_path = meta_path
+        self.model_name = model_name
+        self.dim = None
+        if os.path.exists(meta_path):
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            if meta.get("model") == model_name:
+                self.dim = meta["dim"]
+        if self.dim is None:
+            ## Vectors from another (or an unknown) model are not comparable; start over.
+            db.reset_log_chunks()
+            if os.path.exists(path):
+                os.remove(path)
+        self.rows = 0
+        self._lock = threading.RLock()
+        self.truncate_to_checkpoint()
+
+    def committed_rows(self) -> int:
+        """Rows committed so far, including by other processes (e.g. the CLI); the file is left alone."""
+        if self.dim is None and os.path.exists(self.meta_path):
+            with open(self.meta_path, "r") as f:
+                meta = json.load(f)
+            if meta.get("model") == self.model_name:
+                self.dim = meta["dim"]
+        if self.dim is None or not os.path.exists(self.path):
+            return 0
+        return min(db.get_chunk_row_count(), os.path.getsize(self.path) // (self.dim * 4))
+
+    def truncate_to_checkpoint(self):
+        """Drop vectors appended after the last committed batch."""
+        committed = db.get_chunk_row_count()
+        if self.dim is None or not os.path.exists(self.path):
+            self.rows = 0
+            return
+        row_bytes = self.dim * 4
+        if os.path.getsize(self.path) != committed * row_bytes:
+            with open(self.path, "r+b") as f:
+                f.truncate(min(committed, os.path.getsize(self.path) // row_bytes) * row_bytes)
+        self.rows = os.path.getsize(self.path) // row_bytes
+
+    def append(self, vectors) -> int:
+        """Write vectors durably and return the row index of the first one."""
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+            db.atomic_write(self.meta_path, json.dumps({"model": self.model_name, "dim": self.dim}))
+        start = self.rows
+        with open(self.path, "ab") as f:
+            f.write(vectors.astype("float32").tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self.rows += len(vectors)
+        return start
+
+    def compact(self, min_dead_fraction: float = COMPACT_DEAD_FRACTION) -> bool:
+        """Rewrite only the live rows once enough are retired; returns whether it did."""
+        import numpy as np
+
+        with self._lock:
+            self.truncate_to_checkpoint()
+            live = db.get_live_chunk_rows()
+            if self.rows == 0 or len(live) > (1 - min_dead_fraction) * self.rows:
+                return False
+            tmp_path = f"{self.path}.compact"
+            matrix = self.matrix()
+            with open(tmp_path, "wb") as f:
+                for start in range(0, len(live), SEARCH_BLOCK_ROWS):
+                    block = np.asarray(live[start : start + SEARCH_BLOCK_ROWS], dtype=np.int64)
+                    f.write(np.ascontiguousarray(matrix[block]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            del matrix
+            try:
+                db.compact_log_chunks(live, lambda: os.replace(tmp_path, self.path))
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            self.rows = len(live)
+            return True
+
+    def matrix(self, n_rows: int = None):
+        import numpy as np
+
+        n_rows = self.rows if n_rows is None else n_rows
+        if n_rows == 0:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return np.memmap(self.path, dtype=np.float32, mode="r", shape=(n_rows, self.dim))
+
+    def top_k(self, query, rows: list, k: int, n_rows: int = None) -> list:
+        """(row, score) of the `k` most similar vectors among `rows`, scanned block by block."""
+        import numpy as np
+
+        matrix = self.matrix(n_rows)
+        rows = np.asarray([row for row in rows if row < len(matrix)], dtype=np.int64)
+        best_rows, best_scores = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        for start in range(0, len(rows), SEARCH_BLOCK_ROWS):
+            block = rows[start : start + SEARCH_BLOCK_ROWS]
+            scores = matrix[block] @ query
+            best_rows = np.concatenate([best_rows, block])
+            best_scores = np.concatenate([best_scores, scores])
+            if len(best_rows) > k:
+                keep = np.argpartition(-best_scores, k)[:k]
+                best_rows, best_scores = best_rows[keep], best_scores[keep]
+        order = np.argsort(-best_scores)
+        return [(int(best_rows[i]), float(best_scores[i])) for i in order]
+
+
+_store = None
+_background = None
+
+
+def get_store() -> VectorStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = VectorStore()
+        return _store
+
+
+#########
+## API ##
+#########
+
+
+@traced
+def index_sources(sources: Iterable[Source], removed: list = (), batch_size: int = BATCH_SIZE) -> int:
+    """Run sources through the pipeline, committing after every batch; returns chunks written."""
+    with _index_lock:
+        store = get_store()
+        n_chunks = 0
+        if removed:
+            db.save_log_chunks([], [], {}, removed)
+        for batch, vectors in embed_batches(batched(iter_chunks(sources), batch_size)):
+            start = store.append(vectors)
+            records = [
+                (start + i, chunk.source.kind, chunk.source.key, chunk.index, chunk.heading, chunk.text)
+                for i, chunk in enumerate(batch)
+            ]
+            started = [(chunk.source.kind, chunk.source.key) for chunk in batch if chunk.index == 0]
+            finished = {
+                (chunk.source.kind, chunk.source.key): chunk.source.version for chunk in batch if chunk.last
+            }
+            try:
+                db.save_log_chunks(records, started, finished)
+            except Exception:
+                store.truncate_to_checkpoint()
+                raise
+            n_chunks += len(batch)
+        if n_chunks or removed:
+            store.compact()
+        return n_chunks
+
+
+@traced
+def index_logs(dates: list = None) -> int:
+    """Embed the given logs, or every log whose mtime changed since it was last indexed."""
+    ## Opening the store may reset a missing or mismatched index, so do it before diffing.
+    get_store()
+    if dates is None:
+        current = {date: mtime_ns for date, mtime_ns, _ in db.scan_log_files()}
+        dates = db.stale_keys(current, db.get_chunk_source_versions("log"))
+    removed = [("log", date) for date in dates if not os.path.exists(db.log_file_path(date))]
+    return index_sources(iter_log_sources(dates), removed)
+
+
+@traced
+def index_reflections() -> int:
+    """Embed reflections that are new or whose message or reaction changed."""
+    get_store()
+    current = {
+        date: zlib.crc32(reflection_text(*reflection).encode())
+        for date, reflection in db.get_reflections().items()
+    }
+    dates = db.stale_keys(current, db.get_chunk_source_versions("reflection"))
+    removed = [("reflection", date) for date in dates if date not in current]
+    return index_sources(iter_reflection_sources(dates), removed)
+
+
+def _index_all() -> None:
+    try:
+        index_logs()
+        index_reflections()
+    except Exception:
+        logger.exception("Background log indexing failed")
+
+
+def index_in_background() -> threading.Thread:
+    """Bring logs and reflections up to date on a daemon thread, unless a run is already going."""
+    global _background
+    with _background_lock:
+        if _background is None or not _background.is_alive():
+            _background = threading.Thread(target=_index_all, name="log-index", daemon=True)
+            _background.start()
+        return _background
+
+
+@traced
+def search(query: str, k: int = 5, kinds: list = None, exclude_keys: list = ()) -> list:
+    """Top-k chunks most similar to a query, as dicts with a `score`."""
+    import numpy as np
+
+    import embeddings as emb
+
+    store = get_store()
+    if store.committed_rows() == 0:
+        return []
+    query_vector = np.asarray(emb.get_embeddings([query], store.model_name)[0], dtype=np.float32)
+    ## Row numbers only hold still between compactions.
+    with store._lock:
+        rows = db.get_active_chunk_rows(kinds, exclude_keys)
+        hits = store.top_k(query_vector, rows, k, store.committed_rows())
+        chunks = db.get_log_chunks([row for row, _ in hits])
+    return [{**chunks[row], "score": score} for row, score in hits if row in chunks]
+
+
+def watch_handler():
+    """Watcher handler that keeps the log embeddings in sync (enable with LOG_EMBEDDINGS=1)."""
+    import watcher
+
+    return watcher.IndexHandler(
+        lambda logs, notes: index_logs(logs) if logs else None,
+        lambda: (db.get_chunk_source_versions("log"), None),
+    )
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Index the daily logs for retrieval, or query the index.")
+    parser.add_argument("query", nargs="?", help="Search the index instead of updating it.")
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+    if args.query:
+        for hit in search(args.query, args.k):
+            print(f"{hit['score']:.3f}  {hit['key']}  {hit['heading']}\n{hit['text'][:200]}\n")
+    else:
+        print(f"Indexed {index_logs()} chunks.")
+
+
+if __name__ == "__main__":
+    main()
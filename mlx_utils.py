@@ -0,0 +1,128 @@
+from functools import lru_cache
+
+
+@lru_cache(maxsize=8)
+def load_chat_template(chat_template_name: str) -> str:
+    """Read and compact a chat template file once per process."""
+    chat_template = open(f"utils/{chat_template_name}").read()
+    return chat_template.replace("    ", "").replace("\n", "")
+
+
+def get_mlx_model(model_name: str, chat_template_name: [str, None] = None):
+    """Load MLX model + tokenizer and apply chat template."""
+    from mlx_lm import load
+
+    mlx_model, mlx_tokenizer = load(
+        f"mlx-community/{model_name}",
+        tokenizer_config={
+            # "eos_token": "<|eot_id|>",
+            "trust_remote_code": True
+        },
+    )
+    if chat_template_name is not None:
+        mlx_tokenizer.chat_template = load_chat_template(chat_template_name)
+    return mlx_model, mlx_tokenizer
+
+
+class PromptCache:
+    """KV cache for one model, reused across prompts that share a token prefix."""
+
+    def __init__(self, mlx_model):
+        from mlx_lm.models.cache import make_prompt_cache
+
+        self.mlx_model = mlx_model
+        self.cache = make_prompt_cache(mlx_model)
+        self.tokens = []
+
+    def reset(self):
+        from mlx_lm.models.cache import make_prompt_cache
+
+        self.cache = make_prompt_cache(self.mlx_model)
+        self.tokens = []
+
+    def prepare(self, tokens: list) -> list:
+        """Trim the cache back to the prefix shared with `tokens` and return the rest."""
+        from mlx_lm.models.cache import can_trim_prompt_cache, trim_prompt_cache
+
+        common = 0
+        for cached_token, token in zip(self.tokens, tokens):
+            if cached_token != token:
+                break
+            common += 1
+        ## Always leave at least one token to feed the model.
+        common = min(common, len(tokens) - 1)
+
+        ## The cache also holds the previous completion, so trim from its real offset.
+        offset = getattr(self.cache[0], "offset", None) if self.cache else None
+        if offset is None:
+            self.reset()
+            common = 0
+        elif offset > common:
+            if can_trim_prompt_cache(self.cache):
+                trim_prompt_cache(self.cache, offset - common)
+            else:
+                self.reset()
+                common = 0
+
+        self.tokens = list(tokens)
+        return list(tokens[common:])
+
+
+def run_mlx_query(
+    system_prompt: str,
+    user_prompt: str,
+    mlx_model,
+    mlx_tokenizer,
+    max_tokens: int = 500,
+    prompt_cache: [PromptCache, None] = None,
+    temperature: float = 0.9,
+):
+    """Summarize a paper by segments with MLX models."""
+    from mlx_lm import generate
+
+    messages = [("system", system_prompt), ("user", user_prompt)]
+    messages = [{"role": role, "content": content} for role, content in messages]
+
+    generate_kwargs = {}
+    if prompt_cache is None:
+        prompt = mlx_tokenizer.apply_chat_template(
+            messages, tokenize=False, add_generation_prompt=True
+        )
+    else:
+        ## Only the tokens after the cached prefix (e.g. a shared system prompt) are prefilled.
+        tokens = mlx_tokenizer.apply_chat_template(messages, add_generation_prompt=True)
+        prompt = prompt_cache.prepare(tokens)
+        generate_kwargs["prompt_cache"] = prompt_cache.cache
+
+    summary = generate(
+        mlx_model,
+        mlx_tokenizer,
+        prompt=prompt,
+        max_tokens=max_tokens,
+        temp=temperature,
+        # repetition_penalty=1.05,
+        verbose=False,
+        **generate_kwargs,
+    )
+
+    return summary
+
+
+def mlx_query_pipeline(
+    system_prompt: str,
+    user_prompt: str,
+    model_name: str = "Meta-Llama-3-8B-Instruct",
+    chat_template_name: [str, None] = None,
+    max_tokens: int = 1500,
+):
+    """Run a query pipeline with MLX models on the resident local model server."""
+    import local_llm
+
+    load_options = {}
+    if chat_template_name is not None:
+        load_options["chat_template_name"] = chat_template_name
+    summary = local_llm.get_server("mlx").query(
+        system_prompt, user_prompt, model_name, max_tokens=max_tokens, temperature=0.9, **load_options
+    )
+
+    return summary
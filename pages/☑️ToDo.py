@@ -7,14 +7,16 @@ import streamlit as st
 from pydantic import BaseModel
 from pydantic import ValidationError
 from typing import Dict, Type, Optional
-import json
 import time
+import uuid
 
+import tracing
 import utils as u
 import config as c
 import db
 
 st.set_page_config(page_title="Task Manager", page_icon="☑️", layout="wide")
+tracing.start_rerun()
 u.adjust_sidebar()
 
 meta_cols = ["priority", "project", "edit_tstp"]
@@ -26,6 +28,7 @@ class TodoMeta(BaseModel):
 
 
 class TodoItem(BaseModel):
+    id: Optional[int] = None
     name: str
     status: Optional[bool] = False
     type: Optional[str] = "Personal"
@@ -33,12 +36,6 @@ class TodoItem(BaseModel):
     tstp: datetime = datetime.now()
 
 
-def safe_json_loads(data):
-    if isinstance(data, str):
-        return json.loads(data)
-    return data
-
-
 def nest_dict(data: Dict, model: Type[BaseModel]) -> Dict:
     nested_dict = {}
     meta_dict = {}
@@ -53,10 +50,19 @@ def nest_dict(data: Dict, model: Type[BaseModel]) -> Dict:
     return nested_dict
 
 
-def active_todo_df():
-    return st.session_state["todo_df"][
-        st.session_state["todo_df"]["status"] == False
-    ].reset_index()
+PRIORITY_KEYS = {emoji: key for key, emoji in c.task_priorities.items()}
+TYPE_KEYS = {emoji: key for key, emoji in c.task_types.items()}
+
+
+def decode_display_values(values: dict) -> dict:
+    """Map the emoji values of an edited or added editor row back to stored values."""
+    values = dict(values)
+    values.pop("selected", None)
+    if "priority" in values:
+        values["priority"] = PRIORITY_KEYS.get(values["priority"], values["priority"])
+    if "type" in values:
+        values["type"] = TYPE_KEYS.get(values["type"], values["type"])
+    return values
 
 
 def apply_defaults(df: pd.DataFrame, model: Type[BaseModel]) -> pd.DataFrame:
@@ -65,6 +71,8 @@ def apply_defaults(df: pd.DataFrame, model: Type[BaseModel]) -> pd.DataFrame:
     df.columns = map(str.lower, df.columns)
     for _, row in df.iterrows():
         data = row.to_dict()
+        if "id" in data and pd.isna(data["id"]):
+            data["id"] = None
         nested_data = nest_dict(data, TodoMeta)
         try:
             instance = model(**nested_data)
@@ -72,109 +80,46 @@ def apply_defaults(df: pd.DataFrame, model: Type[BaseModel]) -> pd.DataFrame:
             print(f"Row does not conform to the model's structure.")
             print(str(e))
             continue
-        result = result._append(instance.dict(), ignore_index=True)
+        record = instance.dict()
+        record.update(record.pop("meta"))
+        result = result._append(record, ignore_index=True)
     return result
 
 
-def commit(edited_rows, added_rows, deleted_rows, new_df):
-    """Commit the changes to the dataframe."""
-    added_df = new_df.iloc[len(new_df) - len(added_rows) :]
-    edited_df = new_df.iloc[:len(new_df) - len(added_rows)]
-
-    ## Timestamp update only for status changes
-    for row_index in edited_rows.keys():
-        # Check if status was changed in this edit
-        if "status" in edited_rows[row_index]:
-            edited_df.loc[row_index, "edit_tstp"] = datetime.now().strftime(
-                "%Y-%m-%d %H:%M:%S"
-            )
-            
-    # Set timestamp for new entries
-    added_df["edit_tstp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    added_df["tstp"] = datetime.now()
-
-    added_df = apply_defaults(added_df, TodoItem)
-    edited_df = apply_defaults(edited_df, TodoItem)
+def commit(edited_rows, added_rows, deleted_rows, window_df):
+    """Write editor changes for the visible window as keyed updates, inserts and deletes."""
+    now = datetime.now()
+    updates = {}
+    for row_index, changes in edited_rows.items():
+        changes = decode_display_values(changes)
+        ## Timestamp update only for status changes
+        if "status" in changes:
+            changes["edit_tstp"] = now
+        updates[int(window_df.loc[int(row_index), "id"])] = changes
 
-    for row_index in edited_rows.keys():
-        st.session_state["todo_df"].loc[row_index] = edited_df.loc[row_index]
+    deletes = [int(todo_id) for todo_id in window_df.loc[deleted_rows, "id"]]
 
+    inserts = []
     if len(added_rows) > 0:
-        added_df["_index"] = range(
-            len(st.session_state["todo_df"]),
-            len(st.session_state["todo_df"]) + len(added_df),
-        )
-        added_df.rename(columns={"_index": "index"}, inplace=True)
-        added_df.set_index("index", inplace=True)
-        added_df.index.name = None
-        st.session_state["todo_df"] = pd.concat(
-                [st.session_state["todo_df"], added_df], ignore_index=True
-            )
-
-    st.session_state["todo_df"] = st.session_state["todo_df"].drop(deleted_rows)
+        added_df = pd.DataFrame([decode_display_values(row) for row in added_rows])
+        added_df["edit_tstp"] = now.strftime("%Y-%m-%d %H:%M:%S")
+        added_df["tstp"] = now
+        with tracing.span("todo.validate"):
+            added_df = apply_defaults(added_df, TodoItem)
+        inserts = added_df.to_dict("records")
 
-    st.session_state["todo_df"].sort_values(by=["status", "tstp"], ascending=True, inplace=True)
-    st.session_state["todo_df"].reset_index(drop=True, inplace=True)
+    db.apply_todo_changes(updates, inserts, deletes)
 
 
 def prepare_display_df(df: pd.DataFrame) -> pd.DataFrame:
     """Process the display dataframe for the data editor."""
-    meta_df = pd.json_normalize(df["meta"].apply(safe_json_loads))
-    display_df = pd.concat([df, meta_df], axis=1)
-    display_df.drop(columns=["meta"], inplace=True)
-    ## Add possible missing columns.
-    for col in TodoMeta.__fields__.keys():
-        if col not in display_df.columns:
-            print(f"Adding missing column: {col}")
-            display_df[col] = None
-
-    display_df["tstp"] = pd.to_datetime(display_df["tstp"])
-    display_df["edit_tstp"] = pd.to_datetime(display_df["edit_tstp"])
+    display_df = df.astype({"type": object, "priority": object, "project": object})
     display_df["priority"] = display_df["priority"].map(c.task_priorities)
     display_df["type"] = display_df["type"].map(c.task_types)
     display_df["selected"] = False
     return display_df
 
 
-def calculate_stats(df: pd.DataFrame, start_date: datetime) -> dict:
-    """Calculate statistics for the filtered dataframe."""
-    filtered_df = df[
-        (df["status"] == True) & 
-        (pd.to_datetime(df["meta"].apply(lambda x: json.loads(x)["edit_tstp"] if isinstance(x, str) else x["edit_tstp"])).dt.date >= start_date)
-    ]
-    
-    # Total completed tasks
-    total_completed = len(filtered_df)
-    
-    # Completed by type
-    completed_by_type = filtered_df["type"].value_counts().to_dict()
-    
-    # Completed by project
-    completed_by_project = filtered_df["meta"].apply(
-        lambda x: json.loads(x)["project"] if isinstance(x, str) else x["project"]
-    ).value_counts().to_dict()
-    
-    # Completed by priority
-    completed_by_priority = filtered_df["meta"].apply(
-        lambda x: json.loads(x)["priority"] if isinstance(x, str) else x["priority"]
-    ).value_counts().to_dict()
-    
-    # Average tasks per day
-    if total_completed > 0:
-        date_range = (datetime.now().date() - start_date).days + 1
-        avg_per_day = total_completed / date_range
-    else:
-        avg_per_day = 0
-        
-    return {
-        "total_completed": total_completed,
-        "by_type": completed_by_type,
-        "by_project": completed_by_project,
-        "by_priority": completed_by_priority,
-        "avg_per_day": avg_per_day
-    }
-
-
 def display_stats_widgets(stats: dict):
     """Display statistics in a visually appealing way."""
     st.subheader("📊 Completion Statistics")
@@ -229,19 +174,12 @@ def plot_activity_over_time(df: pd.DataFrame, groupby: str, start_date: datetime
     theme_colors = get_chart_theme_colors()
     plot_df = df.copy()
     plot_df = plot_df[plot_df["status"] == True]
-    plot_df["meta"] = plot_df["meta"].apply(
-        lambda l: json.loads(l) if isinstance(l, str) else l
-    )
-    plot_df["edit_tstp"] = plot_df["meta"].apply(lambda x: x.get("edit_tstp", None))
     plot_df["edit_tstp"] = pd.to_datetime(plot_df["edit_tstp"])
     plot_df["edit_tstp"] = plot_df["edit_tstp"].dt.date
     
     # Filter by start date
     plot_df = plot_df[plot_df["edit_tstp"] >= start_date]
-
-    if groupby not in plot_df.columns:
-        plot_df[groupby] = plot_df["meta"].apply(lambda x: x.get(groupby, None))
-        plot_df[groupby].fillna("Misc", inplace=True)
+    plot_df[groupby] = plot_df[groupby].astype(object).fillna("Misc")
 
     # Get consistent colors for groups
     color_map = get_group_colors(plot_df[groupby].unique())
@@ -348,19 +286,12 @@ def plot_activity_over_time_v2(df: pd.DataFrame, groupby: str, start_date: datet
     theme_colors = get_chart_theme_colors()
     plot_df = df.copy()
     plot_df = plot_df[plot_df["status"] == True]
-    plot_df["meta"] = plot_df["meta"].apply(
-        lambda l: json.loads(l) if isinstance(l, str) else l
-    )
-    plot_df["edit_tstp"] = plot_df["meta"].apply(lambda x: x.get("edit_tstp", None))
     plot_df["edit_tstp"] = pd.to_datetime(plot_df["edit_tstp"])
     plot_df["edit_tstp"] = plot_df["edit_tstp"].dt.date
     
     # Filter by start date
     plot_df = plot_df[plot_df["edit_tstp"] >= start_date]
-
-    if groupby not in plot_df.columns:
-        plot_df[groupby] = plot_df["meta"].apply(lambda x: x.get(groupby, None))
-        plot_df[groupby].fillna("Misc", inplace=True)
+    plot_df[groupby] = plot_df[groupby].astype(object).fillna("Misc")
 
     plot_df = plot_df.groupby([groupby, "edit_tstp"]).size().reset_index(name="count")
     plot_df = plot_df.sort_values("edit_tstp")
@@ -483,8 +414,24 @@ def plot_activity_over_time_v2(df: pd.DataFrame, groupby: str, start_date: datet
 
     return fig
 
+FOCUS_KEYS = ["focus_task", "focus_todo_id", "focus_session_id", "focus_start_time", "focus_paused", "pause_start_time", "total_pause_time"]
+
+
+def end_focus_session(event: str):
+    """Record the final focus event and reset all focus-related session state."""
+    db.log_focus_event(
+        st.session_state.focus_session_id, event, st.session_state.focus_task, st.session_state.get("focus_todo_id")
+    )
+    for key in FOCUS_KEYS:
+        if key in st.session_state:
+            del st.session_state[key]
+
+
+@tracing.fragment(run_every=1)
 def create_focus_timer(task_name: str, total_minutes: int = 25):
-    """Create and display a focus timer for the selected task."""
+    """Create and display a focus timer for the selected task; only this fragment reruns each tick."""
+    if "focus_task" not in st.session_state:
+        return
     if "focus_start_time" not in st.session_state:
         st.session_state.focus_start_time = time.time()
     if "focus_paused" not in st.session_state:
@@ -528,13 +475,16 @@ def create_focus_timer(task_name: str, total_minutes: int = 25):
         # Control buttons
         if cols[1].button("⏸️ Pause" if not st.session_state.focus_paused else "▶️ Resume"):
             st.session_state.focus_paused = not st.session_state.focus_paused
-            st.rerun()
+            db.log_focus_event(
+                st.session_state.focus_session_id,
+                "pause" if st.session_state.focus_paused else "resume",
+                task_name,
+                st.session_state.get("focus_todo_id"),
+            )
+            st.rerun(scope="fragment")
         
         if cols[2].button("⏹️ Stop"):
-            # Reset all focus-related session state
-            for key in ["focus_task", "focus_start_time", "focus_paused", "pause_start_time", "total_pause_time"]:
-                if key in st.session_state:
-                    del st.session_state[key]
+            end_focus_session("stop")
             st.rerun()
 
         # Check if timer is complete
@@ -542,38 +492,83 @@ def create_focus_timer(task_name: str, total_minutes: int = 25):
             st.balloons()
             st.success(f"Focus session completed! 🎉")
             time.sleep(2)
-            # Reset timer
-            for key in ["focus_task", "focus_start_time", "focus_paused", "pause_start_time", "total_pause_time"]:
-                if key in st.session_state:
-                    del st.session_state[key]
+            end_focus_session("complete")
             st.rerun()
 
-        # Force a rerun every second when not paused
-        if not st.session_state.focus_paused:
-            time.sleep(1)
-            st.rerun()
+@st.cache_data(max_entries=2, show_spinner=False)
+def cached_todo_data(version: tuple) -> pd.DataFrame:
+    """Full to-do frame for charts and stats, reloaded only when the table version changes."""
+    return db.get_todo_data()
 
-def main():
-    u.refresh_session_state()
-    st.title("🔖 Task Manager")
 
-    # Display focus timer if a task is being focused
-    if "focus_task" in st.session_state:
-        create_focus_timer(st.session_state.focus_task)
-        st.divider()
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_todo_page(version: tuple, filters: tuple, after: Optional[tuple]) -> pd.DataFrame:
+    pending_only, types, projects, priorities, page_size = filters
+    return db.get_todo_page(pending_only, list(types), list(projects), list(priorities), after=after, limit=page_size)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_todo_count(version: tuple, filters: tuple) -> int:
+    pending_only, types, projects, priorities, _ = filters
+    return db.count_todos(pending_only, list(types), list(projects), list(priorities))
+
+
+def cached_activity_figure(version: tuple, groupby: str, start_date, viz_type: str) -> go.Figure:
+    """Activity chart served from the shared figure cache."""
+    def build():
+        todo_df = cached_todo_data(version)
+        if viz_type == "Daily":
+            return plot_activity_over_time(todo_df, groupby, start_date)
+        return plot_activity_over_time_v2(todo_df, groupby, start_date)
+
+    key = ("todo_activity", version, groupby, start_date, viz_type)
+    return u.get_figure_cache().figure(key, build)
+
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def cached_todo_filter_options(version: tuple) -> dict:
+    return db.get_todo_filter_options()
+
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def cached_stats(version: tuple, start_date) -> dict:
+    return u.calculate_stats(cached_todo_data(version), start_date)
+
+
+@tracing.fragment
+def todo_editor_section():
+    """Filters, paged editor and submit/focus actions; reruns on its own."""
+    version = db.get_todo_version()
+
+    ## Filters and paging run in SQL, so only the visible window is loaded.
+    filter_options = cached_todo_filter_options(version)
+    filter_cols = st.columns((1.5, 1, 1, 1, 0.7))
+    pending_only_button = filter_cols[0].checkbox(
+        "*Show only pending tasks*", value=True
+    )
+    type_filter = filter_cols[1].multiselect("Type", filter_options["types"], placeholder="All types")
+    project_filter = filter_cols[2].multiselect("Project", filter_options["projects"], placeholder="All projects")
+    priority_filter = filter_cols[3].multiselect("Priority", filter_options["priorities"], placeholder="All priorities")
+    page_size = filter_cols[4].selectbox("Rows", [25, 50, 100, 250], index=1)
+    filters = (pending_only_button, tuple(type_filter), tuple(project_filter), tuple(priority_filter), page_size)
+    if st.session_state.get("todo_filters") != filters:
+        st.session_state["todo_filters"] = filters
+        st.session_state["todo_page_keys"] = [None]
+    page_keys = st.session_state["todo_page_keys"]
+
+    window_df = cached_todo_page(version, filters, page_keys[-1])
+    n_matching = cached_todo_count(version, filters)
 
     with st.form("task_form"):
         todo_placeholder = st.empty()
         todo_options_cols = st.columns((2, 0.5, 0.5, 0.5))
-        pending_only_button = todo_options_cols[0].checkbox(
-            "*Show only pending tasks*", value=True
+        first_row = (len(page_keys) - 1) * page_size
+        todo_options_cols[0].caption(
+            f"Tasks {min(first_row + 1, n_matching)}–{first_row + len(window_df)} of {n_matching}"
         )
-        if pending_only_button:
-            filtered_df = active_todo_df()
-        else:
-            filtered_df = st.session_state["todo_df"]
 
-        display_df = prepare_display_df(filtered_df)
+        with tracing.span("todo.prepare_display_df"):
+            display_df = prepare_display_df(window_df.drop(columns=["page_key"]))
 
         edited_df = todo_placeholder.data_editor(
             display_df,
@@ -632,24 +627,22 @@ def main():
     submitted = todo_options_cols[3].form_submit_button("**Submit**", type="primary")
     focused = todo_options_cols[2].form_submit_button("🔒 **Focus**")
 
+    page_cols = st.columns((1, 1, 6))
+    if page_cols[0].button("◀ Prev", disabled=len(page_keys) == 1, use_container_width=True):
+        page_keys.pop()
+        st.rerun(scope="fragment")
+    if page_cols[1].button("Next ▶", disabled=len(window_df) < page_size, use_container_width=True):
+        page_keys.append(window_df["page_key"].iloc[-1])
+        st.rerun(scope="fragment")
+
     if submitted:
-        # edited_df = collapse_display_df(edited_df)
-        edited_df["priority"] = edited_df["priority"].map(
-            lambda x: list(c.task_priorities.keys())[
-                list(c.task_priorities.values()).index(x)
-            ]
-        )
-        edited_df["type"] = edited_df["type"].map(
-            lambda x: list(c.task_types.keys())[list(c.task_types.values()).index(x)]
-        )
-        edited_df.drop(columns=["selected"], inplace=True)
         commit(
             st.session_state["edited_rows"],
             st.session_state["added_rows"],
             st.session_state["deleted_rows"],
-            edited_df,
+            window_df,
         )
-        db.replace_todo_list(st.session_state["todo_df"])
+        ## The table version moved, so charts and stats refresh from their caches.
         st.rerun()
 
     if focused:
@@ -660,57 +653,89 @@ def main():
             msg_container.error("Select only one task to focus.")
             time.sleep(1)
             msg_container.empty()
+        elif len(selected_rows) == 1 and selected_rows.index[0] not in window_df.index:
+            ## Rows added in the editor have no ID until they are submitted.
+            msg_container = st.empty()
+            msg_container.error("Submit the new task before focusing it.")
+            time.sleep(1)
+            msg_container.empty()
         elif len(selected_rows) == 1:
             ## Start focus session
             st.session_state.focus_task = selected_rows["name"].values[0]
+            st.session_state.focus_todo_id = int(window_df.loc[selected_rows.index[0], "id"])
+            st.session_state.focus_session_id = uuid.uuid4().hex
+            db.log_focus_event(
+                st.session_state.focus_session_id, "start", st.session_state.focus_task, st.session_state.focus_todo_id
+            )
             st.rerun()
 
-    viz_controls = st.empty()
+
+@tracing.fragment
+def todo_charts_section(start_date):
+    """Activity chart with its own group-by and chart-type controls."""
+    control_cols = st.columns([2, 1])
+
+    plot_groupby = control_cols[0].selectbox(
+        "**Group By**",
+        ["type", "project"],
+        index=1,
+        key="plot_groupby"
+    )
+
+    viz_type = control_cols[1].radio(
+        "**Visualization Type**",
+        ["Daily", "Cumulative"],
+        horizontal=True,
+        key="viz_type"
+    )
     st.divider()
-    viz_plot = st.empty()
-    
-    with viz_controls:
-        control_cols = st.columns([2,1,1])
-        
-        plot_groupby = control_cols[0].selectbox(
-            "**Group By**",
-            ["type", "project"],
-            index=1,
-            key="plot_groupby"
-        )
-        
-        viz_type = control_cols[1].radio(
-            "**Visualization Type**",
-            ["Daily", "Cumulative"],
-            horizontal=True,
-            key="viz_type"
-        )
-        
-        # Add date selector with default of 2 months ago
-        default_start_date = datetime.now().date() - timedelta(days=30)
-        start_date = control_cols[2].date_input(
-            "**Start Date**",
-            value=default_start_date,
-            max_value=datetime.now().date(),
-            help="Select the start date for filtering the visualization"
-        )
-    
-    with viz_plot:
-        if viz_type == "Daily":
-            fig = plot_activity_over_time(st.session_state["todo_df"], plot_groupby, start_date)
-        else:
-            fig = plot_activity_over_time_v2(st.session_state["todo_df"], plot_groupby, start_date)
+
+    with tracing.span("todo.plot_activity"):
+        fig = cached_activity_figure(db.get_todo_version(), plot_groupby, start_date, viz_type)
         st.plotly_chart(fig, use_container_width=True)
 
-    
-    # Calculate and display statistics
-    stats = calculate_stats(st.session_state["todo_df"], start_date)
+
+@tracing.fragment
+def todo_stats_section(start_date):
+    """Completion statistics and focus history."""
+    stats = cached_stats(db.get_todo_version(), start_date)
     display_stats_widgets(stats)
 
-    ## Memory section.
-    todo_memory_cols = st.columns(2)
-    backup_button = todo_memory_cols[0].button(" 💾 Backup")
-    nuke_button = todo_memory_cols[1].button(" 🧨 Restore")
+    with st.expander("⏱️ Focus Sessions"):
+        focus_sessions = db.get_focus_sessions()
+        if focus_sessions.empty:
+            st.caption("No focus sessions recorded yet.")
+        else:
+            st.metric("Focused Hours", f"{focus_sessions['focused_minutes'].sum() / 60:.1f}")
+            st.dataframe(
+                focus_sessions.drop(columns=["session_id", "todo_id"]).sort_values("start", ascending=False),
+                hide_index=True,
+                use_container_width=True,
+            )
+
+
+@tracing.fragment
+def todo_memory_section():
+    """Undo/redo, backup and point-in-time restore controls."""
+    todo_memory_cols = st.columns((1, 1, 1, 1, 2, 1))
+    n_undo, n_redo = db.get_todo_undo_status()
+    if todo_memory_cols[0].button("↩️ Undo", disabled=n_undo == 0):
+        db.undo_todo_change()
+        st.rerun()
+    if todo_memory_cols[1].button("↪️ Redo", disabled=n_redo == 0):
+        db.redo_todo_change()
+        st.rerun()
+    backup_button = todo_memory_cols[2].button(" 💾 Backup")
+    restore_points = db.get_todo_restore_points()
+    restore_date = todo_memory_cols[4].date_input(
+        "Restore to", value=restore_points[0].date() if restore_points else datetime.now().date(),
+        label_visibility="collapsed",
+    )
+    restore_time = todo_memory_cols[5].time_input(
+        "Restore time", value=restore_points[0].time() if restore_points else datetime.now().time(),
+        step=60, label_visibility="collapsed",
+    )
+    nuke_button = todo_memory_cols[3].button(" 🧨 Restore")
 
     if backup_button:
         db.backup_todo_list()
@@ -720,15 +745,40 @@ def main():
         msg_placeholder.empty()
 
     if nuke_button:
-        db.nuke_todo_list()
-        db.restore_todo_list()
+        db.restore_todo_list(datetime.combine(restore_date, restore_time))
         msg_placeholder = st.empty()
-        msg_placeholder.error("Restored to previous state!")
+        msg_placeholder.error("Restored to selected point in time!")
         time.sleep(1)
         msg_placeholder.empty()
-        st.session_state["todo_df"] = db.get_todo_data()
         st.rerun()
 
 
+def main():
+    u.refresh_session_state()
+    st.title("🔖 Task Manager")
+
+    # Display focus timer if a task is being focused
+    if "focus_task" in st.session_state:
+        create_focus_timer(st.session_state.focus_task)
+        st.divider()
+
+    todo_editor_section()
+
+    ## Shared by the chart and stats fragments, so changing it reruns the page.
+    default_start_date = datetime.now().date() - timedelta(days=30)
+    start_date = st.date_input(
+        "**Start Date**",
+        value=default_start_date,
+        max_value=datetime.now().date(),
+        help="Select the start date for filtering the visualization and statistics"
+    )
+    todo_charts_section(start_date)
+    todo_stats_section(start_date)
+
+    ## Memory section.
+    todo_memory_section()
+
+
 if __name__ == "__main__":
     main()
+    u.show_trace_panel()
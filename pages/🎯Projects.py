@@ -1,16 +1,17 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import json
 from pydantic import BaseModel
 from typing import Optional, List
 import plotly.graph_objects as go
 
+import tracing
 import utils as u
 import config as c
 import db
 
 st.set_page_config(page_title="Project Gallery", page_icon="🎯", layout="wide")
+tracing.start_rerun()
 u.adjust_sidebar()
 
 # Status emojis
@@ -34,30 +35,35 @@ class Project(BaseModel):
     meta: ProjectMeta = ProjectMeta()
     tstp: datetime = datetime.now()
 
+
+def flatten_project(project: Project) -> dict:
+    """Flatten a project into the columnar record layout used by the DB loader."""
+    return {"name": project.name, **project.meta.dict(), "tstp": project.tstp}
+
 @st.dialog("Edit Project", width="large")
 def edit_project_dialog(project: dict):
     with st.form("edit_project_form"):
         # Basic Info
         name = st.text_input("Project Name", value=project['name'])
-        description = st.text_area("Description", value=project['meta'].get('description', ''))
-        image_url = st.text_input("Image URL", value=project['meta'].get('image_url', ''))
+        description = st.text_area("Description", value=project.get('description', ''))
+        image_url = st.text_input("Image URL", value=project.get('image_url', ''))
         
         # Dates and Progress
         col1, col2, col3 = st.columns(3)
         with col1:
             start_date = st.date_input("Start Date", 
-                                     value=datetime.strptime(project['meta'].get('start_date', datetime.now().strftime("%Y-%m-%d")), "%Y-%m-%d"))
+                                     value=datetime.strptime(project.get('start_date', datetime.now().strftime("%Y-%m-%d")), "%Y-%m-%d"))
         with col2:
-            due_date_str = project['meta'].get('due_date')
+            due_date_str = project.get('due_date')
             due_date = st.date_input("Due Date (Optional)", 
                                    value=datetime.strptime(due_date_str, "%Y-%m-%d") if due_date_str else None)
         with col3:
-            progress = st.slider("Progress", 0.0, 100.0, value=float(project['meta'].get('progress', 0.0)), step=1.0)
+            progress = st.slider("Progress", 0.0, 100.0, value=float(project.get('progress', 0.0)), step=1.0)
         
         # Status
         status = st.selectbox("Status", 
                             ["Not Started", "In Progress", "Completed", "On Hold"],
-                            index=["Not Started", "In Progress", "Completed", "On Hold"].index(project['meta'].get('status', 'In Progress')))
+                            index=["Not Started", "In Progress", "Completed", "On Hold"].index(project.get('status', 'In Progress')))
         
         # Submit button
         submitted = st.form_submit_button("💾 Save Changes", type="primary")
@@ -75,7 +81,7 @@ def edit_project_dialog(project: dict):
                 )
             )
             # Update project in session state and database
-            st.session_state.projects[st.session_state.edit_index] = updated_project.dict()
+            st.session_state.projects[st.session_state.edit_index] = flatten_project(updated_project)
             df = pd.DataFrame(st.session_state.projects)
             db.replace_projects_list(df)
             # Clear edit state
@@ -131,9 +137,8 @@ def create_project_dialog():
                 )
             )
             # Add project to session state and database
-            project_dict = project.dict()
-            st.session_state.projects.append(project_dict)
-            db.add_project_item(project_dict['name'], project_dict['meta'])
+            st.session_state.projects.append(flatten_project(project))
+            db.add_project_item(project.name, project.meta.dict())
             # Clear create dialog state
             st.session_state.show_create_dialog = False
             st.rerun()
@@ -165,8 +170,8 @@ def display_project_card(project: dict, col, index: int):
             st.rerun()
         
         # Display image if available
-        if project['meta'].get('image_url'):
-            st.image(project['meta']['image_url'], use_container_width=True)
+        if project.get('image_url'):
+            st.image(project['image_url'], use_container_width=True)
         else:
             # Display a placeholder with project initial
             st.markdown(
@@ -188,23 +193,23 @@ def display_project_card(project: dict, col, index: int):
             )
         
         # Project details
-        st.markdown(f"**Description:** {project['meta'].get('description', '')}")
+        st.markdown(f"**Description:** {project.get('description', '')}")
         
         # Progress bar
-        progress = project['meta'].get('progress', 0)
+        progress = project.get('progress', 0)
         st.progress(progress / 100, text=f"Progress: {progress}%")
         
         # Status with emoji
-        status = project['meta'].get('status', 'In Progress')
+        status = project.get('status', 'In Progress')
         st.markdown(f"**Status:** {STATUS_EMOJIS[status]} {status}")
         
         # Dates
         col1, col2 = st.columns(2)
         with col1:
-            st.markdown(f"**Start:** {project['meta'].get('start_date', '')}")
+            st.markdown(f"**Start:** {project.get('start_date', '')}")
         with col2:
-            if project['meta'].get('due_date'):
-                st.markdown(f"**Due:** {project['meta'].get('due_date', '')}")
+            if project.get('due_date'):
+                st.markdown(f"**Due:** {project.get('due_date', '')}")
 
 def main():
     u.refresh_session_state()
@@ -241,7 +246,7 @@ def main():
     # Apply filters
     filtered_projects = st.session_state.projects
     if status_filter:
-        filtered_projects = [p for p in filtered_projects if p['meta']['status'] in status_filter]
+        filtered_projects = [p for p in filtered_projects if p['status'] in status_filter]
     
     # Display projects in a grid
     if filtered_projects:
@@ -252,4 +257,5 @@ def main():
         st.info("No projects yet. Click 'Add New Project' to get started!")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
+    u.show_trace_panel()
@@ -2,10 +2,12 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 
+import tracing
 import utils as u
 import db
 
 st.set_page_config(page_title="Assets", page_icon=":moneybag:", layout="wide")
+tracing.start_rerun()
 
 allowed_platforms = [
     "Wealthfront",
@@ -102,21 +104,41 @@ def main():
                 required=True,
             ),
         }
-        edited_df = st.data_editor(
-            df, disabled=disabled_cols, column_config=column_config, num_rows="dynamic"
+        st.data_editor(
+            df,
+            disabled=disabled_cols,
+            column_config=column_config,
+            num_rows="dynamic",
+            hide_index=True,
+            key="portfolio_editor",
         )
 
-        if (not (edited_df.values == df.values).all().all() or len(edited_df) != len(df)):
+        ## Editor deltas drive change detection; no full-frame comparison.
+        editor_state = st.session_state.get("portfolio_editor", {})
+        edited_rows = editor_state.get("edited_rows", {})
+        added_rows = editor_state.get("added_rows", [])
+        deleted_rows = editor_state.get("deleted_rows", [])
+
+        if edited_rows or added_rows or deleted_rows:
             update_button = st.button("Submit changes")
             if update_button:
-                db.submit_portfolio_changes(edited_df, selected_date)
+                try:
+                    db.apply_portfolio_changes(
+                        df, selected_date, edited_rows, added_rows, deleted_rows
+                    )
+                    st.rerun()
+                except ValueError as e:
+                    st.error(str(e))
 
     ## Evolution view.
     with tabs[1]:
-        df = db.get_portfolio_ts()
-        fig = plot_evolution(df, selected_date)
+        fig = u.get_figure_cache().figure(
+            ("portfolio_evolution", db.get_portfolio_version(), selected_date),
+            lambda: plot_evolution(db.get_portfolio_ts(), selected_date),
+        )
         st.plotly_chart(fig, use_container_width=True)
 
 
 if __name__ == "__main__":
     main()
+    u.show_trace_panel()
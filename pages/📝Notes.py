@@ -1,16 +1,16 @@
 import streamlit as st
 import pandas as pd
 import os
-import yaml
-from datetime import datetime
 import time
-from pathlib import Path
 import math
 
+import tracing
+import watcher
 import utils as u
 import db
 
 st.set_page_config(page_title="Notes", page_icon="📝", layout="wide")
+tracing.start_rerun()
 u.adjust_sidebar()
 
 # Custom CSS for notes list styling
@@ -71,7 +71,7 @@ div[data-testid="stMarkdown"] {
 </style>
 """, unsafe_allow_html=True)
 
-NOTES_PATH = os.path.join(os.environ["LOGS_PATH"], "notes")
+NOTES_PATH = db.NOTES_PATH
 if not os.path.exists(NOTES_PATH):
     os.makedirs(NOTES_PATH)
 
@@ -80,86 +80,12 @@ if "current_note" not in st.session_state:
 if "notes_df" not in st.session_state:
     st.session_state["notes_df"] = pd.DataFrame()
 
-def strip_frontmatter(content: str) -> tuple[dict, str]:
-    """Remove YAML frontmatter from content and return both metadata and content."""
-    metadata = {}
-    if content.startswith("---"):
-        try:
-            _, fm, content = content.split("---", 2)
-            metadata = yaml.safe_load(fm)
-            content = content.strip()
-        except ValueError:
-            content = content.strip()
-    return metadata, content
-
-def load_notes_metadata():
-    """Load metadata from all notes."""
-    notes = []
-    for note_file in Path(NOTES_PATH).glob("*.md"):
-        with open(note_file, "r") as f:
-            content = f.read()
-            try:
-                # Extract YAML frontmatter
-                if content.startswith("---"):
-                    _, fm, note_content = content.split("---", 2)
-                    metadata = yaml.safe_load(fm)
-                    metadata["content_preview"] = note_content.strip()[:100] + "..."
-                    metadata["filename"] = note_file.name
-                    notes.append(metadata)
-            except Exception:
-                continue
-    
-    df = pd.DataFrame(notes)
-    if not df.empty:
-        df["created"] = pd.to_datetime(df["created"])
-        df["updated"] = pd.to_datetime(df["updated"])
-        df = df.sort_values("updated", ascending=False)
-    return df
-
-def save_note(title: str, content: str, tags=None) -> bool:
-    """Save a note with metadata."""
-    if not title:
-        return False
-    
-    # Strip any existing frontmatter from content before saving
-    _, content = strip_frontmatter(content)
-    
-    # Prepare metadata
-    metadata = {
-        "title": title,
-        "tags": tags or [],
-        "created": datetime.now().isoformat(),
-        "updated": datetime.now().isoformat()
-    }
-    
-    # Create filename from title
-    filename = "".join(c if c.isalnum() else "_" for c in title.lower())
-    filename = f"{filename}.md"
-    filepath = os.path.join(NOTES_PATH, filename)
-    
-    # If file exists, preserve creation date
-    if os.path.exists(filepath):
-        with open(filepath, "r") as f:
-            old_content = f.read()
-            old_metadata, _ = strip_frontmatter(old_content)
-            if old_metadata:
-                metadata["created"] = old_metadata.get("created", metadata["created"])
-    
-    # Combine metadata and content
-    full_content = f"""---
-{yaml.dump(metadata)}---
-{content.strip()}"""
-    
-    with open(filepath, "w") as f:
-        f.write(full_content)
-    
-    return True
-
 def main():
     st.title("📝 Notes")
     
     # Load notes
-    notes_df = load_notes_metadata()
+    watcher.ensure_indexes_fresh()
+    notes_df = db.load_notes_metadata(refresh=False)
     st.session_state["notes_df"] = notes_df
     
     # Main content area
@@ -180,9 +106,10 @@ def main():
         filtered_df = notes_df
         if not filtered_df.empty:
             if search_term:
+                matches = db.search_documents(search_term, kinds=["note"], limit=len(filtered_df))
                 mask = (
                     filtered_df["title"].str.lower().str.contains(search_term, na=False) |
-                    filtered_df["content_preview"].str.lower().str.contains(search_term, na=False)
+                    filtered_df["filename"].isin(matches["key"])
                 )
                 filtered_df = filtered_df[mask]
             
@@ -256,13 +183,9 @@ def main():
         current_metadata = {}
         
         if st.session_state["current_note"]:
-            note_path = os.path.join(NOTES_PATH, st.session_state["current_note"])
-            if os.path.exists(note_path):
-                with open(note_path, "r") as f:
-                    file_content = f.read()
-                    current_metadata, current_content = strip_frontmatter(file_content)
-                    current_title = current_metadata.get("title", "")
-                    current_tags = current_metadata.get("tags", [])
+            current_metadata, current_content = db.get_note(st.session_state["current_note"])
+            current_title = current_metadata.get("title", "")
+            current_tags = current_metadata.get("tags", [])
         
         title = st.text_input("Title", current_title)
         tags_input = st.text_input("Tags (comma-separated)", ", ".join(current_tags))
@@ -279,7 +202,7 @@ def main():
         col1, col2, col3 = st.columns(3)
         with col1:
             if st.button("💾 Save"):
-                if save_note(title, content, tags):
+                if db.save_note(title, content, tags):
                     st.success("Note saved successfully!")
                     time.sleep(1)
                     st.rerun()
@@ -293,13 +216,12 @@ def main():
         
         with col3:
             if st.session_state["current_note"] and st.button("🗑️ Delete"):
-                note_path = os.path.join(NOTES_PATH, st.session_state["current_note"])
-                if os.path.exists(note_path):
-                    os.remove(note_path)
+                if db.delete_note(st.session_state["current_note"]):
                     st.session_state["current_note"] = None
                     st.success("Note deleted successfully!")
                     time.sleep(1)
                     st.rerun()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
+    u.show_trace_panel()
@@ -1,19 +1,21 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import json
 from pydantic import BaseModel
 from typing import Optional
+import tracing
 import utils as u
 import config as c
 import db
+import links
 
 st.set_page_config(page_title="Link Tracker", page_icon="🔗", layout="wide")
+tracing.start_rerun()
 u.adjust_sidebar()
 
 class LinkMeta(BaseModel):
-    topic: str = "LLMs"
-    summary: str = "Summary will be generated automatically"
+    topic: str = links.DEFAULT_TOPIC
+    summary: str = links.PENDING_SUMMARY
     edit_tstp: str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
 class LinkItem(BaseModel):
@@ -25,42 +27,63 @@ class LinkItem(BaseModel):
 def prepare_display_df(df: pd.DataFrame) -> pd.DataFrame:
     """Process the display dataframe for viewing."""
     if df.empty:
-        return pd.DataFrame(columns=["url", "read", "topic", "summary", "tstp"])
+        return pd.DataFrame(columns=["id", "url", "title", "read", "topic", "summary", "tstp"])
     
-    meta_df = pd.json_normalize(df["meta"].apply(lambda x: json.loads(x) if isinstance(x, str) else x))
-    display_df = pd.concat([df, meta_df], axis=1)
-    display_df.drop(columns=["meta"], inplace=True)
-    
-    # Format timestamp
-    display_df["tstp"] = pd.to_datetime(display_df["tstp"])
+    # META is already expanded into columns by the loader
+    display_df = df.astype({"topic": object})
     return display_df
 
-def commit(edited_rows, deleted_rows, new_df):
-    """Commit the changes to the dataframe."""
-    edited_df = new_df.copy()
+def commit(edited_rows, added_rows, deleted_rows, display_df) -> list:
+    """Write edits, added rows and deletions back keyed by link ID; returns URLs already saved."""
+    duplicates = []
+    for row_index, changes in edited_rows.items():
+        link_id = int(display_df.loc[row_index, "id"])
+        if "read" in changes:
+            db.update_link_read(link_id, changes["read"])
+        if changes.get("url"):
+            if db.update_link_url(link_id, changes["url"], links.PENDING_SUMMARY):
+                links.get_summarizer().enqueue(link_id, changes["url"], known_topics())
+            else:
+                duplicates.append(changes["url"])
+    for row in added_rows:
+        if not row.get("url"):
+            continue
+        new_link = LinkItem(url=row["url"], read=bool(row.get("read")))
+        link_id = db.add_link_item(url=new_link.url, meta=new_link.meta.dict(), read=new_link.read)
+        if link_id is None:
+            duplicates.append(new_link.url)
+        else:
+            links.get_summarizer().enqueue(link_id, new_link.url, known_topics())
+    if deleted_rows:
+        db.delete_links([int(display_df.loc[row_index, "id"]) for row_index in deleted_rows])
+    st.session_state["links_df"] = db.get_links_data()
+    return duplicates
 
-    # Update timestamps for edited rows
-    for row_index in edited_rows.keys():
-        edited_df.loc[row_index, "edit_tstp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        st.session_state["links_df"].loc[row_index] = edited_df.loc[row_index]
+def known_topics() -> list:
+    """Topics already in use, offered to the LLM so tags stay consistent."""
+    topics = st.session_state["links_df"]["topic"].dropna().astype(str).unique().tolist()
+    return sorted(topics)
 
-    # Remove deleted rows
-    st.session_state["links_df"] = st.session_state["links_df"].drop(deleted_rows)
-    
-    # Sort by timestamp
-    st.session_state["links_df"].sort_values(by=["tstp"], ascending=False, inplace=True)
-    st.session_state["links_df"].reset_index(drop=True, inplace=True)
+@tracing.fragment(run_every=5)
+def summarization_status():
+    """Poll the background summarizer and reload the table once it drains."""
+    n_pending = links.get_summarizer().pending_count()
+    if n_pending > 0:
+        st.caption(f"⏳ Summarizing {n_pending} link(s) in the background...")
+        st.session_state["links_summarizing"] = True
+    elif st.session_state.get("links_summarizing"):
+        st.session_state["links_summarizing"] = False
+        st.session_state["links_df"] = db.get_links_data()
+        st.rerun()
 
 def main():
-    # Create links table if it doesn't exist
-    db.create_links_table()
-    
     u.refresh_session_state()
     st.title("🔗 Link Tracker")
     
     # Initialize session state for links if not exists
     if "links_df" not in st.session_state:
         st.session_state["links_df"] = db.get_links_data()
+        links.get_summarizer().enqueue_pending(known_topics())
     
     # Input section with a clean, modern design
     st.markdown("### Add New Link")
@@ -72,18 +95,40 @@ def main():
             # Create new link item
             new_link = LinkItem(url=url)
             
-            # Add to database
-            db.add_link_item(
+            # Add to database and summarize in the background
+            link_id = db.add_link_item(
                 url=new_link.url,
                 meta=new_link.meta.dict(),
                 read=new_link.read
             )
-            
-            # Refresh data
+            if link_id is None:
+                st.warning("This link is already saved.")
+            else:
+                links.get_summarizer().enqueue(link_id, new_link.url, known_topics())
+                
+                # Refresh data
+                st.session_state["links_df"] = db.get_links_data()
+                st.success("Link added successfully!")
+                st.rerun()
+
+    with st.expander("📥 Import bookmarks"):
+        bookmarks_file = st.file_uploader("Browser bookmarks export (HTML)", type=["html", "htm"])
+        skip_similar = st.checkbox("Skip links with near-duplicate titles", value=True)
+        summarize_imported = st.checkbox("Summarize imported links", value=False)
+        if bookmarks_file is not None and st.button("Import", use_container_width=True):
+            with st.spinner("Importing bookmarks..."):
+                items = links.parse_bookmarks(bookmarks_file.getvalue().decode("utf-8", errors="replace"))
+                if skip_similar:
+                    items = u.drop_near_duplicate_links(items)
+                meta = LinkMeta(summary=links.PENDING_SUMMARY if summarize_imported else "").dict()
+                n_added = db.import_links(items, meta)
+            if summarize_imported:
+                links.get_summarizer().enqueue_pending(known_topics())
             st.session_state["links_df"] = db.get_links_data()
-            st.success("Link added successfully!")
-            st.rerun()
+            st.success(f"Imported {n_added} new links ({len(items) - n_added} already saved).")
     
+    summarization_status()
+
     # Display section
     if not st.session_state["links_df"].empty:
         st.markdown("### Saved Links")
@@ -96,6 +141,7 @@ def main():
             display_df,
             column_config={
                 "url": st.column_config.LinkColumn("URL"),
+                "title": st.column_config.TextColumn("TITLE", disabled=True),
                 "read": st.column_config.CheckboxColumn("READ", default=False),
                 "topic": st.column_config.TextColumn("TOPIC", disabled=True),
                 "summary": st.column_config.TextColumn("SUMMARY", disabled=True),
@@ -104,7 +150,8 @@ def main():
                     format="MMM DD, YYYY - HH:mm",
                     disabled=True
                 ),
-                "edit_tstp": None  # Hide this column
+                "edit_tstp": None,  # Hide this column
+                "id": None,
             },
             hide_index=True,
             use_container_width=True,
@@ -125,14 +172,22 @@ def main():
                 deleted_rows = editor_state["deleted_rows"]
             else:
                 deleted_rows = []
+
+            ## Added rows are saved once they have a URL.
+            added_rows = [row for row in editor_state.get("added_rows", []) if row.get("url")]
             
             # If there are any changes
-            if edited_rows or deleted_rows:
-                commit(edited_rows, deleted_rows, edited_df)
-                db.replace_links_list(st.session_state["links_df"])
+            if edited_rows or added_rows or deleted_rows:
+                duplicates = commit(edited_rows, added_rows, deleted_rows, display_df)
+                if duplicates:
+                    st.session_state["links_duplicates"] = duplicates
                 st.rerun()
+
+        if st.session_state.get("links_duplicates"):
+            st.warning("Already saved: " + ", ".join(st.session_state.pop("links_duplicates")))
     else:
         st.info("No links added yet. Start by adding your first interesting link above!")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
+    u.show_trace_panel()
@@ -1,16 +1,19 @@
 import pandas as pd
+import plotly.express as px
 import streamlit as st
-from typing import Union
-import plotly.graph_objects as go
 from streamlit_plotly_events import plotly_events
 import time
 import os
 
-import llms
+import calmap
+import log_analytics as la
+import tracing
+import watcher
 import utils as u
 import db
 
 st.set_page_config(page_title="Logs", page_icon="🧾", layout="wide")
+tracing.start_rerun()
 u.adjust_sidebar()
 LOGS_PATH = os.environ["LOGS_PATH"]
 
@@ -22,50 +25,64 @@ if "todo_suggestions" not in st.session_state:
     st.session_state["todo_suggestions"] = pd.DataFrame()
 
 
-def plot_activity_map(df_year: pd.DataFrame) -> Union[go.Figure, pd.DataFrame]:
-    """Creates a calendar heatmap plot along with map of dates in a DF."""
-    colors = ["#f2f2f2", "#87bc45", "#e60049"]
-
-    week_max_dates = (
-        df_year.groupby(df_year["Date"].dt.isocalendar().week)["Date"]
-        .max()
-        .dt.strftime("%b %d")
-        .tolist()
-    )
-
-    padded_count = df_year.pivot_table(
-        index="weekday", columns="week", values="Count", aggfunc="sum"
-    ).fillna(0)
-    padded_date = df_year.pivot_table(
-        index="weekday", columns="week", values="Date", aggfunc="last"
-    ).fillna(pd.NaT)
-    padded_date = padded_date.map(lambda x: x.strftime("%b %d") if pd.notna(x) else "")
-    padded_count = padded_count.iloc[::-1]
-    padded_date = padded_date.iloc[::-1]
-
-    fig = go.Figure(
-        data=go.Heatmap(
-            z=padded_count.values,
-            x=padded_date.iloc[0].values,
-            y=["Sun", "Sat", "Fri", "Thu", "Wed", "Tue", "Mon"],
-            hoverongaps=False,
-            hovertext=padded_date.values,
-            hovertemplate="%{hovertext}<extra>Count: %{z}</extra>",
-            colorscale=colors,
-            showscale=False,
-        )
-    )
-    fig.update_layout(
-        height=150,
-        margin=dict(t=0, b=0, l=0, r=0),
-        paper_bgcolor="rgba(0,0,0,0)",
-        plot_bgcolor="rgba(0,0,0,0)",
-    )
-    fig.update_xaxes(tickfont=dict(color="grey"), showgrid=False, zeroline=False)
-    fig.update_yaxes(tickfont=dict(color="grey"), showgrid=False, zeroline=False)
-    padded_date = padded_date.iloc[::-1]
-
-    return fig, padded_date
+@st.cache_data(max_entries=4, show_spinner=False)
+def cached_log_stats(version: tuple, start: str, end: str) -> pd.DataFrame:
+    return db.get_log_stats(start, end)
+
+
+@st.cache_data(max_entries=2, show_spinner=False)
+def cached_streaks(version: tuple) -> dict:
+    return la.compute_streaks(db.get_log_stats()["date"])
+
+
+def show_trends(years: list):
+    """Streaks, weekly word counts, top terms and mood for the years shown."""
+    version = db.get_log_stats_version()
+    stats = cached_log_stats(version, f"{years[0]}-01-01", f"{years[-1]}-12-31")
+    streaks = cached_streaks(version)
+    metric_cols = st.columns(4)
+    metric_cols[0].metric("Current streak", f"{streaks['current']} days")
+    metric_cols[1].metric("Longest streak", f"{streaks['longest']} days")
+    metric_cols[2].metric("Days logged", f"{len(stats):,}")
+    metric_cols[3].metric("Words written", f"{int(stats['words'].sum()):,}")
+    if len(stats) == 0:
+        return
+
+    weekly = la.weekly_trends(stats)
+    trend_cols = st.columns((3, 2))
+    fig = px.bar(weekly, x="week", y="words", height=250)
+    fig.update_layout(margin=dict(t=10, b=0, l=0, r=0))
+    trend_cols[0].plotly_chart(fig, use_container_width=True)
+    terms = la.top_terms(stats)
+    fig = px.bar(terms.iloc[::-1], x="count", y="term", orientation="h", height=250)
+    fig.update_layout(margin=dict(t=10, b=0, l=0, r=0))
+    trend_cols[1].plotly_chart(fig, use_container_width=True)
+
+    if weekly["mood"].notna().any():
+        fig = px.line(weekly, x="week", y="mood", height=200)
+        fig.update_layout(margin=dict(t=10, b=0, l=0, r=0))
+        st.plotly_chart(fig, use_container_width=True)
+    if st.button("🎭 Score mood", help="Embed logs without a mood score."):
+        with st.spinner("Scoring logs..."):
+            n_scored = la.score_moods()
+        st.success(f"Scored {n_scored} logs.")
+        st.rerun()
+
+
+def show_search():
+    """Full-text search over all logs; picking a result opens that day."""
+    query = st.text_input("Search", key="log_search", label_visibility="collapsed")
+    if not query:
+        return
+    results = db.search_documents(query, kinds=["log"])
+    if len(results) == 0:
+        st.caption("No matching logs.")
+    for _, result in results.iterrows():
+        result_cols = st.columns((1, 5))
+        if result_cols[0].button(result["key"], key=f"search_{result['key']}"):
+            st.session_state["date"] = pd.Timestamp(result["key"])
+            st.rerun()
+        result_cols[1].markdown(result["snippet"])
 
 
 def main():
@@ -75,19 +92,40 @@ def main():
     date_select = st.date_input("Select date", st.session_state["date"])
     year = date_select.year
 
-    cal = db.prepare_calendar_data(year)
-    today = pd.Timestamp(pd.to_datetime("today").date())
-    cal.loc[cal["Date"] == today, "Count"] = 2
-
-    calendar_fig, padded_date = plot_activity_map(cal)
-    calendar_select = plotly_events(calendar_fig, override_height=200)
+    view_cols = st.columns((1, 1, 4))
+    n_years = view_cols[0].number_input("Years shown", min_value=1, max_value=5, value=1)
+    intensity = view_cols[1].radio("Intensity", ["Presence", "Words", "Length"], horizontal=True)
+    years = list(range(year - n_years + 1, year + 1))
+    today = pd.Timestamp.now().date()
+    watcher.ensure_indexes_fresh()
+
+    def build_calendar():
+        stats = db.get_log_stats(f"{years[0]}-01-01", f"{years[-1]}-12-31")
+        weights = {"Words": stats["words"].values, "Length": stats["size"].values}.get(intensity)
+        grids = calmap.build_calendar(years, stats["date"].values, weights)
+        return calmap.plot_calendar(grids, today, binary=intensity == "Presence"), grids
+
+    calendar_fig, calendar_grids = u.get_figure_cache().figure_with_data(
+        ("logs_calendar", tuple(years), intensity, today, db.get_log_stats_version()),
+        build_calendar,
+    )
+    calendar_select = plotly_events(
+        calendar_fig, override_height=calmap.YEAR_HEIGHT * len(years) + 50
+    )
 
     if len(calendar_select) > 0:
-        ## Select from padded dates.
-        x_coord = 6 - calendar_select[0]["pointNumber"][0]
-        y_coord = calendar_select[0]["pointNumber"][1]
-        calendar_date = pd.to_datetime(padded_date.loc[x_coord, y_coord] + f" {year}")
-        st.session_state["date"] = pd.Timestamp(calendar_date)
+        row, col = calendar_select[0]["pointNumber"]
+        calendar_date = calmap.cell_date(
+            calendar_grids, calendar_select[0].get("curveNumber", 0), row, col
+        )
+        if calendar_date is not None:
+            st.session_state["date"] = pd.Timestamp(calendar_date)
+
+    with st.expander("📈 Writing trends"):
+        show_trends(years)
+
+    with st.expander("🔎 Search logs"):
+        show_search()
 
     daily_logs = db.get_logs_by_date(st.session_state["date"])
 
@@ -133,11 +171,21 @@ def main():
             and len(log_raw) > 0
         ):
             with st.spinner("Extracting ToDo items..."):
-                todo_suggestions_df = llms.extract_todo_from_logs(log_raw)
-                todo_suggestions_df = u.drop_duplicate_suggestions(todo_suggestions_df)
+                todo_suggestions_df = u.extract_log_todos(st.session_state["date"], log_raw)
                 todo_suggestions_df["add"] = False
                 st.session_state["todo_suggestions"] = todo_suggestions_df
 
+        with st.expander("🔮 Batch ToDo extraction"):
+            today = pd.Timestamp.now().date()
+            batch_range = st.date_input(
+                "Log range", (today - pd.Timedelta(days=7), today), key="batch_range"
+            )
+            if st.button("🔮 Batch", help="Extract ToDo items from all new logs in range.") and len(batch_range) == 2:
+                with st.spinner("Extracting ToDo items from logs..."):
+                    todo_suggestions_df = u.extract_period_todos(*batch_range)
+                    todo_suggestions_df["add"] = False
+                    st.session_state["todo_suggestions"] = todo_suggestions_df
+
         if len(st.session_state["todo_suggestions"]) > 0:
             st.divider()
             st.write("##### 📝 To-Do Suggestions:")
@@ -157,8 +205,6 @@ def main():
                 res = u.add_todo_items(todo_suggestions_df)
                 if res:
                     st.success("To-Do items added successfully!")
-                    ## ToDo: Make this a reset function?
-                    st.session_state["todo_df"] = db.get_todo_data()
                     st.session_state["todo_suggestions"] = pd.DataFrame()
                     time.sleep(2)
                     st.rerun()
@@ -170,3 +216,4 @@ def main():
 
 if __name__ == "__main__":
     main()
+    u.show_trace_panel()
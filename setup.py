@@ -39,6 +39,11 @@ def create_portfolio_database():
         if num_records == 0:
             init_portfolio_table()
 
+    ## Lookup index for the per-date reads and duplicate-platform checks of the Assets editor.
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_portfolio_date_platform ON portfolio (Date, Platform)"
+    )
+    conn.commit()
     conn.close()
 
 
@@ -56,7 +61,7 @@ def create_logs_database():
             ID INTEGER PRIMARY KEY AUTOINCREMENT,
             NAME TEXT,
             TYPE TEXT,
-            STATUS TEXT,
+            STATUS INTEGER,
             META JSONB,
             TSTP TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
@@ -0,0 +1,119 @@
+"""Lightweight span tracing for the app's hot paths.
+
+Spans are recorded per script rerun (per Streamlit session thread), folded into
+a rolling in-memory history per span name, and optionally appended to a JSONL
+file when TRACE_PATH is set. Background threads have no rerun, so their spans
+only go to the history.
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+
+TRACE_PATH = os.environ.get("TRACE_PATH")
+HISTORY_SIZE = 500
+MAX_RERUN_SPANS = 5000
+
+_local = threading.local()
+_history = defaultdict(lambda: deque(maxlen=HISTORY_SIZE))
+_lock = threading.Lock()
+
+
+def _rerun_spans():
+    return getattr(_local, "spans", None)
+
+
+def start_rerun() -> None:
+    """Reset the span list for the current script run."""
+    _local.spans = deque(maxlen=MAX_RERUN_SPANS)
+
+
+def fragment(func=None, **fragment_kwargs):
+    """`st.fragment` that starts a new span list when the fragment reruns on its own."""
+    import streamlit as st
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            ctx = get_script_run_ctx()
+            if ctx is not None and ctx.fragment_ids_this_run:
+                start_rerun()
+            return func(*args, **kwargs)
+
+        return st.fragment(wrapper, **fragment_kwargs)
+
+    return decorate(func) if func is not None else decorate
+
+
+@contextmanager
+def span(name: str):
+    """Time the enclosed block and record it under `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        record = {"name": name, "duration_s": duration, "tstp": time.time()}
+        spans = _rerun_spans()
+        if spans is not None:
+            spans.append(record)
+        with _lock:
+            _history[name].append(duration)
+            if TRACE_PATH:
+                with open(TRACE_PATH, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+
+
+def traced(func):
+    """Decorator recording each call as a `<module>.<function>` span."""
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with span(name):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def get_rerun_summary() -> list:
+    """Per-name count and total duration for the current rerun, slowest first."""
+    totals = defaultdict(lambda: {"count": 0, "total_s": 0.0, "max_s": 0.0})
+    for record in _rerun_spans() or ():
+        entry = totals[record["name"]]
+        entry["count"] += 1
+        entry["total_s"] += record["duration_s"]
+        entry["max_s"] = max(entry["max_s"], record["duration_s"])
+    summary = [{"name": name, **entry} for name, entry in totals.items()]
+    return sorted(summary, key=lambda x: x["total_s"], reverse=True)
+
+
+def get_history_summary() -> list:
+    """Rolling count and latency percentiles per span name."""
+    with _lock:
+        history = {name: np.array(values) for name, values in _history.items()}
+    summary = [
+        {
+            "name": name,
+            "count": len(values),
+            "p50_s": float(np.percentile(values, 50)),
+            "p95_s": float(np.percentile(values, 95)),
+            "max_s": float(values.max()),
+        }
+        for name, values in history.items()
+        if len(values) > 0
+    ]
+    return sorted(summary, key=lambda x: x["p95_s"], reverse=True)
+
+
+def get_histogram(name: str, bins: int = 10) -> tuple:
+    """Histogram (counts, bin edges) of the rolling durations for a span."""
+    with _lock:
+        values = np.array(_history.get(name, []))
+    return np.histogram(values, bins=bins)
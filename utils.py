@@ -1,9 +1,18 @@
 import streamlit as st
 import pandas as pd
 import datetime
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
 
 import embeddings as emb
+import tracing
 import db
+from tracing import traced
+
+logger = logging.getLogger(__name__)
 
 
 def adjust_sidebar(width: int = 250) -> None:
@@ -23,10 +32,9 @@ def refresh_session_state(force=False) -> None:
     """ Refresh session state variables. """
     if "date" not in st.session_state or force:
         st.session_state["date"] = pd.Timestamp.now()
-    if "todo_df" not in st.session_state or force:
-        st.session_state["todo_df"] = db.get_todo_data()
 
 
+@traced
 def get_period_logs_string(start_date: datetime.date, end_date: datetime.date) -> str:
     """Collect user log for a given period."""
     date_range = pd.date_range(start_date, end_date)
@@ -37,51 +45,267 @@ def get_period_logs_string(start_date: datetime.date, end_date: datetime.date) -
     return all_logs
 
 
+def get_day_reflection_string(date: datetime.date) -> str:
+    """A day's log followed by its LLM reflection and the user's reaction, if any."""
+    current_log = db.get_logs_by_date(date, default_response=False)
+    current_reflection_obj = db.get_reflection_by_date(date)
+    reflection_message = current_reflection_obj.get("message", "")
+    reflection_reaction = current_reflection_obj.get("reaction", "")
+    if len(current_log) == 0 and len(reflection_message) == 0:
+        return ""
+    content = current_log + "\n"
+    if len(reflection_message) > 0:
+        content += f"#### Reflection:\n{reflection_message}"
+        content += f"#### Reaction:\n{reflection_reaction}"
+    return content + "\n"
+
+
+@traced
 def get_period_logs_reflection_string(start_date: datetime.date, end_date: datetime.date) -> str:
     """Collect user logs, LLM feedback and user reflections for a given period."""
     date_range = pd.date_range(start_date, end_date)
-    content = ""
-    for date in date_range:
-        current_log = db.get_logs_by_date(date, default_response=False)
-        current_reflection_obj = db.get_reflection_by_date(date)
-        reflection_message = current_reflection_obj.get("message", "")
-        reflection_reaction = current_reflection_obj.get("reaction", "")
-        if len(current_log) == 0 and len(reflection_message) == 0:
+    return "".join(get_day_reflection_string(date) for date in date_range)
+
+
+@traced
+def get_reflection_context(
+    date: datetime.date, recent_days: int = 3, top_k: int = 8, max_tokens: int = 3000
+) -> str:
+    """Recent days verbatim plus the past logs and reflections most similar to yesterday's log.
+
+    The recent window may use up to half of `max_tokens`; retrieved entries fill the rest.
+    The index is refreshed in the background, so entries written moments ago may be missing.
+    """
+    import llms
+    import log_index
+
+    prev_date = date - datetime.timedelta(days=1)
+    recent_dates = pd.date_range(date - datetime.timedelta(days=recent_days + 1), date - datetime.timedelta(days=2))
+    recent, used = [], 0
+    for day in reversed(recent_dates):
+        entry = get_day_reflection_string(day)
+        n_tokens = llms.count_tokens(entry)
+        if not entry or used + n_tokens > max_tokens // 2:
+            continue
+        recent.insert(0, entry)
+        used += n_tokens
+
+    query = db.get_logs_by_date(prev_date, default_response=False)
+    exclude = [day.strftime("%Y-%m-%d") for day in [*recent_dates, prev_date, date]]
+    log_index.index_in_background()
+    try:
+        hits = log_index.search(query, top_k, kinds=["log", "reflection"], exclude_keys=exclude) if query else []
+    except Exception:
+        ## No embedding model (or it failed to load), or an unreadable vector file:
+        ## fall back to the recent window alone.
+        logger.exception("Log retrieval failed; using the recent window only")
+        hits = []
+
+    related = []
+    for hit in hits:
+        entry = f'<past-{hit["kind"]} date="{hit["key"]}">\n{hit["heading"]}\n{hit["text"]}\n</past-{hit["kind"]}>'
+        n_tokens = llms.count_tokens(entry)
+        if used + n_tokens > max_tokens:
             continue
-        content += current_log + "\n"
-        if len(reflection_message) > 0:
-            content += f"#### Reflection:\n{reflection_message}"
-            content += f"#### Reaction:\n{reflection_reaction}"
-        content += "\n"
-    return content
+        related.append((hit["key"], entry))
+        used += n_tokens
 
+    context = "".join(recent)
+    if related:
+        context += "\n#### Related past entries:\n" + "\n\n".join(entry for _, entry in sorted(related))
+    return context
 
 
+@traced
+def calculate_stats(df: pd.DataFrame, start_date: datetime.date) -> dict:
+    """Calculate completion statistics for to-do items edited since start_date."""
+    filtered_df = df[
+        (df["status"] == True)
+        & (pd.to_datetime(df["edit_tstp"]).dt.date >= start_date)
+    ]
 
+    # Total completed tasks
+    total_completed = len(filtered_df)
+
+    # Completed by type, project and priority (categorical counts include unused categories)
+    completed_by_type = filtered_df["type"].value_counts()[lambda x: x > 0].to_dict()
+    completed_by_project = filtered_df["project"].value_counts()[lambda x: x > 0].to_dict()
+    completed_by_priority = filtered_df["priority"].value_counts()[lambda x: x > 0].to_dict()
+
+    # Average tasks per day
+    if total_completed > 0:
+        date_range = (datetime.datetime.now().date() - start_date).days + 1
+        avg_per_day = total_completed / date_range
+    else:
+        avg_per_day = 0
+
+    return {
+        "total_completed": total_completed,
+        "by_type": completed_by_type,
+        "by_project": completed_by_project,
+        "by_priority": completed_by_priority,
+        "avg_per_day": avg_per_day,
+    }
+
+
+@traced
 def drop_duplicate_suggestions(df: pd.DataFrame) -> pd.DataFrame:
-    """Drop duplicate suggestions DF."""
-    todo_df = db.get_todo_data()
-    tasks = todo_df.loc[todo_df["status"] == False, "name"].tolist()
-    df_copy = df.copy()
-    for idx, row in df_copy.iterrows():
-        if "name" not in row:
-            raise ValueError("DataFrame must contain 'name' column")
-        todo = row["name"]
-        similar_candidates = emb.find_similar(todo, tasks)
-        if len(similar_candidates) > 0:
-            df_copy.drop(idx, inplace=True)
-    return df_copy
+    """Drop suggestions that duplicate open to-dos or each other."""
+    if "name" not in df.columns:
+        raise ValueError("DataFrame must contain 'name' column")
+    duplicates = emb.find_duplicates(df["name"].tolist(), db.get_open_todo_names())
+    return df.loc[~duplicates].copy()
+
+
+@traced
+def drop_near_duplicate_links(items: list, threshold: float = 0.95) -> list:
+    """Drop link dicts whose titles nearly match a saved link or an earlier item."""
+    titled = [i for i, item in enumerate(items) if item.get("title")]
+    if len(titled) == 0:
+        return items
+    duplicates = emb.find_duplicates(
+        [items[i]["title"] for i in titled], db.get_link_titles(), threshold=threshold
+    )
+    drop = {i for i, duplicate in zip(titled, duplicates) if duplicate}
+    return [item for i, item in enumerate(items) if i not in drop]
+
+
+def hash_text(text: str) -> str:
+    """Content hash used to remember which logs were already processed."""
+    return hashlib.sha256(text.strip().encode()).hexdigest()
+
 
+def split_log_sections(text: str) -> list:
+    """Split a log into its non-empty paragraphs."""
+    return [section.strip() for section in re.split(r"\n\s*\n", text) if section.strip()]
 
+
+def get_new_sections(text: str, processed_hashes: set) -> dict:
+    """Paragraphs of a log not yet sent for extraction, keyed by content hash."""
+    sections = {hash_text(section): section for section in split_log_sections(text)}
+    return {h: section for h, section in sections.items() if h not in processed_hashes}
+
+
+@traced
+def extract_log_todos(date: datetime.date, log_text: str) -> pd.DataFrame:
+    """Extract to-do suggestions from one log, sending only paragraphs not seen before."""
+    import llms
+
+    date = pd.Timestamp(date).date()
+    processed = db.get_extractions([date]).get(date, {"hashes": set(), "suggestions": []})
+    new_sections = get_new_sections(log_text, processed["hashes"])
+    suggestions_df = pd.DataFrame(
+        processed["suggestions"], columns=list(llms.TODO_COLUMNS.values())
+    )
+    if len(new_sections) > 0:
+        new_df = llms.extract_todo_from_logs("\n\n".join(new_sections.values()))
+        new_df["date"] = date.strftime("%Y-%m-%d")
+        db.save_extraction(date, list(new_sections), new_df.to_dict("records"))
+        suggestions_df = pd.concat([suggestions_df, new_df], ignore_index=True)
+    return drop_duplicate_suggestions(suggestions_df)
+
+
+@traced
+def extract_period_todos(
+    start_date: datetime.date, end_date: datetime.date, max_tokens: int = 6000
+) -> pd.DataFrame:
+    """Extract to-do suggestions from the unprocessed paragraphs of every log in a date range."""
+    import llms
+
+    logs = db.get_logs_for_period(start_date, end_date)
+    processed = db.get_extractions(list(logs.keys()))
+    new_sections = {
+        date: get_new_sections(text, processed.get(date, {}).get("hashes", set()))
+        for date, text in logs.items()
+    }
+    pending = {
+        date: "\n\n".join(sections.values())
+        for date, sections in new_sections.items()
+        if len(sections) > 0
+    }
+    suggestions_df = llms.extract_todo_from_log_batch(pending, max_tokens=max_tokens)
+
+    ## Remember processed sections along with the suggestions attributed to each day.
+    first_date = min(pending) if pending else None
+    log_dates = pd.to_datetime(suggestions_df["date"], errors="coerce").dt.date
+    log_dates = log_dates.where(log_dates.isin(list(pending)), first_date)
+    for date in pending:
+        day_suggestions = suggestions_df.loc[log_dates == date]
+        db.save_extraction(date, list(new_sections[date]), day_suggestions.to_dict("records"))
+
+    return drop_duplicate_suggestions(suggestions_df)
+
+
+@traced
 def add_todo_items(df: pd.DataFrame, status=False) -> bool:
-    """ Adds items to the To-Do database from a DataFrame. """
-    for idx, row in df.iterrows():
-        todo = row["name"]
-        todo_type = row["type"]
-        todo_meta = {
+    """ Adds items to the To-Do database from a DataFrame as one (undoable) change. """
+    edit_tstp = pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")
+    inserts = [
+        {
+            "name": row["name"],
+            "type": row["type"],
+            "status": status,
             "priority": row["priority"],
             "project": row["project"],
-            "edit_tstp": pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "edit_tstp": edit_tstp,
         }
-        db.add_todo_item(todo, todo_type, todo_meta, status)
+        for _, row in df.iterrows()
+    ]
+    db.apply_todo_changes(inserts=inserts, source="add")
     return True
+
+
+class FigureCache:
+    """LRU of built Plotly figures (plus an optional small payload), keyed by data version and view options.
+
+    Hits return the cached figure object itself, shared across sessions; treat it as read-only.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def figure_with_data(self, key: tuple, build):
+        """Return (figure, data) for a key, calling build() -> (figure, data) only on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            with tracing.span(f"figure_cache.build:{key[0]}"):
+                entry = build()
+            with self._lock:
+                self._entries[key] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def figure(self, key: tuple, build):
+        """Return the figure for a key, calling build() -> figure only on a miss."""
+        return self.figure_with_data(key, lambda: (build(), None))[0]
+
+
+@st.cache_resource
+def get_figure_cache() -> FigureCache:
+    """Process-wide figure cache shared by all pages and sessions."""
+    return FigureCache()
+
+
+def show_trace_panel(top_n: int = 10) -> None:
+    """Hidden sidebar panel with the slowest spans of this rerun; enable with ?trace=1."""
+    if st.query_params.get("trace") != "1":
+        return
+    with st.sidebar.expander("⏱️ Timing", expanded=True):
+        st.caption("Slowest spans (this rerun)")
+        st.dataframe(
+            pd.DataFrame(tracing.get_rerun_summary()[:top_n]),
+            hide_index=True,
+            use_container_width=True,
+        )
+        st.caption("Rolling history")
+        st.dataframe(
+            pd.DataFrame(tracing.get_history_summary()[:top_n]),
+            hide_index=True,
+            use_container_width=True,
+        )
@@ -0,0 +1,288 @@
+"""Filesystem watcher that keeps the log and note indexes in sync with LOGS_PATH.
+
+Logs (`LOGS_PATH/YYYY-MM/YYYYMMDD.md`) and notes (`LOGS_PATH/notes/*.md`) are
+also edited outside the app and synced between machines. The watcher listens
+with inotify when `inotify_simple` is installed and falls back to polling mtimes.
+Changes are debounced into batches and pushed to every registered index handler.
+On start, the watcher thread first catches each handler up on whatever changed
+while the app was down, so pages neither rescan directories nor wait for it.
+"""
+import os
+import re
+import threading
+import time
+from typing import Callable, NamedTuple, Optional
+
+import db
+import log_index
+import tracing
+
+WATCH_ENABLED = os.environ.get("LOGS_WATCHER", "1") == "1"
+WATCH_DEBOUNCE = float(os.environ.get("LOGS_WATCH_DEBOUNCE", "1.0"))
+WATCH_POLL_INTERVAL = float(os.environ.get("LOGS_WATCH_POLL_INTERVAL", "2.0"))
+MONTH_DIR_RE = re.compile(r"\d{4}-\d{2}$")
+LOG_FILE_RE = re.compile(r"(\d{4})(\d{2})(\d{2})\.md$")
+
+
+class IndexHandler(NamedTuple):
+    """`update(log_dates, note_filenames)` re-indexes changed files (missing ones are deletions);
+    `known()` returns the ({date: mtime_ns}, {filename: mtime_ns}) the index was built from,
+    with None for a side the index does not cover."""
+
+    update: Callable[[list, list], None]
+    known: Optional[Callable[[], tuple]] = None
+
+
+def classify(path: str, root: str = None) -> Optional[tuple]:
+    """("log", ISO date) or ("note", file name) for a watched path, else None."""
+    rel = os.path.relpath(path, root or db.LOGS_PATH)
+    parent, name = os.path.split(rel)
+    if parent == "notes" and name.endswith(".md"):
+        return "note", name
+    match = LOG_FILE_RE.match(name)
+    if match and MONTH_DIR_RE.match(parent):
+        return "log", "-".join(match.groups())
+    return None
+
+
+def scan_files() -> tuple:
+    """({date: mtime_ns} of logs, {filename: mtime_ns} of notes) currently on disk."""
+    logs = {date: mtime_ns for date, mtime_ns, _ in db.scan_log_files()}
+    return logs, db.scan_note_files()
+
+
+class IndexWatcher:
+    """Background thread that debounces file changes and fans them out to index handlers."""
+
+    def __init__(
+        self,
+        root: str = None,
+        debounce: float = WATCH_DEBOUNCE,
+        poll_interval: float = WATCH_POLL_INTERVAL,
+        use_inotify: bool = True,
+    ):
+        self.root = root or db.LOGS_PATH
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.handlers = {}
+        self.backend = None
+        self.last_error = None
+        self._pending_logs, self._pending_notes = set(), set()
+        self._pending_catch_up = set()
+        self._last_event = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def register_handler(self, name: str, handler: IndexHandler) -> None:
+        """Add (or replace) an index handler; a running watcher catches it up on its next pass."""
+        self.handlers[name] = handler
+        with self._lock:
+            self._pending_catch_up.add(name)
+
+    def start(self) -> "IndexWatcher":
+        if self.is_running:
+            return self
+        self._stop.clear()
+        inotify = self._open_inotify() if self.use_inotify else None
+        self.backend = "inotify" if inotify is not None else "polling"
+        self._thread = threading.Thread(target=self._run, args=(inotify,), name="index-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def notify(self, path: str) -> None:
+        """Queue a changed path; it is dispatched once no event arrived for `debounce` seconds."""
+        target = classify(path, self.root)
+        if target is None:
+            return
+        with self._lock:
+            (self._pending_logs if target[0] == "log" else self._pending_notes).add(target[1])
+            self._last_event = time.monotonic()
+
+    def flush(self, force: bool = False) -> bool:
+        """Dispatch the pending batch if it has settled (or `force`); returns whether it did."""
+        self._catch_up_pending()
+        with self._lock:
+            if not (self._pending_logs or self._pending_notes):
+                return False
+            if not force and time.monotonic() - self._last_event < self.debounce:
+                return False
+            logs, notes = sorted(self._pending_logs), sorted(self._pending_notes)
+            self._pending_logs, self._pending_notes = set(), set()
+        self._dispatch(self.handlers, logs, notes)
+        return True
+
+    def _dispatch(self, handlers: dict, logs: list, notes: list) -> None:
+        for name, handler in list(handlers.items()):
+            try:
+                with tracing.span(f"watcher.{name}"):
+                    handler.update(logs, notes)
+            except Exception as exc:
+                ## One broken index must not stop the others from updating.
+                self.last_error = f"{name}: {exc!r}"
+
+    def sync(self) -> None:
+        """Catch every handler up synchronously (what pages do when the watcher is off)."""
+        with self._lock:
+            self._pending_catch_up.clear()
+        self._catch_up(self.handlers)
+
+    def _run(self, inotify):
+        ## Start watching before the catch-up scan, so nothing changed during it is lost.
+        previous = self._snapshot() if inotify is None else None
+        self._catch_up_pending()
+        if inotify is None:
+            self._poll_loop(previous)
+        else:
+            self._inotify_loop(inotify)
+
+    def _catch_up_pending(self) -> None:
+        with self._lock:
+            names, self._pending_catch_up = self._pending_catch_up, set()
+        if not names:
+            return
+        try:
+            self._catch_up({name: self.handlers[name] for name in names if name in self.handlers})
+        except Exception as exc:
+            self.last_error = f"catch-up: {exc!r}"
+
+    def _catch_up(self, handlers: dict) -> None:
+        """Bring each handler up to date with the files on disk, by mtime."""
+        current_logs, current_notes = scan_files()
+        for name, handler in handlers.items():
+            if handler.known is None:
+                continue
+            known_logs, known_notes = handler.known()
+            logs = db.stale_keys(current_logs, known_logs) if known_logs is not None else []
+            notes = db.stale_keys(current_notes, known_notes) if known_notes is not None else []
+            if logs or notes:
+                self._dispatch({name: handler}, logs, notes)
+
+    ## Polling backend.
+    def _snapshot(self) -> dict:
+        snapshot = {}
+        if not os.path.isdir(self.root):
+            return snapshot
+        for fdir in os.listdir(self.root):
+            if not (MONTH_DIR_RE.match(fdir) or fdir == "notes"):
+                continue
+            with os.scandir(os.path.join(self.root, fdir)) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".md"):
+                        snapshot[entry.path] = entry.stat().st_mtime_ns
+        return snapshot
+
+    def _poll_loop(self, previous: dict):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                current = self._snapshot()
+                for path in db.stale_keys(current, previous):
+                    self.notify(path)
+                previous = current
+            except OSError as exc:
+                self.last_error = f"poll: {exc!r}"
+            self.flush()
+
+    ## inotify backend.
+    def _open_inotify(self):
+        try:
+            from inotify_simple import INotify
+        except ImportError:
+            return None
+        inotify = INotify()
+        self._watches = {}
+        self._add_watch(inotify, self.root)
+        for fdir in os.listdir(self.root):
+            if MONTH_DIR_RE.match(fdir) or fdir == "notes":
+                self._add_watch(inotify, os.path.join(self.root, fdir))
+        return inotify
+
+    def _add_watch(self, inotify, directory: str):
+        from inotify_simple import flags
+
+        mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM | flags.DELETE | flags.CREATE
+        self._watches[inotify.add_watch(directory, mask)] = directory
+
+    def _inotify_loop(self, inotify):
+        from inotify_simple import flags
+
+        try:
+            while not self._stop.is_set():
+                timeout_ms = int(min(self.debounce, 0.5) * 1000)
+                for event in inotify.read(timeout=timeout_ms):
+                    directory = self._watches.get(event.wd)
+                    if directory is None or not event.name:
+                        continue
+                    path = os.path.join(directory, event.name)
+                    is_new_dir = event.mask & flags.ISDIR and event.mask & (flags.CREATE | flags.MOVED_TO)
+                    if is_new_dir and directory == self.root and (
+                        MONTH_DIR_RE.match(event.name) or event.name == "notes"
+                    ):
+                        self._add_watch(inotify, path)
+                        ## Files may have landed before the watch existed (e.g. a sync).
+                        for name in os.listdir(path):
+                            self.notify(os.path.join(path, name))
+                    else:
+                        self.notify(path)
+                self.flush()
+        finally:
+            inotify.close()
+
+
+def _update_stats(logs: list, notes: list) -> None:
+    if logs:
+        db.index_log_files(logs, search=False)
+    if notes:
+        db.index_note_files(notes, search=False)
+
+
+def _update_search(logs: list, notes: list) -> None:
+    if logs:
+        db.index_log_files(logs, stats=False)
+    if notes:
+        db.index_note_files(notes, notes=False)
+
+
+DEFAULT_HANDLERS = {
+    ## Calendar heatmap, trends and notes list.
+    "stats": IndexHandler(_update_stats, lambda: (db.get_log_stats_mtimes(), db.get_notes_index_mtimes())),
+    "search": IndexHandler(
+        _update_search, lambda: (db.get_search_index_mtimes("log"), db.get_search_index_mtimes("note"))
+    ),
+}
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def get_watcher() -> IndexWatcher:
+    """Return the process-wide watcher, starting it on first use unless LOGS_WATCHER=0."""
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = IndexWatcher()
+            for name, handler in DEFAULT_HANDLERS.items():
+                _watcher.register_handler(name, handler)
+            if log_index.EMBED_ON_WATCH:
+                _watcher.register_handler("embeddings", log_index.watch_handler())
+            if WATCH_ENABLED:
+                _watcher.start()
+        return _watcher
+
+
+def ensure_indexes_fresh() -> IndexWatcher:
+    """Rely on the running watcher, or rescan once for this rerun when it is disabled."""
+    watcher = get_watcher()
+    if not watcher.is_running:
+        watcher.sync()
+    return watcher
@@ -3,10 +3,12 @@ import time
 import datetime
 
 import db
+import tracing
 import utils as u
 import llms
 
 st.set_page_config(page_title="Home", page_icon="🪴", layout="wide")
+tracing.start_rerun()
 u.adjust_sidebar()
 
 
@@ -14,13 +16,11 @@ def process_reflections(date: datetime.date) -> dict:
     """ Try to get reflections and ASCII art from DB, or generate a new one."""
     asci_art_obj = db.get_reflection_by_date(date)
     if len(asci_art_obj) == 0:
-        start_date = date - datetime.timedelta(days=30)
-        end_date = date - datetime.timedelta(days=2)
         prev_date = date - datetime.timedelta(days=1)
-        logs_history = u.get_period_logs_reflection_string(start_date, end_date)
         previous_logs = db.get_logs_by_date(prev_date, default_response=False)
         if len(previous_logs) == 0:
             return dict()
+        logs_history = u.get_reflection_context(date)
 
         asci_art_obj = llms.generate_welcome_pattern(logs_history, previous_logs)
         db.save_reflection_by_date(date, asci_art_obj)
@@ -58,4 +58,5 @@ def main():
     ## APP ID  AA00DIVA4L
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
+    u.show_trace_panel()